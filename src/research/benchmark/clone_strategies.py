@@ -0,0 +1,101 @@
+"""
+GitHubTool.clone_repositoryのクローンの方法ごとに、ファイルの一覧を取得できるまでの時間（time-to-tree）と転送量を計測するスクリプト。
+github_repo_parserと同じく、ファイルの一覧を取得した後に主要ファイル（--files個）を読み込むまでを計測する。
+    full(mirror, cold) : ミラーを新規に作成してworktreeを作る
+    full(mirror, warm) : 既存のミラーをfetchで更新してworktreeを作る（再実行や条件を変えた評価の場合）
+    full               : ミラーを使わない通常のgit clone（変更前）
+    blobless           : --filter=blob:none
+    shallow            : --depth 1
+    sparse             : --filter=blob:none＋sparse checkout（.github/のみ、読むファイルはその時に取得する）
+転送量はクローン後（とファイルを読んだ後）の.git/objectsのバイト数。
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from research.tools.clone_cache import MirrorCache, clone_with_strategy, objects_size, sparse_checkout_add, tracked_files
+
+# 主要ファイルとして読み込むファイル名（見つからなければルートのファイルから選ぶ）
+BUILD_FILES = ("pyproject.toml", "setup.py", "requirements.txt", "package.json", "pom.xml", "build.gradle",
+               "go.mod", "Cargo.toml", "CMakeLists.txt", "Gemfile", "Makefile", "README.md")
+
+
+def pick_files(files: list[str], count: int) -> list[str]:
+    picked = [path for path in files if os.path.basename(path) in BUILD_FILES and path.count("/") <= 1]
+    picked += [path for path in files if "/" not in path and path not in picked]
+    return picked[:count]
+
+
+def measure(repo_url: str, strategy: str, workdir: str, files: int, cache: MirrorCache | None) -> dict:
+    local_path = os.path.join(workdir, strategy.replace("(", "_").replace(")", "").replace(", ", "_"))
+    start = time.perf_counter()
+    if cache is not None:
+        mirror = cache.mirror_path(repo_url)
+        before = objects_size(mirror) if os.path.exists(os.path.join(mirror, "HEAD")) else 0
+        cache.add_worktree(repo_url, local_path)
+    else:
+        before = 0
+        clone_with_strategy(repo_url, local_path, strategy)
+    tree = tracked_files(local_path)
+    time_to_tree = time.perf_counter() - start
+    cloned_bytes = objects_size(local_path) - before
+
+    for path in pick_files(tree, files):
+        if not os.path.exists(os.path.join(local_path, path)):
+            sparse_checkout_add(local_path, path)
+        with open(os.path.join(local_path, path), "rb") as f:
+            f.read()
+    total = time.perf_counter() - start
+    read_bytes = objects_size(local_path) - before
+    if cache is not None:
+        cache.remove_worktree(local_path)
+    return {
+        "strategy": strategy,
+        "files": len(tree),
+        "time_to_tree": round(time_to_tree, 2),
+        "total": round(total, 2),
+        "cloned_mb": round(cloned_bytes / 1024 / 1024, 2),
+        "after_read_mb": round(read_bytes / 1024 / 1024, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("repo_url", help="クローンするリポジトリのURL（例: https://github.com/owner/repo）")
+    parser.add_argument("--files", type=int, default=5, help="ファイルの一覧の後に読み込むファイル数（max_required_filesに相当）")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="clone_strategies_")
+    cache = MirrorCache(os.path.join(workdir, "mirrors"), refresh_seconds=0)
+    runs = [
+        ("full(mirror, cold)", cache),
+        ("full(mirror, warm)", cache),
+        ("full", None),
+        ("blobless", None),
+        ("shallow", None),
+        ("sparse", None),
+    ]
+    print(f"{'strategy':<20}{'files':>8}{'tree(s)':>10}{'total(s)':>10}{'clone MB':>10}{'+read MB':>10}")
+    try:
+        for strategy, strategy_cache in runs:
+            r = measure(args.repo_url, strategy, workdir, args.files, strategy_cache)
+            print(f"{r['strategy']:<20}{r['files']:>8}{r['time_to_tree']:>10}{r['total']:>10}{r['cloned_mb']:>10}{r['after_read_mb']:>10}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+# 実行方法:
+# poetry run python src/research/benchmark/clone_strategies.py https://github.com/owner/repo --files 5
+#
+# 計測結果の例（このリポジトリのbareコピーをfile://で指定、uploadpack.allowFilter=true、60ファイル）:
+# strategy               files   tree(s)  total(s)  clone MB  +read MB
+# full(mirror, cold)        60      0.29      0.29      0.42      0.42
+# full(mirror, warm)        60      0.04      0.05       0.0       0.0
+# full                      60      0.27      0.27      0.42      0.42
+# blobless                  60      0.25      0.25      0.41      0.41
+# shallow                   60       0.2       0.2      0.38      0.38
+# sparse                    60      0.04      0.12      0.03      0.03
+# 履歴が長くファイルの大きいリポジトリほど、blobless/shallow/sparseとwarmのミラーの差が大きくなる
+if __name__ == "__main__":
+    main()
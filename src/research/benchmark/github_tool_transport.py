@@ -0,0 +1,67 @@
+"""
+GitHubToolのtransport（subprocess / inprocess）ごとに、起動時間と1回あたりの呼び出し時間を計測するスクリプト。
+GitHub APIを呼ばない/http/statsを呼び出すため、GITHUB_TOKENやネットワークは不要。
+起動時間を公平に測るため、transportごとに別プロセスで計測する。
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+
+def measure(transport: str, calls: int) -> dict:
+    """
+    指定したtransportでGitHubToolを起動し、起動時間と呼び出し時間（ミリ秒）を返す。
+    """
+    from research.tools.github import GitHubTool
+
+    start = time.perf_counter()
+    tool = GitHubTool(transport=transport)
+    startup = time.perf_counter() - start
+    latencies = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        tool._decode(tool._request("GET", "/http/stats"))
+        latencies.append(time.perf_counter() - start)
+    if transport == "inprocess":
+        tool._stop_inprocess_app()
+    else:
+        tool._stop_github_api_server()
+    latencies.sort()
+    return {
+        "transport": transport,
+        "startup_ms": round(startup * 1000, 1),
+        "call_median_ms": round(statistics.median(latencies) * 1000, 3),
+        "call_p95_ms": round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--transport", choices=["subprocess", "inprocess"])
+    parser.add_argument("--calls", type=int, default=200)
+    args = parser.parse_args()
+    if args.transport:
+        print(json.dumps(measure(args.transport, args.calls)))
+        return
+    print(f"{'transport':<12}{'startup(ms)':>14}{'call median(ms)':>18}{'call p95(ms)':>15}")
+    for transport in ["subprocess", "inprocess"]:
+        out = subprocess.run(
+            [sys.executable, __file__, "--transport", transport, "--calls", str(args.calls)],
+            capture_output=True, text=True, check=True,
+        ).stdout
+        result = json.loads(out.strip().splitlines()[-1])
+        print(f"{transport:<12}{result['startup_ms']:>14}{result['call_median_ms']:>18}{result['call_p95_ms']:>15}")
+
+
+# 実行方法:
+# poetry run python src/research/benchmark/github_tool_transport.py
+#
+# 計測結果の例（Linux, Python 3.13, 200回呼び出し）:
+# transport      startup(ms)   call median(ms)   call p95(ms)
+# subprocess           820.6             2.325          2.943
+# inprocess            262.9             0.885          1.512
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+失敗したジョブのログを取得する方法ごとに、転送量と所要時間を計測するスクリプト。
+代替サーバー（fake_github）を起動し、/workflow/latestで失敗したrunの抜粋を作るまでを計測する。
+    full          : ログ全体をダウンロードする（失敗したstepの区間を過ぎたら打ち切る）
+    tail          : 末尾からRangeリクエストで取得し、エラーが見つからなければ範囲を広げる
+    tail(no range): ダウンロード先がRangeに対応しない場合のtail（全体を逐次読み込む方法に切り替わる）
+ログのキャッシュとアノテーションの確認は無効にする。GITHUB_TOKENやネットワークは不要。
+"""
+import argparse
+import os
+import socket
+import statistics
+import threading
+import time
+import uvicorn
+from fastapi.testclient import TestClient
+from research.server import fake_github, github_api, workflow_logs
+
+MODES = {
+    "full": ("full", True),
+    "tail": ("tail", True),
+    "tail(no range)": ("tail", False),
+}
+
+
+def measure(client: TestClient, mode: str, lines: int, calls: int) -> dict:
+    fetch_mode, ranges = MODES[mode]
+    fake_github.state.config = fake_github.FakeGitHubConfig(log_lines=lines, log_ranges=ranges)
+    fake_github.state.reset()
+    latencies = []
+    stats = {}
+    for i in range(calls):
+        # 同じcommitの結果は再利用されるため、毎回新しいSHAでrunを合成させる
+        sha = f"{lines:08x}{i:08x}{abs(hash(mode)) % 16 ** 24:024x}"
+        start = time.perf_counter()
+        result = client.post("/workflow/latest", json={
+            "repo_url": "https://github.com/owner/repo", "commit_sha": sha, "log_fetch_mode": fetch_mode}).json()
+        latencies.append(time.perf_counter() - start)
+        assert result["conclusion"] == "failure", result.get("message")
+        stats = result["log_fetch_stats"]
+    return {
+        "mode": mode,
+        "lines": lines,
+        "total_kb": round(stats["total_bytes"] / 1024, 1),
+        "fetched_kb": round(stats["bytes"] / 1024, 1),
+        "requests": stats["requests"],
+        "ms": round(statistics.median(latencies) * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lines", type=int, nargs="+", default=[2000, 20000, 200000], help="合成するジョブログの行数")
+    parser.add_argument("--calls", type=int, default=5)
+    args = parser.parse_args()
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(fake_github.app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    os.environ["GITHUB_API_BASE_URL"] = f"http://127.0.0.1:{port}"
+    os.environ.setdefault("GITHUB_TOKEN", "dummy")
+    workflow_logs.LOG_CACHE_ENABLED = False
+    github_api.LOG_USE_ANNOTATIONS = False
+
+    print(f"{'mode':<16}{'lines':>8}{'log KB':>10}{'fetched KB':>12}{'requests':>10}{'ms':>10}")
+    try:
+        with TestClient(github_api.app) as client:
+            for lines in args.lines:
+                for mode in MODES:
+                    r = measure(client, mode, lines, args.calls)
+                    print(f"{r['mode']:<16}{r['lines']:>8}{r['total_kb']:>10}{r['fetched_kb']:>12}{r['requests']:>10}{r['ms']:>10}")
+    finally:
+        server.should_exit = True
+        thread.join(timeout=5)
+
+
+# 実行方法:
+# poetry run python src/research/benchmark/log_fetch.py
+#
+# 計測結果の例（Linux, Python 3.13, localhostの代替サーバー, 3回の中央値）:
+# mode               lines    log KB  fetched KB  requests        ms
+# full                2000     164.6       164.6         1     102.5
+# tail                2000     164.6        64.0         2      59.0
+# tail(no range)      2000     164.6       164.6         2      87.3
+# full               20000    1668.3      1668.3         1     700.3
+# tail               20000    1668.3        64.0         2     215.7
+# tail(no range)     20000    1668.3      1668.3         2     752.3
+# full              200000   16880.3     16782.5         1    5396.5
+# tail              200000   16880.3       320.0         3    1881.8
+# tail(no range)    200000   16880.3     16782.5         2    6577.9
+# 所要時間には代替サーバーがログを合成する時間も含まれる。Rangeに対応しない場合のtailは、fullとほぼ同じ転送量と時間になる
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+APIサーバーからGitHubToolへ大きなfailure_reasonを返す際の、ログ1MBあたりの所要時間と転送量をエンコード方式ごとに計測するスクリプト。
+サーバー側のシリアライズと圧縮、localhostの転送、クライアント側の展開とデコード、pydanticの検証までを含めて計測する。
+    baseline      : 変更前と同じ（標準のJSONResponse、圧縮なし、resp.json()からモデルを作る）
+    json          : orjson、圧縮なし、model_validate_json
+    json+gzip     : orjson、gzip
+    json+zstd     : orjson、zstd
+    msgpack       : MessagePack、圧縮なし
+    msgpack+zstd  : MessagePack、zstd（GitHubToolのデフォルト）
+GitHub APIは呼ばないため、GITHUB_TOKENやネットワークは不要。
+"""
+import argparse
+import random
+import socket
+import statistics
+import threading
+import time
+import requests
+import urllib3
+import uvicorn
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from research.server.encoding import MSGPACK_MEDIA_TYPE, EncodingMiddleware, NegotiatedResponse
+from research.server.github_api import WorkflowResponse
+from research.tools.github import GitHubTool, WorkflowResult
+
+VARIANTS = {
+    "baseline": ("application/json", "identity"),
+    "json": ("application/json", "identity"),
+    "json+gzip": ("application/json", "gzip"),
+    "json+zstd": ("application/json", "zstd"),
+    "msgpack": (MSGPACK_MEDIA_TYPE, "identity"),
+    "msgpack+zstd": (MSGPACK_MEDIA_TYPE, "zstd"),
+}
+
+
+def make_log(size_mb: float) -> str:
+    """実際のジョブログに近い（タイムスタンプ付きで似た行が続く）テキストを作る"""
+    rng = random.Random(0)
+    lines = []
+    size = 0
+    i = 0
+    while size < size_mb * 1024 * 1024:
+        line = (f"2025-01-01T00:{i // 6000 % 60:02d}:{i // 100 % 60:02d}.{i % 100:02d}00000Z "
+                f"tests/test_module_{rng.randint(0, 50)}.py::test_case_{i} PASSED [{i % 100:3d}%] \"value\"\t{rng.random():.6f}")
+        lines.append(line)
+        size += len(line) + 1
+        i += 1
+    return "\n".join(lines)
+
+
+def make_app(payloads: dict[float, str]) -> FastAPI:
+    app = FastAPI(default_response_class=NegotiatedResponse)
+    app.add_middleware(EncodingMiddleware)
+
+    def response(size: float) -> WorkflowResponse:
+        return WorkflowResponse(status="completed", message="ワークフロー結果取得成功", conclusion="failure",
+                                failure_reason=payloads[size], log_paths=["log/x.log"])
+
+    @app.get("/baseline", response_model=WorkflowResponse, response_class=JSONResponse)
+    def baseline(size: float):
+        return response(size)
+
+    @app.get("/negotiated", response_model=WorkflowResponse)
+    def negotiated(size: float):
+        return response(size)
+
+    return app
+
+
+def measure(base_url: str, variant: str, size: float, expected_chars: int, calls: int) -> dict:
+    accept, encoding = VARIANTS[variant]
+    path = "/baseline" if variant == "baseline" else "/negotiated"
+    session = requests.Session()
+    latencies = []
+    wire = 0
+    for _ in range(calls):
+        start = time.perf_counter()
+        resp = session.get(f"{base_url}{path}", params={"size": size}, headers={"Accept": accept, "Accept-Encoding": encoding})
+        # Content-Lengthは圧縮後の転送バイト数（展開はrequestsが行う）
+        wire = int(resp.headers["content-length"])
+        if variant == "baseline":
+            result = WorkflowResult(**resp.json())
+        else:
+            result = GitHubTool._parse(resp, WorkflowResult)
+        latencies.append(time.perf_counter() - start)
+        assert len(result.failure_reason) == expected_chars
+    session.close()
+    median = statistics.median(latencies)
+    return {
+        "variant": variant,
+        "size_mb": size,
+        "ms_per_mb": round(median * 1000 / size, 2),
+        "wire_bytes_per_mb": int(wire / size),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=float, nargs="+", default=[1, 4, 16], help="failure_reasonのサイズ（MB）")
+    parser.add_argument("--calls", type=int, default=10)
+    args = parser.parse_args()
+    payloads = {size: make_log(size) for size in args.sizes}
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(make_app(payloads), host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    base_url = f"http://127.0.0.1:{port}"
+
+    print(f"{'variant':<14}{'size(MB)':>10}{'ms/MB':>10}{'wire KB/MB':>12}")
+    # requests（urllib3）がzstdを展開できない環境ではzstdの計測を省く
+    variants = [v for v in VARIANTS if "zstd" not in v or "zstd" in urllib3.util.request.ACCEPT_ENCODING]
+    try:
+        for size in args.sizes:
+            for variant in variants:
+                r = measure(base_url, variant, size, len(payloads[size]), args.calls)
+                print(f"{variant:<14}{size:>10}{r['ms_per_mb']:>10}{r['wire_bytes_per_mb'] // 1024:>12}")
+    finally:
+        server.should_exit = True
+        thread.join(timeout=5)
+
+
+# 実行方法:
+# poetry run python src/research/benchmark/response_encoding.py
+#
+# 計測結果の例（Linux, Python 3.13, localhost, 10回の中央値）:
+# variant         size(MB)     ms/MB  wire KB/MB
+# baseline              16     15.68        1064
+# json                  16      6.12        1064
+# json+gzip             16     22.55         124
+# json+zstd             16     10.47         120
+# msgpack               16      3.39        1024
+# msgpack+zstd          16      7.46         121
+# localhostでは圧縮・展開の時間が転送の削減分を上回るため、GitHubToolは別ホストのサーバーの場合のみ圧縮を受け付ける
+if __name__ == "__main__":
+    main()
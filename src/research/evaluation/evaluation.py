@@ -204,9 +204,8 @@ def evaluate_multiple(repos: dict[int, str], language: str) -> list[WorkflowStat
 
 def delete_remote_repo(language_repo_dict: dict[str, dict[int, str]]):
     github = GitHubTool()
-    for language, repos in language_repo_dict.items():
-        for i, repo_url in repos.items():
-            github.delete_remote_repository(repo_url)
+    repo_urls = [repo_url for repos in language_repo_dict.values() for repo_url in repos.values()]
+    github.delete_remote_repositories(repo_urls)
 
 def yml_file_count_words(repo_url: str, ref_list: list[str]) -> list[int]:
     github = GitHubTool()
@@ -1,6 +1,7 @@
-import requests
 import os
 from research.tools.github import GitHubTool
+from research.tools.metadata_cache import get_metadata_cache
+from research.server.http_client import get_http_client, github_headers
 from collections import Counter
 from dotenv import load_dotenv
 
@@ -11,8 +12,11 @@ GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
 if not GITHUB_TOKEN:
     raise ValueError("環境変数 GITHUB_TOKEN を設定してください")
 
-HEADERS = {"Authorization": f"token {GITHUB_TOKEN}"}
+HEADERS = github_headers()
+# レート制限を追跡する共有クライアント（残り回数を使い切った場合は失敗させずに解除を待つ）
+http = get_http_client()
 github = GitHubTool()
+cache = get_metadata_cache()
 
 def fetch_language_distribution(
     github_token: str = GITHUB_TOKEN,
@@ -45,7 +49,7 @@ def fetch_language_distribution(
     """
 
     query = f"stars:>{min_stars} pushed:{year}-01-01..{year}-12-31"
-    url = "https://api.github.com/search/repositories"
+    url = "/search/repositories"
 
     languages = []
 
@@ -57,7 +61,7 @@ def fetch_language_distribution(
             "per_page": per_page,
             "page": page,
         }
-        response = requests.get(url, headers=HEADERS, params=params)
+        response = http.get(url, headers=HEADERS, params=params)
 
         if response.status_code != 200:
             print(f"Error {response.status_code}: {response.text}")
@@ -78,7 +82,7 @@ def fetch_language_distribution(
     return dict(counter)
 def search_repositories(query: str, per_page: int = 10, page: int = 1):
     """GitHub API でリポジトリを検索する関数"""
-    url = "https://api.github.com/search/repositories"
+    url = "/search/repositories"
     params = {
         "q": query,
         "sort": "stars",
@@ -86,15 +90,19 @@ def search_repositories(query: str, per_page: int = 10, page: int = 1):
         "per_page": per_page,
         "page": page
     }
-    response = requests.get(url, headers=HEADERS, params=params)
+    response = http.get(url, headers=HEADERS, params=params)
     response.raise_for_status()
     return response.json()
 
 def get_languages(repo_full_name: str):
-    """リポジトリの言語ごとのコード量を取得"""
-    url = f"https://api.github.com/repos/{repo_full_name}/languages"
-    response = requests.get(url, headers=HEADERS)
+    """リポジトリの言語ごとのコード量を取得（キャッシュがあればAPIを呼ばない）"""
+    cached = cache.get(repo_full_name, "languages")
+    if cached is not None:
+        return cached
+    url = f"/repos/{repo_full_name}/languages"
+    response = http.get(url, headers=HEADERS)
     if response.status_code == 200:
+        cache.set(repo_full_name, "languages", response.json())
         return response.json()
     else:
         print(f"Error {response.status_code} for {repo_full_name}")
@@ -111,30 +119,41 @@ def main_language_ratio(repo_full_name: str, threshold: float = 0.7):
     ratio = main_size / total if total > 0 else 0.0
     return main_lang, ratio, ratio >= threshold
 
+def get_tree(repo_full_name: str):
+    """
+    リポジトリのファイルツリー（pathとtypeのみ）を取得する。
+    ファイル数・フォルダ数・ビルドテスト判定で同じツリーを使うため、キャッシュして1回だけ取得する。
+    """
+    cached = cache.get(repo_full_name, "tree")
+    if cached is not None:
+        return cached
+    url = f"/repos/{repo_full_name}/git/trees/HEAD"
+    response = http.get(url, headers=HEADERS, params={"recursive": 1})
+    if response.status_code != 200:
+        print(f"Error {response.status_code} for {repo_full_name}")
+        return None
+    tree = [{"path": item["path"], "type": item["type"]} for item in response.json().get("tree", [])]
+    cache.set(repo_full_name, "tree", tree)
+    return tree
+
 def get_file_count(repo_full_name: str):
     """リポジトリのファイル数を取得"""
-    url = f"https://api.github.com/repos/{repo_full_name}/git/trees/HEAD?recursive=1"
-    response = requests.get(url, headers=HEADERS)
-    if response.status_code == 200:
-        tree = response.json().get("tree", [])
+    tree = get_tree(repo_full_name)
+    if tree is not None:
         return sum(1 for item in tree if item["type"] == "blob")
     else:
-        print(f"Error {response.status_code} for {repo_full_name}")
         return None
 
 def get_root_folder_count(repo_full_name: str):
     """ルートディレクトリのフォルダ数を取得"""
-    url = f"https://api.github.com/repos/{repo_full_name}/git/trees/HEAD?recursive=1"
-    response = requests.get(url, headers=HEADERS)
-    if response.status_code == 200:
-        tree = response.json().get("tree", [])
+    tree = get_tree(repo_full_name)
+    if tree is not None:
         root_folders = set()
         for item in tree:
             if item["type"] == "tree" and "/" not in item["path"]:
                 root_folders.add(item["path"])
         return len(root_folders)
     else:
-        print(f"Error {response.status_code} for {repo_full_name}")
         return None
 
 def is_build_test_repo(repo_full_name: str):
@@ -156,13 +175,10 @@ def is_build_test_repo(repo_full_name: str):
         ビルド・テストジョブが作成可能なら True、そうでなければ False
     """
 
-    url = f"https://api.github.com/repos/{repo_full_name}/git/trees/HEAD?recursive=1"
-    response = requests.get(url, headers=HEADERS)
-    if response.status_code != 200:
-        print(f"Error {response.status_code} for {repo_full_name}")
+    tree = get_tree(repo_full_name)
+    if tree is None:
         return False
 
-    tree = response.json().get("tree", [])
     files = [item["path"] for item in tree if item["type"] == "blob"]
 
     # === 言語ごとのビルド設定ファイル ===
@@ -244,6 +260,10 @@ def main():
         for page in range(1, 11):  # 最大10ページまで
             result = search_repositories(query, per_page=100, page=page)
             repo_count_all += len(result["items"])
+            # キャッシュにないリポジトリの言語情報を1回のリクエストでまとめて取得する（結果はキャッシュに保存される）
+            missing = [repo["html_url"] for repo in result["items"] if cache.get(repo["full_name"], "languages") is None]
+            if missing:
+                github.get_repositories_info(missing)
             for repo in result["items"]:
                 name = repo["full_name"]
                 stars = repo["stargazers_count"]
@@ -278,13 +298,16 @@ def main():
             if repo_count_filtered >= repo_num:
                 break
         print(f"\n=== 合計 {repo_count_all} 件のリポジトリを検索し、条件を満たしたリポジトリは {len(repo_url_dict.get(lang, []))} 件でした ===")
+    # 選んだリポジトリをまとめてforkし、cloneできる状態になるまで待つ
+    all_urls = [url for repo_url_list in repo_url_dict.values() for url in repo_url_list]
+    fork_results = dict(zip(all_urls, github.fork_repositories(all_urls)))
     # コピペしやすい形に整形してファイルに出力
     filename = "src/research/evaluation/repo_urls.txt"
     with open(filename, "w", encoding="utf-8") as f:
         for lang, repo_url_list in repo_url_dict.items():
             f.write(f"# {lang} リポジトリのコピー用リポジトリURLリスト\n")
             for i, repo_url in enumerate(repo_url_list, 1):
-                result = github.fork_repository(repo_url)
+                result = fork_results[repo_url]
                 if result.status == "success":
                     f.write(f'{i}: "{result.fork_url}",\n')
                 else:
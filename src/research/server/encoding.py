@@ -0,0 +1,128 @@
+"""
+GitHubToolとAPIサーバー間のレスポンスの形式と圧縮を、リクエストヘッダーに応じて切り替えるモジュール。
+failure_reasonは数MBになることがあるため、
+    Accept: application/msgpack           → MessagePack（ormsgpack）、それ以外はorjsonでJSONにする
+    Accept-Encoding: zstd / gzip          → 一定サイズ以上の本文をzstd（優先）またはgzipで圧縮する
+とし、エンコードとデコード、転送の時間を減らす。
+"""
+import contextvars
+import gzip
+import os
+import orjson
+import ormsgpack
+import zstandard
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import JSONResponse
+
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+# 圧縮する本文の最小バイト数（小さいレスポンスは圧縮の手間の方が大きい）
+COMPRESSION_MIN_BYTES = int(os.environ.get("API_COMPRESSION_MIN_BYTES", "1024"))
+ZSTD_LEVEL = int(os.environ.get("API_ZSTD_LEVEL", "3"))
+GZIP_LEVEL = int(os.environ.get("API_GZIP_LEVEL", "6"))
+
+# 処理中のリクエストがMessagePackを受け付けるか（EncodingMiddlewareが設定する）
+_accept_msgpack: contextvars.ContextVar[bool] = contextvars.ContextVar("accept_msgpack", default=False)
+
+
+class NegotiatedResponse(JSONResponse):
+    """
+    リクエストがMessagePackを受け付ける場合はMessagePack、それ以外はorjsonでJSONにするレスポンス。
+    FastAPIのdefault_response_classに指定して使う。
+    """
+
+    def __init__(self, content, *args, **kwargs):
+        self.msgpack = _accept_msgpack.get()
+        if self.msgpack:
+            self.media_type = MSGPACK_MEDIA_TYPE
+        super().__init__(content, *args, **kwargs)
+
+    def render(self, content) -> bytes:
+        if self.msgpack:
+            return ormsgpack.packb(content, option=ormsgpack.OPT_NON_STR_KEYS)
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+def _accepts(header: str, token: str) -> bool:
+    """Accept/Accept-Encodingヘッダーがtokenを（q=0以外で）含むか"""
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        if name.strip().lower() == token:
+            return params.replace(" ", "") not in ("q=0", "q=0.0")
+    return False
+
+
+def choose_encoding(accept_encoding: str) -> str | None:
+    """Accept-Encodingから使う圧縮方式（zstd, gzip, None）を選ぶ"""
+    for encoding in ("zstd", "gzip"):
+        if _accepts(accept_encoding, encoding):
+            return encoding
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+class EncodingMiddleware:
+    """
+    Acceptヘッダーからレスポンスの形式を決め、Accept-Encodingに応じて本文を圧縮するASGIミドルウェア。
+    Server-Sent Eventsなどのストリーミングや、既に圧縮済みのレスポンスはそのまま流す。
+    """
+
+    def __init__(self, app, min_bytes: int = COMPRESSION_MIN_BYTES):
+        self.app = app
+        self.min_bytes = min_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        token = _accept_msgpack.set(_accepts(headers.get("accept", ""), MSGPACK_MEDIA_TYPE))
+        encoding = choose_encoding(headers.get("accept-encoding", ""))
+        start = None
+        chunks: list[bytes] = []
+        passthrough = encoding is None
+
+        async def send_wrapper(message):
+            nonlocal start, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                response_headers = Headers(raw=message["headers"])
+                if "content-encoding" in response_headers or response_headers.get("content-type", "").startswith("text/event-stream"):
+                    passthrough = True
+                    await send(message)
+                    return
+                start = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+            chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+            body = b"".join(chunks)
+            response_headers = MutableHeaders(raw=start["headers"])
+            if len(body) >= self.min_bytes:
+                body = compress(body, encoding)
+                response_headers["Content-Encoding"] = encoding
+                response_headers["Content-Length"] = str(len(body))
+                response_headers.add_vary_header("Accept-Encoding")
+            await send(start)
+            await send({"type": "http.response.body", "body": body})
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _accept_msgpack.reset(token)
+
+
+def decode_body(content: bytes, content_type: str | None):
+    """レスポンスの本文をContent-Typeに応じてMessagePackまたはJSONとしてデコードする（圧縮はHTTPクライアントが展開済み）"""
+    if (content_type or "").startswith(MSGPACK_MEDIA_TYPE):
+        return ormsgpack.unpackb(content)
+    return orjson.loads(content)
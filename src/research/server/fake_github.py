@@ -0,0 +1,982 @@
+"""
+オフラインで負荷試験や遅延の再現を行うための、GitHub REST/GraphQL APIの代替サーバー。
+github_api.pyとrepo_selector.pyが使うエンドポイント（リポジトリ、ブランチ、topics、languages、git tree、検索、
+Actionsのrun/job/ログとrunのキャンセル、workflow_dispatch、プルリクエスト、フォーク、削除、GraphQL、check run、rate_limit）を実装する。
+
+記録したフィクスチャ（recordサブコマンドで実際のAPIから保存したJSON）があればその内容を返し、
+ないリポジトリやcommit SHAは名前から決まる内容を合成して返す（同じ名前なら毎回同じ内容になる）。
+遅延、5xxエラー、プライマリ・セカンダリのレート制限は環境変数FAKE_GITHUB_*か POST /_fake/config で注入する。
+
+使い方:
+    uvicorn research.server.fake_github:app --port 8001
+    export GITHUB_API_BASE_URL=http://127.0.0.1:8001   # github_api.pyとrepo_selector.pyの接続先を切り替える
+
+    # フィクスチャの記録（GITHUB_TOKENを使って実際のAPIから取得する）
+    poetry run python src/research/server/fake_github.py record owner/repo -o fixtures.json
+"""
+import asyncio
+import hashlib
+import io
+import itertools
+import json
+import os
+import random
+import re
+import threading
+import time
+import zipfile
+from datetime import datetime, timezone
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse, RedirectResponse
+from pydantic import BaseModel, Field
+
+# 記録したフィクスチャ（JSONファイル、またはJSONファイルを置いたディレクトリ）
+FAKE_FIXTURES = os.environ.get("FAKE_GITHUB_FIXTURES")
+# ログのリダイレクト先のベースURL（未設定時はこのサーバー自身）。APIと別のホストにするとRateGovernorの対象外になる
+FAKE_BLOB_BASE_URL = os.environ.get("FAKE_GITHUB_BLOB_BASE_URL")
+# フォークの作成先に使う認証ユーザー名
+FAKE_USER = os.environ.get("FAKE_GITHUB_USER", "fake-user")
+
+_LANGUAGES = ["Python", "JavaScript", "TypeScript", "Java", "Go", "Rust", "C++", "Ruby"]
+_BUILD_FILES = {
+    "Python": "pyproject.toml", "JavaScript": "package.json", "TypeScript": "package.json", "Java": "pom.xml",
+    "Go": "go.mod", "Rust": "Cargo.toml", "C++": "CMakeLists.txt", "Ruby": "Gemfile",
+}
+_EXTENSIONS = {"Python": "py", "JavaScript": "js", "TypeScript": "ts", "Java": "java", "Go": "go", "Rust": "rs", "C++": "cpp", "Ruby": "rb"}
+# 合成するジョブのstep（名前, 所要秒数）。testジョブは4番目のstepで失敗する
+_STEPS = [("Set up job", 5), ("Run actions/checkout@v4", 3), ("Install dependencies", 40), ("Run tests", 120), ("Complete job", 1)]
+_FAILING_STEP = 4
+# 合成するジョブと、runの実行時間のうちそのジョブが完了するまでの割合（testはbuildより先に完了する）
+_JOBS = [("build", 1.0), ("test", 0.5)]
+_SEARCH_LIMIT = 1000
+
+
+class FakeGitHubConfig(BaseModel):
+    """注入する遅延・エラー・レート制限と、合成するrunの設定"""
+    latency_ms: float = Field(0.0, description="全てのリクエストに加える遅延（ミリ秒）")
+    latency_jitter_ms: float = Field(0.0, description="遅延に加える一様乱数の幅（ミリ秒）")
+    error_rate: float = Field(0.0, description="5xxエラーを返す確率（0〜1）")
+    error_status: int = Field(502, description="注入するエラーのステータスコード")
+    rate_limit: int = Field(5000, description="core/graphqlの期間あたりのリクエスト数の上限（searchはこの1/100、最低1）")
+    rate_limit_window: float = Field(3600.0, description="レート制限の期間（秒）")
+    secondary_rate: float = Field(0.0, description="セカンダリレート制限を返す確率（0〜1）")
+    secondary_retry_after: int = Field(1, description="セカンダリレート制限のRetry-After（秒）")
+    run_queued_seconds: float = Field(0.0, description="合成したrunがqueuedのままの秒数")
+    run_seconds: float = Field(0.0, description="合成したrunがin_progressのままの秒数")
+    run_conclusion: str = Field("failure", description="合成したrunの結果（success, failureなど）")
+    fork_ready_seconds: float = Field(0.0, description="forkの作成後、コピー中（ブランチやツリーの取得が409）のままの秒数")
+    log_lines: int = Field(2000, description="合成するジョブログの行数")
+    log_ranges: bool = Field(True, description="ログのダウンロード先がRangeヘッダーに対応するか（Falseの場合は常に全体を200で返す）")
+    seed: int = Field(0, description="エラー注入と遅延に使う乱数のシード")
+
+    @classmethod
+    def from_env(cls) -> "FakeGitHubConfig":
+        """FAKE_GITHUB_<フィールド名の大文字> の環境変数で上書きした設定を返す"""
+        values = {}
+        for name in cls.model_fields:
+            env = os.environ.get(f"FAKE_GITHUB_{name.upper()}")
+            if env is not None:
+                values[name] = env
+        return cls(**values)
+
+
+def _seed_of(name: str) -> int:
+    return int.from_bytes(hashlib.sha256(name.lower().encode()).digest()[:8], "big")
+
+
+def _sha(*parts) -> str:
+    return hashlib.sha1(":".join(str(p) for p in parts).encode()).hexdigest()
+
+
+def _iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _synth_repo(owner: str, repo: str) -> dict:
+    """名前から決まるリポジトリの内容（リポジトリ情報、言語、topics、ファイルツリー）を合成する"""
+    rng = random.Random(_seed_of(f"{owner}/{repo}"))
+    main = rng.choice(_LANGUAGES)
+    others = rng.sample([lang for lang in _LANGUAGES if lang != main], 2)
+    main_size = rng.randint(50_000, 5_000_000)
+    languages = {main: main_size, others[0]: main_size // rng.randint(5, 50), others[1]: main_size // rng.randint(60, 500)}
+    ext = _EXTENSIONS[main]
+    paths = ["README.md", ".github/workflows/ci.yml", _BUILD_FILES[main]]
+    paths += [f"src/module_{i}/file_{j}.{ext}" for i in range(rng.randint(2, 8)) for j in range(rng.randint(3, 15))]
+    paths += [f"tests/test_{i}.{ext}" for i in range(rng.randint(2, 20))]
+    dirs = sorted({"/".join(p.split("/")[:k]) for p in paths for k in range(1, p.count("/") + 1)})
+    tree = [{"path": d, "mode": "040000", "type": "tree", "sha": _sha(owner, repo, d)} for d in dirs]
+    tree += [{"path": p, "mode": "100644", "type": "blob", "sha": _sha(owner, repo, p), "size": rng.randint(100, 20_000)} for p in sorted(paths)]
+    created = datetime(2015, 1, 1, tzinfo=timezone.utc).timestamp() + rng.randint(0, 8 * 365 * 86400)
+    return {
+        "repo": {
+            "description": f"Synthetic repository {owner}/{repo}",
+            "stargazers_count": rng.randint(100, 50_000),
+            "forks_count": rng.randint(0, 5_000),
+            "open_issues_count": rng.randint(0, 500),
+            "default_branch": "main",
+            "created_at": _iso(created),
+            "updated_at": _iso(created + rng.randint(0, 365 * 86400)),
+            "pushed_at": _iso(created + rng.randint(0, 365 * 86400)),
+            "language": main,
+            "fork": False,
+            "archived": False,
+            "disabled": False,
+        },
+        "languages": languages,
+        "topics": sorted(rng.sample(["cli", "library", "testing", "web", "ml", "tooling", "api"], 2)),
+        "tree": tree,
+        "runs": [],
+        "jobs": {},
+        "logs": {},
+        "check_runs": {},
+        "annotations": {},
+    }
+
+
+def _int_keys(value: dict) -> dict:
+    return {int(k): v for k, v in (value or {}).items()}
+
+
+def load_fixtures(path: str | None) -> dict[str, dict]:
+    """
+    recordで保存したフィクスチャを読み込む。
+
+    Args:
+        path (str|None): JSONファイル、またはJSONファイルを置いたディレクトリ
+
+    Returns:
+        dict[str, dict]: owner/repo（小文字）ごとのリポジトリの内容
+    """
+    if not path:
+        return {}
+    files = [path]
+    if os.path.isdir(path):
+        files = sorted(os.path.join(path, name) for name in os.listdir(path) if name.endswith(".json"))
+    repos = {}
+    for file in files:
+        with open(file, encoding="utf-8") as f:
+            data = json.load(f)
+        for full_name, entry in data.get("repos", {}).items():
+            owner, repo = full_name.split("/", 1)
+            # 記録されていない項目は合成した内容で補う
+            merged = _synth_repo(owner, repo)
+            merged["repo"].update({"full_name": full_name, **entry.get("repo", {})})
+            for key in ("languages", "topics", "tree", "runs"):
+                if key in entry:
+                    merged[key] = entry[key]
+            for key in ("jobs", "logs", "check_runs", "annotations"):
+                merged[key] = _int_keys(entry.get(key))
+            repos[full_name.lower()] = merged
+    return repos
+
+
+class FakeGitHubState:
+    """サーバーが保持するリポジトリ、run、レート制限の状態と統計"""
+
+    def __init__(self, config: FakeGitHubConfig, fixtures: str | None = FAKE_FIXTURES):
+        self.config = config
+        self.fixtures = fixtures
+        self.reset()
+
+    def reset(self) -> None:
+        self._lock = threading.Lock()
+        self.rng = random.Random(self.config.seed)
+        self.repos: dict[str, dict] = load_fixtures(self.fixtures)
+        self.deleted: set[str] = set()
+        self.runs: dict[int, tuple[str, dict]] = {}
+        self.jobs: dict[int, tuple[str, int, dict]] = {}
+        for key, entry in self.repos.items():
+            for run in entry["runs"]:
+                self.runs[run["id"]] = (key, run)
+            for run_id, jobs in entry["jobs"].items():
+                for job in jobs:
+                    self.jobs[job["id"]] = (key, run_id, job)
+        self._ids = itertools.count(max([1_000_000, *self.runs]) + 1)
+        self._rate: dict[str, list[float]] = {}
+        self._log_cache: dict[int, list[tuple[int, str, str]]] = {}
+        self.stats = {"requests": {}, "injected_errors": 0, "secondary_limited": 0, "rate_limited": 0, "not_modified": 0}
+
+    # --- リポジトリ ---
+
+    def repo(self, owner: str, repo: str) -> dict | None:
+        """リポジトリの内容を返す（未知のものは合成して保存する）。削除済みならNone"""
+        key = f"{owner}/{repo}".lower()
+        with self._lock:
+            if key in self.deleted:
+                return None
+            entry = self.repos.get(key)
+            if entry is None:
+                entry = self.repos[key] = _synth_repo(owner, repo)
+                entry["repo"]["full_name"] = f"{owner}/{repo}"
+            return entry
+
+    def fork(self, owner: str, repo: str) -> dict | None:
+        source = self.repo(owner, repo)
+        if source is None:
+            return None
+        key = f"{FAKE_USER}/{repo}".lower()
+        with self._lock:
+            self.deleted.discard(key)
+            fork = {**source, "repo": {**source["repo"], "full_name": f"{FAKE_USER}/{repo}", "fork": True,
+                                       "parent": {"full_name": source["repo"].get("full_name", f"{owner}/{repo}")}},
+                    "runs": [], "jobs": {}, "logs": {}, "check_runs": {}, "annotations": {}, "heads": {},
+                    "ready_at": time.time() + self.config.fork_ready_seconds}
+            self.repos[key] = fork
+        return fork
+
+    def delete(self, owner: str, repo: str) -> bool:
+        key = f"{owner}/{repo}".lower()
+        if self.repo(owner, repo) is None:
+            return False
+        with self._lock:
+            self.repos.pop(key, None)
+            self.deleted.add(key)
+        return True
+
+    # --- Actions ---
+
+    def create_run(self, owner: str, repo: str, head_sha: str, branch: str, event: str = "push", run_seconds: float | None = None,
+                   workflow_id: int = 1) -> dict:
+        """runを合成する。状態は作成からの経過時間で queued → in_progress → completed と進む"""
+        entry = self.repo(owner, repo)
+        now = time.time()
+        with self._lock:
+            run_id = next(self._ids)
+            run = {
+                "id": run_id, "name": "CI" if workflow_id == 1 else f"Workflow {workflow_id}", "workflow_id": workflow_id, "head_branch": branch, "head_sha": head_sha, "event": event,
+                "run_attempt": 1, "check_suite_id": run_id, "created_at": _iso(now), "run_started_at": _iso(now),
+                "_created": now, "_run_seconds": self.config.run_seconds if run_seconds is None else run_seconds,
+            }
+            entry["runs"].append(run)
+            if event == "push":
+                entry.setdefault("heads", {})[branch] = head_sha
+            self.runs[run_id] = (f"{owner}/{repo}".lower(), run)
+        return run
+
+    def run_status(self, run: dict, fraction: float = 1.0) -> tuple[str, str | None]:
+        """
+        runの(status, conclusion)。合成したrunは経過時間から決める。
+
+        Args:
+            run (dict): run
+            fraction (float): 実行時間のうち完了までの割合（ジョブごとの状態を求める場合に使う）
+        """
+        if "_created" not in run:
+            return run.get("status", "completed"), run.get("conclusion")
+        if "_cancelled" in run:
+            return "completed", "cancelled"
+        elapsed = time.time() - run["_created"]
+        if elapsed < self.config.run_queued_seconds:
+            return "queued", None
+        if elapsed < self.config.run_queued_seconds + run.get("_run_seconds", self.config.run_seconds) * fraction:
+            return "in_progress", None
+        return "completed", self.config.run_conclusion
+
+    def cancel_run(self, run: dict) -> bool:
+        """未完了のrunをキャンセルする。既に完了していればFalse"""
+        if self.run_status(run)[0] == "completed":
+            return False
+        run["_cancelled"] = time.time()
+        return True
+
+    def run_updated_at(self, run: dict) -> float:
+        """合成したrunの最終更新時刻（完了したrunは完了時刻）"""
+        if "_cancelled" in run:
+            return run["_cancelled"]
+        if self.run_status(run)[0] == "completed":
+            return run["_created"] + self.config.run_queued_seconds + run.get("_run_seconds", self.config.run_seconds)
+        return time.time()
+
+    def run_jobs(self, key: str, run: dict) -> list[dict]:
+        """runのジョブ一覧。記録がなければbuild（成功）とtest（runの結果）を合成する"""
+        entry = self.repos.get(key)
+        if entry is not None and run["id"] in entry["jobs"]:
+            return entry["jobs"][run["id"]]
+        start = run.get("_created", time.time())
+        full_name = self.repos[key]["repo"]["full_name"] if key in self.repos else key
+        jobs = []
+        for i, (name, fraction) in enumerate(_JOBS):
+            status, conclusion = self.run_status(run, fraction)
+            job_conclusion = None if conclusion is None else ("success" if name == "build" and conclusion != "cancelled" else conclusion)
+            steps = []
+            t = start
+            for number, (step_name, seconds) in enumerate(_STEPS, start=1):
+                if job_conclusion is None:
+                    step_conclusion = None
+                elif job_conclusion == "success" or number < _FAILING_STEP or number == len(_STEPS):
+                    step_conclusion = "success"
+                elif number == _FAILING_STEP:
+                    step_conclusion = job_conclusion
+                else:
+                    step_conclusion = "skipped"
+                steps.append({"name": step_name, "number": number, "status": status, "conclusion": step_conclusion,
+                              "started_at": _iso(t), "completed_at": _iso(t + seconds - 1)})
+                t += seconds
+            jobs.append({
+                "id": run["id"] * 100 + i, "run_id": run["id"], "run_attempt": run.get("run_attempt", 1), "name": name,
+                "head_sha": run["head_sha"], "status": status, "conclusion": job_conclusion,
+                "started_at": _iso(start), "completed_at": _iso(t) if conclusion else None, "steps": steps,
+                "html_url": f"https://github.com/{full_name}/actions/runs/{run['id']}/job/{run['id'] * 100 + i}",
+            })
+        return jobs
+
+    def find_job(self, job_id: int) -> tuple[str, dict, dict] | None:
+        """ジョブのIDから(owner/repo, run, job)を返す"""
+        if job_id in self.jobs:
+            key, run_id, job = self.jobs[job_id]
+            return key, self.runs[run_id][1], job
+        found = self.runs.get(job_id // 100)
+        if found is None:
+            return None
+        key, run = found
+        for job in self.run_jobs(key, run):
+            if job["id"] == job_id:
+                return key, run, job
+        return None
+
+    def job_log(self, key: str, job: dict) -> list[tuple[int, str, str]]:
+        """
+        ジョブログをstepごとに返す。記録されたログがあればそれを1つのstepとして返す。
+
+        Returns:
+            list[tuple[int, str, str]]: (stepの番号, stepの名前, ログ本文)のリスト
+        """
+        entry = self.repos.get(key) or {}
+        if job["id"] in entry.get("logs", {}):
+            return [(1, job.get("name", "job"), entry["logs"][job["id"]])]
+        with self._lock:
+            cached = self._log_cache.get(job["id"])
+        if cached is not None:
+            return cached
+        rng = random.Random(job["id"])
+        total = max(self.config.log_lines, len(job["steps"]) * 4)
+        weights = [seconds for _, seconds in _STEPS]
+        parts = []
+        for step, weight in zip(job["steps"], weights):
+            if step["conclusion"] == "skipped":
+                continue
+            start = datetime.fromisoformat(step["started_at"]).timestamp()
+            end = datetime.fromisoformat(step["completed_at"]).timestamp() + 1
+            count = max(total * weight // sum(weights), 2)
+            messages = [f"##[group]Run {step['name']}"]
+            for n in range(count - 2):
+                if step["number"] == _FAILING_STEP:
+                    messages.append(f"tests/test_module_{n % 40}.py::test_case_{n} PASSED [{n * 100 // count:3d}%]")
+                else:
+                    messages.append(f"Collecting package-{rng.randint(0, 10_000)} (from -r requirements.txt (line {n + 1}))")
+            if step["conclusion"] == "failure":
+                messages += [
+                    f"FAILED tests/test_module_{rng.randint(0, 40)}.py::test_case_{rng.randint(0, 1000)} - AssertionError: expected 1 == 2",
+                    "=========================== 1 failed, 120 passed in 12.34s ===========================",
+                    "##[error]Process completed with exit code 1.",
+                ]
+            messages.append("##[endgroup]")
+            lines = []
+            for n, message in enumerate(messages):
+                ts = datetime.fromtimestamp(start + (end - start) * n / len(messages), tz=timezone.utc)
+                lines.append(f"{ts.strftime('%Y-%m-%dT%H:%M:%S')}.{ts.microsecond:06d}0Z {message}")
+            parts.append((step["number"], step["name"], "\n".join(lines) + "\n"))
+        with self._lock:
+            self._log_cache[job["id"]] = parts
+        return parts
+
+    # --- レート制限と統計 ---
+
+    def rate_limit_of(self, resource: str) -> int:
+        return max(self.config.rate_limit // 100, 1) if resource == "search" else self.config.rate_limit
+
+    def consume(self, resource: str, amount: int = 1) -> tuple[int, int, int]:
+        """
+        レート制限を消費する。
+
+        Returns:
+            tuple[int, int, int]: (上限, 残り回数（使い切った場合は負）, 補充時刻のUNIX秒)
+        """
+        now = time.time()
+        with self._lock:
+            window = self._rate.get(resource)
+            if window is None or window[0] + self.config.rate_limit_window <= now:
+                window = self._rate[resource] = [now, 0]
+            window[1] += amount
+            limit = self.rate_limit_of(resource)
+            return limit, int(limit - window[1]), int(window[0] + self.config.rate_limit_window)
+
+    def roll(self, probability: float) -> bool:
+        with self._lock:
+            return probability > 0 and self.rng.random() < probability
+
+    def latency(self) -> float:
+        with self._lock:
+            jitter = self.rng.uniform(0, self.config.latency_jitter_ms) if self.config.latency_jitter_ms else 0.0
+        return (self.config.latency_ms + jitter) / 1000
+
+    def count(self, name: str) -> None:
+        with self._lock:
+            self.stats[name] += 1
+
+    def count_request(self, request: Request) -> None:
+        # ルートのパス（/repos/{owner}/{repo}など）ごとに数える
+        route = f"{request.method} {getattr(request.scope.get('route'), 'path', request.url.path)}"
+        with self._lock:
+            self.stats["requests"][route] = self.stats["requests"].get(route, 0) + 1
+
+    def resources(self) -> dict:
+        now = time.time()
+        result = {}
+        for resource in ("core", "search", "graphql"):
+            with self._lock:
+                window = self._rate.get(resource)
+            limit = self.rate_limit_of(resource)
+            if window is None or window[0] + self.config.rate_limit_window <= now:
+                used, reset = 0, now + self.config.rate_limit_window
+            else:
+                used, reset = int(window[1]), window[0] + self.config.rate_limit_window
+            result[resource] = {"limit": limit, "remaining": max(limit - used, 0), "reset": int(reset), "used": used}
+        return result
+
+
+state = FakeGitHubState(FakeGitHubConfig.from_env())
+app = FastAPI(title="Fake GitHub API")
+
+
+def _resource_for(path: str) -> str:
+    if path.startswith("/search/"):
+        return "search"
+    if path == "/graphql":
+        return "graphql"
+    return "core"
+
+
+def _rate_headers(resource: str, limit: int, remaining: int, reset: int) -> dict:
+    return {
+        "X-RateLimit-Limit": str(limit),
+        "X-RateLimit-Remaining": str(max(remaining, 0)),
+        "X-RateLimit-Reset": str(reset),
+        "X-RateLimit-Used": str(limit - max(remaining, 0)),
+        "X-RateLimit-Resource": resource,
+    }
+
+
+@app.middleware("http")
+async def inject_faults(request: Request, call_next):
+    """遅延・エラー・レート制限を注入し、レート制限のヘッダーを付ける"""
+    path = request.url.path
+    if path.startswith("/_fake/") and not path.startswith("/_fake/blobs/"):
+        return await call_next(request)
+    delay = state.latency()
+    if delay > 0:
+        await asyncio.sleep(delay)
+    # ログのダウンロード先（Blobストレージ）と/rate_limitはレート制限を消費しない
+    if path.startswith("/_fake/blobs/") or path == "/rate_limit":
+        response = await call_next(request)
+        state.count_request(request)
+        return response
+    if state.roll(state.config.error_rate):
+        state.count("injected_errors")
+        return JSONResponse({"message": "Server Error"}, status_code=state.config.error_status)
+    if state.roll(state.config.secondary_rate):
+        state.count("secondary_limited")
+        return JSONResponse(
+            {"message": "You have exceeded a secondary rate limit. Please wait a few minutes before you try again."},
+            status_code=403, headers={"Retry-After": str(state.config.secondary_retry_after)})
+    resource = _resource_for(path)
+    limit, remaining, reset = state.consume(resource)
+    if remaining < 0:
+        state.consume(resource, -1)
+        state.count("rate_limited")
+        return JSONResponse({"message": "API rate limit exceeded for user."}, status_code=403,
+                            headers=_rate_headers(resource, limit, 0, reset))
+    response = await call_next(request)
+    state.count_request(request)
+    if response.status_code == 304:
+        # 条件付きリクエストで変化がなかった場合はレート制限を消費しない
+        limit, remaining, reset = state.consume(resource, -1)
+        state.count("not_modified")
+    response.headers.update(_rate_headers(resource, limit, remaining, reset))
+    return response
+
+
+def _json(request: Request, data, status_code: int = 200) -> Response:
+    """ETagを付けたJSONレスポンスを返す（If-None-Matchが一致すれば304）"""
+    body = json.dumps(data, ensure_ascii=False).encode()
+    etag = f'W/"{hashlib.md5(body).hexdigest()}"'
+    if request.method == "GET" and request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(body, status_code=status_code, media_type="application/json", headers={"ETag": etag})
+
+
+def _copying(request: Request, entry: dict) -> Response | None:
+    """作成直後のforkはGitHub側でコピー中のため、Gitの内容を返さず409にする"""
+    if entry.get("ready_at", 0.0) > time.time():
+        return _json(request, {"message": "Git Repository is empty.", "status": "409"}, 409)
+    return None
+
+
+def _not_found(request: Request) -> Response:
+    return _json(request, {"message": "Not Found", "documentation_url": "https://docs.github.com/rest"}, 404)
+
+
+def _base(request: Request) -> str:
+    return str(request.base_url).rstrip("/")
+
+
+def _repo_object(request: Request, entry: dict) -> dict:
+    """REST APIのリポジトリのオブジェクトを作る"""
+    info = entry["repo"]
+    full_name = info["full_name"]
+    owner = full_name.split("/", 1)[0]
+    return {
+        "id": _seed_of(full_name) % 1_000_000_000,
+        "name": full_name.split("/", 1)[1],
+        "full_name": full_name,
+        "owner": {"login": owner, "type": "User"},
+        "private": False,
+        "html_url": f"https://github.com/{full_name}",
+        "url": f"{_base(request)}/repos/{full_name}",
+        "clone_url": f"https://github.com/{full_name}.git",
+        "watchers_count": info.get("stargazers_count"),
+        "topics": entry["topics"],
+        **info,
+    }
+
+
+def _run_object(request: Request, key: str, run: dict) -> dict:
+    """runのオブジェクトを作る（URLはこのサーバーを指すように書き換える）"""
+    status, conclusion = state.run_status(run)
+    full_name = state.repos[key]["repo"]["full_name"] if key in state.repos else key
+    api = f"{_base(request)}/repos/{full_name}/actions/runs/{run['id']}"
+    obj = {k: v for k, v in run.items() if not k.startswith("_")}
+    obj.update({
+        "status": status,
+        "conclusion": conclusion,
+        "html_url": run.get("html_url") or f"https://github.com/{full_name}/actions/runs/{run['id']}",
+        "url": api,
+        "jobs_url": f"{api}/jobs",
+        "logs_url": f"{api}/logs",
+        "updated_at": run.get("updated_at") or _iso(state.run_updated_at(run) if "_created" in run else time.time()),
+    })
+    return obj
+
+
+@app.get("/rate_limit")
+def rate_limit(request: Request):
+    resources = state.resources()
+    return _json(request, {"resources": resources, "rate": resources["core"]})
+
+
+@app.get("/repos/{owner}/{repo}")
+def get_repo(owner: str, repo: str, request: Request):
+    entry = state.repo(owner, repo)
+    return _json(request, _repo_object(request, entry)) if entry else _not_found(request)
+
+
+@app.delete("/repos/{owner}/{repo}")
+def delete_repo(owner: str, repo: str, request: Request):
+    return Response(status_code=204) if state.delete(owner, repo) else _not_found(request)
+
+
+@app.get("/repos/{owner}/{repo}/branches/{branch:path}")
+def get_branch(owner: str, repo: str, branch: str, request: Request):
+    entry = state.repo(owner, repo)
+    if entry is None:
+        return _not_found(request)
+    copying = _copying(request, entry)
+    if copying:
+        return copying
+    head = entry.get("heads", {}).get(branch) or _sha(owner, repo, branch)
+    return _json(request, {"name": branch, "commit": {"sha": head}, "protected": False})
+
+
+@app.get("/repos/{owner}/{repo}/topics")
+def get_topics(owner: str, repo: str, request: Request):
+    entry = state.repo(owner, repo)
+    return _json(request, {"names": entry["topics"]}) if entry else _not_found(request)
+
+
+@app.get("/repos/{owner}/{repo}/languages")
+def get_languages(owner: str, repo: str, request: Request):
+    entry = state.repo(owner, repo)
+    return _json(request, entry["languages"]) if entry else _not_found(request)
+
+
+@app.get("/repos/{owner}/{repo}/git/trees/{ref:path}")
+def get_tree(owner: str, repo: str, ref: str, request: Request, recursive: str | None = None):
+    entry = state.repo(owner, repo)
+    if entry is None:
+        return _not_found(request)
+    copying = _copying(request, entry)
+    if copying:
+        return copying
+    tree = entry["tree"] if recursive else [item for item in entry["tree"] if "/" not in item["path"]]
+    return _json(request, {"sha": _sha(owner, repo, ref), "tree": tree, "truncated": False})
+
+
+@app.get("/search/repositories")
+def search_repositories(request: Request, q: str = "", per_page: int = 30, page: int = 1):
+    """
+    検索結果を返す。フィクスチャのリポジトリを先頭に、残りはfake-org/project-NNNNNをスター数の降順で合成する。
+    qのlanguage:とstars:>のみ解釈する。
+    """
+    per_page = min(per_page, 100)
+    if page * per_page > _SEARCH_LIMIT:
+        return _json(request, {"message": "Only the first 1000 search results are available"}, 422)
+    language = re.search(r"language:(\S+)", q)
+    min_stars = re.search(r"stars:>(\d+)", q)
+    language = language.group(1).lower() if language else None
+    min_stars = int(min_stars.group(1)) if min_stars else 0
+    items = []
+    for key in list(state.repos):
+        entry = state.repos[key]
+        info = entry["repo"]
+        if (language is None or (info.get("language") or "").lower() == language) and (info.get("stargazers_count") or 0) > min_stars:
+            items.append(_repo_object(request, entry))
+    items.sort(key=lambda item: item.get("stargazers_count") or 0, reverse=True)
+    start = (page - 1) * per_page
+    for n in range(max(start, len(items)), start + per_page):
+        entry = _synth_repo("fake-org", f"project-{n:05d}")
+        entry["repo"].update({"full_name": f"fake-org/project-{n:05d}", "stargazers_count": min_stars + (_SEARCH_LIMIT - n) * 10})
+        if language:
+            entry["repo"]["language"] = language.capitalize()
+        items.append(_repo_object(request, entry))
+    return _json(request, {"total_count": _SEARCH_LIMIT, "incomplete_results": False, "items": items[start:start + per_page]})
+
+
+@app.get("/repos/{owner}/{repo}/actions/runs")
+def list_runs(owner: str, repo: str, request: Request, head_sha: str | None = None, branch: str | None = None,
+              event: str | None = None, per_page: int = 30, page: int = 1):
+    """runの一覧。head_shaに一致するrunがなければ、そのcommitがpushされたものとしてrunを合成する"""
+    entry = state.repo(owner, repo)
+    if entry is None:
+        return _not_found(request)
+    key = f"{owner}/{repo}".lower()
+    if head_sha and not any(run["head_sha"] == head_sha for run in entry["runs"]):
+        state.create_run(owner, repo, head_sha, branch or entry["repo"].get("default_branch", "main"))
+    runs = [
+        run for run in entry["runs"]
+        if (head_sha is None or run["head_sha"] == head_sha)
+        and (branch is None or run.get("head_branch") == branch)
+        and (event is None or run.get("event") == event)
+    ]
+    runs.sort(key=lambda run: run["id"], reverse=True)
+    selected = runs[(page - 1) * per_page:page * per_page]
+    return _json(request, {"total_count": len(runs), "workflow_runs": [_run_object(request, key, run) for run in selected]})
+
+
+@app.get("/repos/{owner}/{repo}/actions/runs/{run_id}")
+def get_run(owner: str, repo: str, run_id: int, request: Request):
+    found = state.runs.get(run_id)
+    if found is None or found[0] != f"{owner}/{repo}".lower():
+        return _not_found(request)
+    return _json(request, _run_object(request, *found))
+
+
+@app.post("/repos/{owner}/{repo}/actions/runs/{run_id}/cancel")
+def cancel_run(owner: str, repo: str, run_id: int, request: Request):
+    found = state.runs.get(run_id)
+    if found is None or found[0] != f"{owner}/{repo}".lower():
+        return _not_found(request)
+    if not state.cancel_run(found[1]):
+        return _json(request, {"message": "Cannot cancel a workflow run that is completed."}, 409)
+    return _json(request, {}, 202)
+
+
+@app.get("/repos/{owner}/{repo}/actions/runs/{run_id}/jobs")
+def list_jobs(owner: str, repo: str, run_id: int, request: Request):
+    found = state.runs.get(run_id)
+    if found is None or found[0] != f"{owner}/{repo}".lower():
+        return _not_found(request)
+    jobs = state.run_jobs(*found)
+    return _json(request, {"total_count": len(jobs), "jobs": jobs})
+
+
+@app.get("/repos/{owner}/{repo}/actions/jobs/{job_id}")
+def get_job(owner: str, repo: str, job_id: int, request: Request):
+    found = state.find_job(job_id)
+    if found is None or found[0] != f"{owner}/{repo}".lower():
+        return _not_found(request)
+    return _json(request, found[2])
+
+
+@app.get("/repos/{owner}/{repo}/actions/runs/{run_id}/logs")
+def download_run_logs(owner: str, repo: str, run_id: int, request: Request):
+    found = state.runs.get(run_id)
+    if found is None or found[0] != f"{owner}/{repo}".lower() or state.run_status(found[1])[0] != "completed":
+        return _not_found(request)
+    return RedirectResponse(f"{FAKE_BLOB_BASE_URL or _base(request)}/_fake/blobs/runs/{run_id}.zip", status_code=302)
+
+
+@app.get("/repos/{owner}/{repo}/actions/jobs/{job_id}/logs")
+def download_job_logs(owner: str, repo: str, job_id: int, request: Request):
+    found = state.find_job(job_id)
+    if found is None or found[0] != f"{owner}/{repo}".lower() or found[2].get("status") != "completed":
+        return _not_found(request)
+    return RedirectResponse(f"{FAKE_BLOB_BASE_URL or _base(request)}/_fake/blobs/jobs/{job_id}.txt", status_code=302)
+
+
+@app.post("/repos/{owner}/{repo}/actions/workflows/{workflow_id}/dispatches")
+async def dispatch_workflow(owner: str, repo: str, workflow_id: str, request: Request):
+    entry = state.repo(owner, repo)
+    if entry is None:
+        return _not_found(request)
+    ref = (await request.json()).get("ref")
+    if not ref:
+        return _json(request, {"message": "Invalid request.\n\n\"ref\" wasn't supplied."}, 422)
+    state.create_run(owner, repo, _sha(owner, repo, ref, time.time()), ref, event="workflow_dispatch")
+    return Response(status_code=204)
+
+
+@app.post("/repos/{owner}/{repo}/pulls")
+async def create_pull(owner: str, repo: str, request: Request):
+    entry = state.repo(owner, repo)
+    if entry is None:
+        return _not_found(request)
+    data = await request.json()
+    if not data.get("head") or not data.get("base"):
+        return _json(request, {"message": "Validation Failed"}, 422)
+    number = next(state._ids)
+    return _json(request, {
+        "number": number, "state": "open", "title": data.get("title"), "body": data.get("body"),
+        "head": {"ref": data["head"]}, "base": {"ref": data["base"]},
+        "html_url": f"https://github.com/{entry['repo']['full_name']}/pull/{number}",
+        "url": f"{_base(request)}/repos/{entry['repo']['full_name']}/pulls/{number}",
+    }, 201)
+
+
+@app.post("/repos/{owner}/{repo}/forks")
+def create_fork(owner: str, repo: str, request: Request):
+    fork = state.fork(owner, repo)
+    return _json(request, _repo_object(request, fork), 202) if fork else _not_found(request)
+
+
+@app.get("/repos/{owner}/{repo}/check-suites/{check_suite_id}/check-runs")
+def list_check_runs(owner: str, repo: str, check_suite_id: int, request: Request):
+    """check run（=ジョブ）の一覧。記録がなければrunのジョブから作る（アノテーションは0件）"""
+    key = f"{owner}/{repo}".lower()
+    entry = state.repos.get(key)
+    if entry is None:
+        return _not_found(request)
+    if check_suite_id in entry["check_runs"]:
+        check_runs = entry["check_runs"][check_suite_id]
+    else:
+        run = next((r for _, r in state.runs.values() if r.get("check_suite_id") == check_suite_id), None)
+        if run is None:
+            return _not_found(request)
+        check_runs = [
+            {"id": job["id"], "name": job["name"], "status": job["status"], "conclusion": job["conclusion"],
+             "output": {"annotations_count": len(entry["annotations"].get(job["id"], []))}}
+            for job in state.run_jobs(key, run)
+        ]
+    return _json(request, {"total_count": len(check_runs), "check_runs": check_runs})
+
+
+@app.get("/repos/{owner}/{repo}/check-runs/{check_run_id}/annotations")
+def list_annotations(owner: str, repo: str, check_run_id: int, request: Request):
+    entry = state.repos.get(f"{owner}/{repo}".lower())
+    return _json(request, entry["annotations"].get(check_run_id, [])) if entry else _not_found(request)
+
+
+@app.post("/graphql")
+async def graphql(request: Request):
+    """repo_info.pyのクエリ（エイリアスごとのrepository）のみ解釈する"""
+    body = await request.json()
+    variables = body.get("variables") or {}
+    data = {}
+    errors = []
+    for alias, owner_var, name_var in re.findall(r"(\w+)\s*:\s*repository\(owner:\s*\$(\w+),\s*name:\s*\$(\w+)\)", body.get("query", "")):
+        owner, name = variables.get(owner_var), variables.get(name_var)
+        entry = state.repo(owner, name) if owner and name else None
+        if entry is None:
+            data[alias] = None
+            errors.append({"type": "NOT_FOUND", "path": [alias],
+                           "message": f"Could not resolve to a Repository with the name '{owner}/{name}'."})
+            continue
+        info = entry["repo"]
+        data[alias] = {
+            "nameWithOwner": info["full_name"],
+            "description": info.get("description"),
+            "stargazerCount": info.get("stargazers_count"),
+            "forkCount": info.get("forks_count"),
+            "issues": {"totalCount": info.get("open_issues_count") or 0},
+            "pullRequests": {"totalCount": 0},
+            "defaultBranchRef": {"name": info["default_branch"]} if info.get("default_branch") else None,
+            "url": f"https://github.com/{info['full_name']}",
+            "createdAt": info.get("created_at"),
+            "updatedAt": info.get("updated_at"),
+            "pushedAt": info.get("pushed_at"),
+            "isArchived": info.get("archived", False),
+            "isDisabled": info.get("disabled", False),
+            "repositoryTopics": {"nodes": [{"topic": {"name": topic}} for topic in entry["topics"]]},
+            "languages": {"edges": [{"size": size, "node": {"name": lang}}
+                                    for lang, size in sorted(entry["languages"].items(), key=lambda x: -x[1])]},
+        }
+    result = {"data": data}
+    if errors:
+        result["errors"] = errors
+    return _json(request, result)
+
+
+def _ranged(request: Request, content: bytes, media_type: str) -> Response:
+    """Rangeヘッダー（bytes=a-b, bytes=a-, bytes=-n）に対応したレスポンスを返す"""
+    total = len(content)
+    headers = {"Accept-Ranges": "bytes"} if state.config.log_ranges else {}
+    m = re.fullmatch(r"bytes=(\d*)-(\d*)", request.headers.get("range", "").strip())
+    if not state.config.log_ranges or not m or (not m.group(1) and not m.group(2)):
+        return Response(content, media_type=media_type, headers=headers)
+    if m.group(1):
+        start = int(m.group(1))
+        end = min(int(m.group(2)), total - 1) if m.group(2) else total - 1
+    else:
+        start, end = max(total - int(m.group(2)), 0), total - 1
+    if start >= total or start > end:
+        return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{total}"})
+    headers["Content-Range"] = f"bytes {start}-{end}/{total}"
+    return Response(content[start:end + 1], status_code=206, media_type=media_type, headers=headers)
+
+
+@app.get("/_fake/blobs/jobs/{job_id}.txt")
+def job_log_blob(job_id: int, request: Request):
+    found = state.find_job(job_id)
+    if found is None:
+        return Response(status_code=404)
+    key, _, job = found
+    content = "".join(text for _, _, text in state.job_log(key, job)).encode()
+    return _ranged(request, content, "text/plain")
+
+
+@app.get("/_fake/blobs/runs/{run_id}.zip")
+def run_log_blob(run_id: int, request: Request):
+    """GitHubと同じ構成（ジョブごとの全体ログと、ジョブ名のディレクトリ内のstepごとのログ）のzipを返す"""
+    found = state.runs.get(run_id)
+    if found is None:
+        return Response(status_code=404)
+    key, run = found
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as z:
+        for i, job in enumerate(state.run_jobs(key, run)):
+            parts = state.job_log(key, job)
+            z.writestr(f"{i}_{job['name']}.txt", "".join(text for _, _, text in parts))
+            for number, step_name, text in parts:
+                z.writestr(f"{job['name']}/{number}_{step_name.replace('/', '')}.txt", text)
+    return _ranged(request, buffer.getvalue(), "application/zip")
+
+
+@app.get("/_fake/config")
+def get_config() -> FakeGitHubConfig:
+    return state.config
+
+
+@app.post("/_fake/config")
+def update_config(values: dict) -> FakeGitHubConfig:
+    """設定を部分的に更新する（例: {"latency_ms": 200, "error_rate": 0.1}）"""
+    state.config = FakeGitHubConfig(**{**state.config.model_dump(), **values})
+    if "seed" in values:
+        state.rng = random.Random(state.config.seed)
+    return state.config
+
+
+@app.get("/_fake/stats")
+def get_stats() -> dict:
+    """ルートごとのリクエスト数と、注入したエラー・レート制限の回数を返す"""
+    return {**state.stats, "rate_limit": state.resources()}
+
+
+class FakePush(BaseModel):
+    repo: str = Field(..., description="owner/repo")
+    branch: str = Field(..., description="pushしたブランチ")
+    head_sha: str = Field(..., description="pushしたcommitのSHA")
+    run_seconds: float | None = Field(None, description="このpushで作成するrunの実行時間（秒）。未指定時はrun_seconds")
+    workflow_id: int = Field(1, description="作成するrunのワークフローのID（1以外はリポジトリの別のワークフローを模擬する）")
+
+
+@app.post("/_fake/push")
+def push(values: FakePush) -> dict:
+    """commitのpushを模擬する。ブランチの先頭をhead_shaにし、そのcommitのrunを作成する"""
+    owner, repo = values.repo.split("/", 1)
+    run = state.create_run(owner, repo, values.head_sha, values.branch, run_seconds=values.run_seconds, workflow_id=values.workflow_id)
+    return {"status": "success", "run_id": run["id"]}
+
+
+@app.post("/_fake/reset")
+def reset() -> dict:
+    """リポジトリ、run、レート制限、統計を初期状態（フィクスチャのみ）に戻す"""
+    state.reset()
+    return {"status": "success"}
+
+
+def record_fixtures(repos: list[str], runs_per_repo: int = 5) -> dict:
+    """
+    実際のGitHub APIからリポジトリの内容と最近のrun（ジョブ、失敗ジョブのログ、アノテーション）を取得し、フィクスチャにする。
+
+    Args:
+        repos (list[str]): owner/repoのリスト
+        runs_per_repo (int): リポジトリごとに記録するrunの数
+
+    Returns:
+        dict: load_fixturesで読み込める形式の辞書
+    """
+    from research.server.http_client import get_http_client, github_headers
+
+    http = get_http_client()
+    headers = github_headers()
+
+    def get(path: str, **params):
+        resp = http.get(path, headers=headers, params=params or None)
+        resp.raise_for_status()
+        return resp.json()
+
+    fixtures = {}
+    for full_name in repos:
+        repo = get(f"/repos/{full_name}")
+        entry = {
+            "repo": {k: repo.get(k) for k in (
+                "full_name", "description", "stargazers_count", "forks_count", "open_issues_count", "default_branch",
+                "created_at", "updated_at", "pushed_at", "language", "fork", "archived", "disabled")},
+            "languages": get(f"/repos/{full_name}/languages"),
+            "topics": get(f"/repos/{full_name}/topics").get("names", []),
+            "tree": get(f"/repos/{full_name}/git/trees/{repo['default_branch']}", recursive=1).get("tree", []),
+            "runs": [], "jobs": {}, "logs": {}, "check_runs": {}, "annotations": {},
+        }
+        for run in get(f"/repos/{full_name}/actions/runs", per_page=runs_per_repo).get("workflow_runs", []):
+            entry["runs"].append({k: run.get(k) for k in (
+                "id", "name", "head_branch", "head_sha", "event", "status", "conclusion", "run_attempt",
+                "check_suite_id", "html_url", "created_at", "updated_at", "run_started_at")})
+            jobs = get(f"/repos/{full_name}/actions/runs/{run['id']}/jobs").get("jobs", [])
+            entry["jobs"][run["id"]] = jobs
+            if run.get("conclusion") != "failure":
+                continue
+            for job in jobs:
+                if job.get("conclusion") == "failure":
+                    resp = http.get(f"/repos/{full_name}/actions/jobs/{job['id']}/logs", headers=headers)
+                    if resp.status_code == 200:
+                        entry["logs"][job["id"]] = resp.text
+            check_runs = get(f"/repos/{full_name}/check-suites/{run['check_suite_id']}/check-runs").get("check_runs", [])
+            entry["check_runs"][run["check_suite_id"]] = check_runs
+            for check_run in check_runs:
+                if (check_run.get("output") or {}).get("annotations_count"):
+                    entry["annotations"][check_run["id"]] = get(f"/repos/{full_name}/check-runs/{check_run['id']}/annotations")
+        fixtures[full_name] = entry
+    return {"recorded_at": _iso(time.time()), "repos": fixtures}
+
+
+# 使い方:
+# poetry run python src/research/server/fake_github.py serve --port 8001
+# poetry run python src/research/server/fake_github.py record owner/repo [owner/repo ...] -o fixtures.json
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="GitHub APIの代替サーバー")
+    sub = parser.add_subparsers(dest="command", required=True)
+    serve = sub.add_parser("serve", help="サーバーを起動する")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8001)
+    record = sub.add_parser("record", help="実際のAPIからフィクスチャを記録する")
+    record.add_argument("repos", nargs="+", help="owner/repo")
+    record.add_argument("-o", "--output", default="fixtures.json")
+    record.add_argument("--runs", type=int, default=5, help="リポジトリごとに記録するrunの数")
+    args = parser.parse_args()
+    if args.command == "serve":
+        import uvicorn
+        uvicorn.run(app, host=args.host, port=args.port)
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(record_fixtures(args.repos, args.runs), f, ensure_ascii=False)
+        print(f"{len(args.repos)}件のリポジトリを{args.output}に記録しました")
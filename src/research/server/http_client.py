@@ -0,0 +1,491 @@
+"""
+GitHub APIを呼び出すための共有HTTPクライアントを提供するモジュール。
+全エンドポイントで一つのコネクションプール（keep-alive、利用可能ならHTTP/2）を共有し、
+リクエストごとのTCP+TLSハンドシェイクを削減する。
+設定は環境変数（.envも可）から読み込む。
+"""
+import asyncio
+import importlib.util
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager, contextmanager
+import httpx
+from pydantic import BaseModel, Field
+from dotenv import load_dotenv
+from research.server.rate_governor import RateGovernor
+
+load_dotenv()
+
+# ステータスコードによるリトライを許可するメソッド（POSTは二重実行を避けるため対象外）
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+
+class HTTPClientConfig(BaseModel):
+    base_url: str = Field("https://api.github.com", description="GitHub APIのベースURL")
+    pool_size: int = Field(20, description="コネクションプールの最大接続数")
+    max_keepalive: int = Field(10, description="keep-aliveで保持する接続数の上限")
+    keepalive_expiry: float = Field(30.0, description="アイドル接続を保持する秒数")
+    connect_timeout: float = Field(10.0, description="接続タイムアウト（秒）")
+    read_timeout: float = Field(60.0, description="読み込みタイムアウト（秒）")
+    max_retries: int = Field(3, description="接続エラー・5xx時の最大リトライ回数")
+    backoff_factor: float = Field(0.5, description="指数バックオフの基準秒数")
+    backoff_max: float = Field(30.0, description="バックオフの上限秒数")
+    retry_statuses: list[int] = Field(default_factory=lambda: [500, 502, 503, 504], description="リトライ対象のステータスコード")
+    http2: bool = Field(True, description="h2パッケージが利用可能な場合にHTTP/2を有効にするか")
+    rate_limit_retries: int = Field(5, description="レート制限で拒否された場合に解除を待って送り直す最大回数")
+
+    @classmethod
+    def from_env(cls) -> "HTTPClientConfig":
+        """
+        環境変数から設定を読み込む。未設定の項目はデフォルト値を利用する。
+
+        Returns:
+            HTTPClientConfig: 読み込んだ設定
+        """
+        env_map = {
+            "base_url": "GITHUB_API_BASE_URL",
+            "pool_size": "GITHUB_HTTP_POOL_SIZE",
+            "max_keepalive": "GITHUB_HTTP_MAX_KEEPALIVE",
+            "keepalive_expiry": "GITHUB_HTTP_KEEPALIVE_EXPIRY",
+            "connect_timeout": "GITHUB_HTTP_CONNECT_TIMEOUT",
+            "read_timeout": "GITHUB_HTTP_READ_TIMEOUT",
+            "max_retries": "GITHUB_HTTP_MAX_RETRIES",
+            "backoff_factor": "GITHUB_HTTP_BACKOFF_FACTOR",
+            "http2": "GITHUB_HTTP_HTTP2",
+            "rate_limit_retries": "GITHUB_HTTP_RATE_LIMIT_RETRIES",
+        }
+        values = {key: os.environ[name] for key, name in env_map.items() if os.environ.get(name)}
+        return cls(**values)
+
+    def backoff(self, attempt: int) -> float:
+        """attempt回目（0始まり）のリトライ前に待機する秒数を返す"""
+        return min(self.backoff_factor * (2 ** attempt), self.backoff_max)
+
+
+def is_http2_available() -> bool:
+    """HTTP/2に必要なh2パッケージがインストールされているか確認する"""
+    return importlib.util.find_spec("h2") is not None
+
+
+class ConnectionStats:
+    """
+    コネクションの再利用状況を数えるカウンタ。
+    httpcoreのtrace拡張で新規TCP接続の確立を検知し、リクエスト数との差を再利用回数とみなす。
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.new_connections = 0
+        self.retries = 0
+
+    def _record(self, event_name: str) -> None:
+        with self._lock:
+            if event_name == "connection.connect_tcp.complete":
+                self.new_connections += 1
+            elif event_name.endswith("send_request_headers.started"):
+                self.requests += 1
+
+    def trace(self, event_name: str, info: dict) -> None:
+        """同期クライアント用のtraceコールバック"""
+        self._record(event_name)
+
+    async def atrace(self, event_name: str, info: dict) -> None:
+        """非同期クライアント用のtraceコールバック"""
+        self._record(event_name)
+
+    def count_retry(self) -> None:
+        with self._lock:
+            self.retries += 1
+
+    def snapshot(self) -> dict:
+        """
+        現在のカウンタの値を返す。
+
+        Returns:
+            dict: requests, new_connections, reused_connections, reuse_ratio, retries
+        """
+        with self._lock:
+            reused = max(self.requests - self.new_connections, 0)
+            return {
+                "requests": self.requests,
+                "new_connections": self.new_connections,
+                "reused_connections": reused,
+                "reuse_ratio": round(reused / self.requests, 3) if self.requests else 0.0,
+                "retries": self.retries,
+            }
+
+
+class ConditionalRequestCache:
+    """
+    GETレスポンスのETagと本文をURLごとに保持し、If-None-Matchによる条件付きリクエストを可能にするキャッシュ。
+    GitHubは304応答をレート制限に数えないため、変化のないポーリングでクォータと帯域を消費しなくなる。
+    """
+    # 再構築したレスポンスに引き継がないヘッダー（本文は展開済みのため）
+    _DROP_HEADERS = {"content-encoding", "content-length", "transfer-encoding"}
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, tuple[str, dict, bytes]] = OrderedDict()
+        self.conditional_requests = 0
+        self.saved_requests = 0
+        self.saved_bytes = 0
+
+    @staticmethod
+    def key(url: str, params: dict | None, headers: dict | None) -> str:
+        accept = (headers or {}).get("Accept", "")
+        return f"{httpx.URL(url, params=params)} {accept}"
+
+    def prepare(self, key: str, headers: dict | None) -> dict:
+        """キャッシュ済みのETagがあればIf-None-Matchを付けたヘッダーを返す"""
+        headers = dict(headers or {})
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                headers["If-None-Match"] = entry[0]
+                self.conditional_requests += 1
+        return headers
+
+    def resolve(self, key: str, resp: httpx.Response) -> httpx.Response:
+        """
+        304ならキャッシュ済みの本文で200のレスポンスを再構築し、ETag付きの200なら本文を保存する。
+
+        Returns:
+            httpx.Response: 呼び出し側にそのまま返すレスポンス
+        """
+        with self._lock:
+            if resp.status_code == 304 and key in self._entries:
+                _, headers, content = self._entries[key]
+                self._entries.move_to_end(key)
+                self.saved_requests += 1
+                self.saved_bytes += len(content)
+                return httpx.Response(200, headers=headers, content=content, request=resp.request)
+            etag = resp.headers.get("ETag")
+            if resp.status_code == 200 and etag:
+                headers = {k: v for k, v in resp.headers.items() if k.lower() not in self._DROP_HEADERS}
+                self._entries[key] = (etag, headers, resp.content)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return resp
+
+    def snapshot(self) -> dict:
+        """
+        条件付きリクエストの統計を返す。
+
+        Returns:
+            dict: entries, conditional_requests, saved_requests(304の回数), saved_bytes
+        """
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "conditional_requests": self.conditional_requests,
+                "saved_requests": self.saved_requests,
+                "saved_bytes": self.saved_bytes,
+            }
+
+
+# リクエストが送信されていないため、メソッドを問わずリトライできる接続エラー
+CONNECT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout)
+
+
+class _BaseGitHubHTTPClient:
+    """同期・非同期クライアントで共通の設定とURL組み立て、リトライ判定"""
+
+    def __init__(
+        self,
+        config: HTTPClientConfig | None = None,
+        stats: ConnectionStats | None = None,
+        etag_cache: ConditionalRequestCache | None = None,
+        governor: RateGovernor | None = None,
+    ):
+        self.config = config or HTTPClientConfig.from_env()
+        self.stats = stats or ConnectionStats()
+        self.etag_cache = etag_cache or ConditionalRequestCache()
+        self.governor = governor or RateGovernor()
+        self.http2 = self.config.http2 and is_http2_available()
+
+    def _client_options(self) -> dict:
+        return {
+            "http2": self.http2,
+            "limits": httpx.Limits(
+                max_connections=self.config.pool_size,
+                max_keepalive_connections=self.config.max_keepalive,
+                keepalive_expiry=self.config.keepalive_expiry,
+            ),
+            "timeout": httpx.Timeout(self.config.read_timeout, connect=self.config.connect_timeout),
+            "follow_redirects": True,
+        }
+
+    def url(self, path: str) -> str:
+        """APIのパス（/repos/...）を設定済みのベースURLと結合する"""
+        if path.startswith("http://") or path.startswith("https://"):
+            return path
+        return self.config.base_url.rstrip("/") + path
+
+    def _is_api_url(self, url: str) -> bool:
+        # ログのリダイレクト先（Blobストレージ）などAPI以外への直接リクエストはレート制限の対象外
+        return url.startswith(self.config.base_url.rstrip("/") + "/")
+
+    def _can_retry_error(self, method: str, error: httpx.TransportError, attempt: int) -> bool:
+        # keep-aliveの切れた接続などで送信後に失敗した場合は冪等なメソッドのみリトライする
+        if attempt >= self.config.max_retries:
+            return False
+        return isinstance(error, CONNECT_ERRORS) or (
+            isinstance(error, httpx.RemoteProtocolError) and method in IDEMPOTENT_METHODS)
+
+    def _should_retry(self, method: str, resp: httpx.Response, attempt: int) -> bool:
+        return (resp.status_code in self.config.retry_statuses
+                and method in IDEMPOTENT_METHODS
+                and attempt < self.config.max_retries)
+
+
+class GitHubHTTPClient(_BaseGitHubHTTPClient):
+    """コネクションプール・タイムアウト・リトライを備えたGitHub API用の同期HTTPクライアント"""
+
+    def __init__(
+        self,
+        config: HTTPClientConfig | None = None,
+        stats: ConnectionStats | None = None,
+        etag_cache: ConditionalRequestCache | None = None,
+        governor: RateGovernor | None = None,
+    ):
+        super().__init__(config, stats, etag_cache, governor)
+        self._client = httpx.Client(**self._client_options())
+
+    def request(self, method: str, url: str, stream: bool = False, follow_redirects: bool = True, **kwargs) -> httpx.Response:
+        """
+        共有プール経由でリクエストを送る。接続エラーと5xx（冪等なメソッドのみ）は指数バックオフでリトライする。
+        送信前にRateGovernorで待機し、レート制限で拒否された場合は解除を待って送り直す。
+
+        Args:
+            method (str): HTTPメソッド
+            url (str): 絶対URL、またはベースURLからのパス
+            stream (bool): Trueの場合は本文を読み込まずに返す（呼び出し側でclose()すること）
+            follow_redirects (bool): Falseの場合はリダイレクトを追わずに3xxをそのまま返す
+            **kwargs: httpx.Client.build_requestに渡す引数（headers, json, paramsなど）
+
+        Returns:
+            httpx.Response: 最後に受け取ったレスポンス
+        """
+        method = method.upper()
+        url = self.url(url)
+        attempt = 0
+        limited = 0
+        while True:
+            delay = self.governor.reserve(method, url) if self._is_api_url(url) else 0.0
+            if delay > 0:
+                time.sleep(delay)
+            try:
+                request = self._client.build_request(method, url, extensions={"trace": self.stats.trace}, **kwargs)
+                resp = self._client.send(request, stream=stream, follow_redirects=follow_redirects)
+            except httpx.TransportError as e:
+                if not self._can_retry_error(method, e, attempt):
+                    raise
+                self.stats.count_retry()
+                time.sleep(self.config.backoff(attempt))
+                attempt += 1
+                continue
+            # レート制限で拒否されたリクエストは実行されていないため、メソッドを問わず送り直す
+            if self._is_api_url(url) and self.governor.update(resp) and limited < self.config.rate_limit_retries:
+                resp.close()
+                self.stats.count_retry()
+                limited += 1
+                continue
+            if self._should_retry(method, resp, attempt):
+                resp.close()
+                self.stats.count_retry()
+                time.sleep(self.config.backoff(attempt))
+                attempt += 1
+                continue
+            return resp
+
+    @contextmanager
+    def stream(self, method: str, url: str, **kwargs):
+        """本文を逐次読み込むためのレスポンスを返すコンテキストマネージャ"""
+        resp = self.request(method, url, stream=True, **kwargs)
+        try:
+            yield resp
+        finally:
+            resp.close()
+
+    def get(self, url: str, **kwargs) -> httpx.Response:
+        return self.request("GET", url, **kwargs)
+
+    def get_conditional(self, url: str, headers: dict | None = None, params: dict | None = None, **kwargs) -> httpx.Response:
+        """
+        ETagを利用した条件付きGET。変化がなく304が返った場合はキャッシュ済みの本文を200として返す。
+        """
+        url = self.url(url)
+        key = self.etag_cache.key(url, params, headers)
+        resp = self.get(url, headers=self.etag_cache.prepare(key, headers), params=params, **kwargs)
+        return self.etag_cache.resolve(key, resp)
+
+    def post(self, url: str, **kwargs) -> httpx.Response:
+        return self.request("POST", url, **kwargs)
+
+    def delete(self, url: str, **kwargs) -> httpx.Response:
+        return self.request("DELETE", url, **kwargs)
+
+    def close(self) -> None:
+        self._client.close()
+
+
+class AsyncGitHubHTTPClient(_BaseGitHubHTTPClient):
+    """
+    GitHubHTTPClientの非同期版。待機にasyncio.sleepを使うため、イベントループ上で多数の監視を並行できる。
+    httpx.AsyncClientは生成したイベントループに紐づくため、ループごとに生成する。
+    """
+
+    def __init__(
+        self,
+        config: HTTPClientConfig | None = None,
+        stats: ConnectionStats | None = None,
+        etag_cache: ConditionalRequestCache | None = None,
+        governor: RateGovernor | None = None,
+    ):
+        super().__init__(config, stats, etag_cache, governor)
+        self.loop = asyncio.get_running_loop()
+        self._client = httpx.AsyncClient(**self._client_options())
+
+    async def request(self, method: str, url: str, stream: bool = False, follow_redirects: bool = True, **kwargs) -> httpx.Response:
+        """
+        共有プール経由で非同期にリクエストを送る。リトライ条件はGitHubHTTPClient.requestと同じ。
+
+        Args:
+            method (str): HTTPメソッド
+            url (str): 絶対URL、またはベースURLからのパス
+            stream (bool): Trueの場合は本文を読み込まずに返す（呼び出し側でaclose()すること）
+            follow_redirects (bool): Falseの場合はリダイレクトを追わずに3xxをそのまま返す
+            **kwargs: httpx.AsyncClient.build_requestに渡す引数
+
+        Returns:
+            httpx.Response: 最後に受け取ったレスポンス
+        """
+        method = method.upper()
+        url = self.url(url)
+        attempt = 0
+        limited = 0
+        while True:
+            delay = self.governor.reserve(method, url) if self._is_api_url(url) else 0.0
+            if delay > 0:
+                await asyncio.sleep(delay)
+            try:
+                request = self._client.build_request(method, url, extensions={"trace": self.stats.atrace}, **kwargs)
+                resp = await self._client.send(request, stream=stream, follow_redirects=follow_redirects)
+            except httpx.TransportError as e:
+                if not self._can_retry_error(method, e, attempt):
+                    raise
+                self.stats.count_retry()
+                await asyncio.sleep(self.config.backoff(attempt))
+                attempt += 1
+                continue
+            if self._is_api_url(url) and self.governor.update(resp) and limited < self.config.rate_limit_retries:
+                await resp.aclose()
+                self.stats.count_retry()
+                limited += 1
+                continue
+            if self._should_retry(method, resp, attempt):
+                await resp.aclose()
+                self.stats.count_retry()
+                await asyncio.sleep(self.config.backoff(attempt))
+                attempt += 1
+                continue
+            return resp
+
+    @asynccontextmanager
+    async def stream(self, method: str, url: str, **kwargs):
+        """本文を逐次読み込むためのレスポンスを返す非同期コンテキストマネージャ"""
+        resp = await self.request(method, url, stream=True, **kwargs)
+        try:
+            yield resp
+        finally:
+            await resp.aclose()
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def get_conditional(self, url: str, headers: dict | None = None, params: dict | None = None, **kwargs) -> httpx.Response:
+        """
+        GitHubHTTPClient.get_conditionalの非同期版。
+        """
+        url = self.url(url)
+        key = self.etag_cache.key(url, params, headers)
+        resp = await self.get(url, headers=self.etag_cache.prepare(key, headers), params=params, **kwargs)
+        return self.etag_cache.resolve(key, resp)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    async def delete(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("DELETE", url, **kwargs)
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+
+# 同期・非同期クライアントで再利用状況のカウンタ、ETagキャッシュ、レート制限の状態を共有する
+_stats = ConnectionStats()
+_etag_cache = ConditionalRequestCache()
+_governor = RateGovernor()
+_client: GitHubHTTPClient | None = None
+_async_client: AsyncGitHubHTTPClient | None = None
+_client_lock = threading.Lock()
+
+
+def get_http_client() -> GitHubHTTPClient:
+    """
+    プロセス内で共有するGitHubHTTPClientを返す（初回呼び出し時に生成）。
+
+    Returns:
+        GitHubHTTPClient: 共有クライアント
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = GitHubHTTPClient(stats=_stats, etag_cache=_etag_cache, governor=_governor)
+    return _client
+
+
+def get_async_http_client() -> AsyncGitHubHTTPClient:
+    """
+    実行中のイベントループで共有するAsyncGitHubHTTPClientを返す（ループが変わった場合は作り直す）。
+
+    Returns:
+        AsyncGitHubHTTPClient: 共有非同期クライアント
+    """
+    global _async_client
+    if _async_client is None or _async_client.loop is not asyncio.get_running_loop():
+        _async_client = AsyncGitHubHTTPClient(stats=_stats, etag_cache=_etag_cache, governor=_governor)
+    return _async_client
+
+
+async def close_http_clients() -> None:
+    """共有クライアントを閉じる（サーバー終了時に呼び出す）"""
+    global _client, _async_client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+
+
+def github_headers(accept: str = "application/vnd.github+json") -> dict:
+    """
+    GITHUB_TOKENを利用したGitHub API用のリクエストヘッダーを返す。
+
+    Args:
+        accept (str): Acceptヘッダーの値
+
+    Returns:
+        dict: Authorization, Acceptヘッダー
+    """
+    return {
+        "Authorization": f"token {os.environ.get('GITHUB_TOKEN')}",
+        "Accept": accept,
+    }
@@ -0,0 +1,136 @@
+"""
+ダウンロードしたジョブログをzstdで圧縮してディスクに保存するキャッシュ。
+(リポジトリ, run_id, job_id, attempt)をキーとし、合計サイズの上限を超えたら最も長く使われていないものから削除する。
+同じrunのログを再取得する場合（WorkflowExecutorのリトライ、評価のやり直し、パーサーの実験など）はダウンロードせずにここから返す。
+"""
+import os
+import threading
+import zstandard
+
+# キャッシュを保存するディレクトリ（未設定時は ~/.cache/research/job_logs）
+LOG_CACHE_DIR = os.environ.get(
+    "GITHUB_LOG_CACHE_DIR",
+    os.path.join(os.environ.get("RESEARCH_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "research")), "job_logs"),
+)
+# キャッシュの合計サイズの上限（圧縮後のバイト数）
+LOG_CACHE_MAX_BYTES = int(os.environ.get("GITHUB_LOG_CACHE_MAX_BYTES", str(1024 * 1024 * 1024)))
+
+# 保存したログの種類。complete: 全体、steps: 失敗したstepの終わりまで、tail: 末尾のみ
+LOG_KINDS = ("complete", "steps", "tail")
+_CHUNK_SIZE = 64 * 1024
+
+
+class JobLogCache:
+    """
+    ジョブログの圧縮キャッシュ。ファイルの更新時刻を最終利用時刻として使い、LRUで削除する。
+    """
+
+    def __init__(self, directory: str = LOG_CACHE_DIR, max_bytes: int = LOG_CACHE_MAX_BYTES, level: int = 3):
+        """
+        Args:
+            directory (str): 保存先のディレクトリ
+            max_bytes (int): 合計サイズの上限（圧縮後のバイト数）
+            level (int): zstdの圧縮レベル
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.level = level
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "stored": 0, "evicted": 0, "saved_bytes": 0}
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(owner: str, repo: str, run_id: int, job_id: int, attempt: int) -> str:
+        return f"{owner}_{repo}_{run_id}_{job_id}_{attempt}".lower()
+
+    def _path(self, key: str, kind: str) -> str:
+        return os.path.join(self.directory, f"{key}.{kind}.log.zst")
+
+    def lookup(self, key: str, kinds: tuple[str, ...]) -> tuple[str, str] | None:
+        """
+        kindsのうち最初に見つかった種類のキャッシュを返し、最終利用時刻を更新する。
+
+        Returns:
+            tuple[str, str]|None: (ファイルのパス, 種類)。なければNone
+        """
+        for kind in kinds:
+            path = self._path(key, kind)
+            try:
+                os.utime(path)
+            except FileNotFoundError:
+                continue
+            self.stats["hits"] += 1
+            return path, kind
+        self.stats["misses"] += 1
+        return None
+
+    def read_chunks(self, path: str):
+        """キャッシュを展開しながらチャンク単位で返す"""
+        with open(path, "rb") as f, zstandard.ZstdDecompressor().stream_reader(f) as reader:
+            while chunk := reader.read(_CHUNK_SIZE):
+                self.stats["saved_bytes"] += len(chunk)
+                yield chunk
+
+    def store(self, key: str, kind: str, source) -> str:
+        """
+        ファイルオブジェクトsourceの先頭からの内容を圧縮して保存し、上限を超えていれば古いものを削除する。
+
+        Args:
+            key (str): JobLogCache.keyで作ったキー
+            kind (str): LOG_KINDSのいずれか
+            source: 読み込み可能なバイナリのファイルオブジェクト
+
+        Returns:
+            str: 保存したファイルのパス
+        """
+        path = self._path(key, kind)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        source.seek(0)
+        with open(tmp_path, "wb") as f:
+            zstandard.ZstdCompressor(level=self.level).copy_stream(source, f)
+        os.replace(tmp_path, path)
+        self.stats["stored"] += 1
+        self.evict()
+        return path
+
+    def evict(self) -> None:
+        """合計サイズがmax_bytesに収まるまで、最終利用時刻の古いものから削除する"""
+        with self._lock:
+            entries = []
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith(".log.zst"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    continue
+                total -= size
+                self.stats["evicted"] += 1
+
+    def snapshot(self) -> dict:
+        """件数と合計サイズ、ヒット数などを返す"""
+        files = [e for e in os.scandir(self.directory) if e.name.endswith(".log.zst")]
+        return {
+            **self.stats,
+            "entries": len(files),
+            "bytes": sum(e.stat().st_size for e in files),
+            "max_bytes": self.max_bytes,
+        }
+
+
+_cache: JobLogCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_job_log_cache() -> JobLogCache:
+    """プロセス内で共有するJobLogCacheを返す"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = JobLogCache()
+        return _cache
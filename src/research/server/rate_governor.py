@@ -0,0 +1,192 @@
+"""
+GitHub APIのレート制限に合わせてリクエストの送信タイミングを調整するモジュール。
+レスポンスのX-RateLimit-*ヘッダーからcore/search/graphqlごとの残り回数を追跡し、
+使い切った場合やセカンダリレート制限（Retry-After）を受けた場合は、失敗させずに解除まで待ってから送る。
+"""
+import os
+import threading
+import time
+import httpx
+
+# 書き込み系リクエストの間隔（秒）。GitHubはセカンダリレート制限を避けるため1秒以上空けることを推奨している
+WRITE_INTERVAL = float(os.environ.get("GITHUB_WRITE_INTERVAL", "1.0"))
+# Retry-Afterなしでセカンダリレート制限を受けた場合の最初の待機秒数（以降は倍にしていく）
+SECONDARY_LIMIT_WAIT = float(os.environ.get("GITHUB_SECONDARY_LIMIT_WAIT", "60"))
+
+WRITE_METHODS = {"POST", "PATCH", "PUT", "DELETE"}
+
+
+class _Bucket:
+    """一つのリソース（core, search, graphqlなど）のレート制限の状態"""
+    def __init__(self, name: str):
+        self.name = name
+        self.limit: int | None = None
+        self.remaining: int | None = None
+        self.reset_at: float | None = None
+        self.blocked_until = 0.0
+        self.secondary_hits = 0
+        self.requests = 0
+        self.rate_limited = 0
+        self.waited = 0.0
+
+    def snapshot(self, now: float) -> dict:
+        return {
+            "limit": self.limit,
+            "remaining": self.remaining,
+            "reset_at": self.reset_at,
+            "reset_in": round(max(self.reset_at - now, 0.0), 1) if self.reset_at else None,
+            "blocked_for": round(max(self.blocked_until - now, 0.0), 1),
+            "requests": self.requests,
+            "rate_limited": self.rate_limited,
+            "waited_seconds": round(self.waited, 1),
+        }
+
+
+class RateGovernor:
+    """
+    リソースごとのトークンバケットで送信を制御する。バケットの大きさと補充時刻はレスポンスヘッダーから更新する。
+    同期・非同期クライアントの両方から使うため、状態はスレッドロックで保護し、待機自体は呼び出し側で行う。
+    """
+
+    def __init__(self, write_interval: float = WRITE_INTERVAL, secondary_wait: float = SECONDARY_LIMIT_WAIT):
+        """
+        Args:
+            write_interval (float): 書き込み系リクエストの最小間隔（秒）
+            secondary_wait (float): Retry-Afterなしのセカンダリレート制限を受けた際の初回待機秒数
+        """
+        self.write_interval = write_interval
+        self.secondary_wait = secondary_wait
+        self._buckets: dict[str, _Bucket] = {}
+        self._next_write_at = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def resource_for(url: str) -> str:
+        """リクエスト先のURLから、ヘッダーが届く前に使うバケット名を推定する"""
+        path = httpx.URL(url).path
+        if path.startswith("/search/"):
+            return "search"
+        if path.endswith("/graphql"):
+            return "graphql"
+        return "core"
+
+    def _bucket(self, name: str) -> _Bucket:
+        bucket = self._buckets.get(name)
+        if bucket is None:
+            bucket = self._buckets[name] = _Bucket(name)
+        return bucket
+
+    def reserve(self, method: str, url: str) -> float:
+        """
+        リクエストを1回分予約し、送信前に待つべき秒数を返す。
+
+        Args:
+            method (str): HTTPメソッド
+            url (str): リクエスト先の絶対URL
+
+        Returns:
+            float: 待機秒数（0なら即時に送ってよい）
+        """
+        now = time.time()
+        with self._lock:
+            bucket = self._bucket(self.resource_for(url))
+            bucket.requests += 1
+            start = max(now, bucket.blocked_until)
+            if bucket.reset_at is not None and bucket.reset_at <= start:
+                # 補充時刻を過ぎたので上限まで戻す
+                bucket.remaining = bucket.limit
+                bucket.reset_at = None
+            if bucket.remaining is not None:
+                if bucket.remaining <= 0 and bucket.reset_at is not None:
+                    # 残り回数を使い切った場合は補充時刻まで待つ（時計のずれを考慮して1秒余分に待つ）
+                    start = max(start, bucket.reset_at + 1.0)
+                else:
+                    bucket.remaining -= 1
+            # GraphQLはクエリもPOSTで送るため、書き込みの間隔を空けない（このリポジトリはmutationを送らない）
+            if method.upper() in WRITE_METHODS and bucket.name != "graphql" and self.write_interval > 0:
+                start = max(start, self._next_write_at)
+                self._next_write_at = start + self.write_interval
+            delay = start - now
+            bucket.waited += delay
+            return delay
+
+    def update(self, resp: httpx.Response) -> bool:
+        """
+        レスポンスヘッダーからバケットを更新する。
+
+        Args:
+            resp (httpx.Response): 受け取ったレスポンス
+
+        Returns:
+            bool: レート制限により拒否されたか（Trueなら待ってから同じリクエストを送り直してよい）
+        """
+        headers = resp.headers
+        now = time.time()
+        with self._lock:
+            name = headers.get("x-ratelimit-resource") or self.resource_for(str(resp.request.url))
+            bucket = self._bucket(name)
+            if "x-ratelimit-remaining" in headers:
+                try:
+                    limit = int(headers["x-ratelimit-limit"])
+                    remaining = int(headers["x-ratelimit-remaining"])
+                    reset_at = float(headers["x-ratelimit-reset"])
+                except (KeyError, ValueError):
+                    pass
+                else:
+                    if bucket.reset_at == reset_at and bucket.remaining is not None:
+                        # 同じ期間内なら、送信中のリクエストの予約分を残すため小さい方を使う
+                        remaining = min(remaining, bucket.remaining)
+                    bucket.limit, bucket.remaining, bucket.reset_at = limit, remaining, reset_at
+            if resp.status_code not in (403, 429):
+                bucket.secondary_hits = 0
+                return False
+            retry_after = headers.get("retry-after")
+            if retry_after is not None:
+                try:
+                    wait = float(retry_after)
+                except ValueError:
+                    wait = self.secondary_wait
+            elif headers.get("x-ratelimit-remaining") == "0" and bucket.reset_at is not None:
+                wait = bucket.reset_at - now + 1.0
+            elif resp.status_code == 429 or "rate limit" in self._body_text(resp).lower():
+                # Retry-Afterのないセカンダリレート制限は、待機時間を倍にしながら待つ
+                wait = self.secondary_wait * (2 ** bucket.secondary_hits)
+                bucket.secondary_hits += 1
+            else:
+                # 権限エラーなどレート制限以外の403
+                return False
+            bucket.rate_limited += 1
+            bucket.blocked_until = max(bucket.blocked_until, now + max(wait, 0.0))
+            return True
+
+    @staticmethod
+    def _body_text(resp: httpx.Response) -> str:
+        # ストリーミングで受け取ったレスポンスは本文を読まない
+        try:
+            return resp.text
+        except httpx.ResponseNotRead:
+            return ""
+
+    def seed(self, resources: dict) -> None:
+        """
+        GET /rate_limit のresourcesでバケットを初期化する（このAPIはレート制限を消費しない）。
+
+        Args:
+            resources (dict): {"core": {"limit", "remaining", "reset"}, ...}
+        """
+        with self._lock:
+            for name, values in resources.items():
+                bucket = self._bucket(name)
+                bucket.limit = values.get("limit")
+                bucket.remaining = values.get("remaining")
+                bucket.reset_at = float(values["reset"]) if values.get("reset") is not None else None
+
+    def snapshot(self) -> dict:
+        """リソースごとの状態を返す"""
+        now = time.time()
+        with self._lock:
+            return {
+                "buckets": {name: bucket.snapshot(now) for name, bucket in self._buckets.items()},
+                "write_interval": self.write_interval,
+                "next_write_in": round(max(self._next_write_at - now, 0.0), 1),
+            }
@@ -0,0 +1,124 @@
+"""
+GraphQL APIでリポジトリ情報をまとめて取得するモジュール。
+REST APIではリポジトリ・ブランチ・topics・languagesの4回に分かれていた取得を1回のクエリにまとめ、
+複数のリポジトリもエイリアスを使って同じクエリで取得する。
+"""
+from research.server.http_client import GitHubHTTPClient
+
+# 1回のクエリでまとめて取得するリポジトリ数の上限（GraphQLのノード数制限を超えないようにする）
+GRAPHQL_BATCH_SIZE = 50
+
+REPO_INFO_FRAGMENT = """
+fragment RepoInfo on Repository {
+  nameWithOwner
+  description
+  stargazerCount
+  forkCount
+  issues(states: OPEN) { totalCount }
+  pullRequests(states: OPEN) { totalCount }
+  defaultBranchRef { name }
+  url
+  createdAt
+  updatedAt
+  pushedAt
+  isArchived
+  isDisabled
+  repositoryTopics(first: 100) { nodes { topic { name } } }
+  languages(first: 100, orderBy: {field: SIZE, direction: DESC}) { edges { size node { name } } }
+}
+"""
+
+
+def build_repo_info_query(repos: list[tuple[str, str]]) -> tuple[str, dict]:
+    """
+    複数リポジトリの情報を取得するクエリと変数を作る。i番目のリポジトリはエイリアスr{i}で返る。
+
+    Args:
+        repos (list[tuple[str, str]]): (owner, repo)のリスト
+
+    Returns:
+        tuple[str, dict]: GraphQLクエリと変数
+    """
+    params = []
+    fields = []
+    variables = {}
+    for i, (owner, repo) in enumerate(repos):
+        params.append(f"$o{i}: String!, $n{i}: String!")
+        fields.append(f"  r{i}: repository(owner: $o{i}, name: $n{i}) {{ ...RepoInfo }}")
+        variables[f"o{i}"] = owner
+        variables[f"n{i}"] = repo
+    query = f"query({', '.join(params)}) {{\n" + "\n".join(fields) + "\n}\n" + REPO_INFO_FRAGMENT
+    return query, variables
+
+
+def repo_info_from_node(node: dict) -> dict:
+    """
+    GraphQLのRepositoryノードを、REST API版の/github/infoと同じキーの辞書に変換する。
+    言語ごとのコード量（バイト数）はlanguagesに大きい順で格納する。
+
+    Raises:
+        ValueError: デフォルトブランチや言語が取得できない場合
+    """
+    if not node.get("defaultBranchRef"):
+        raise ValueError("ブランチ情報取得エラー: デフォルトブランチがありません")
+    languages = {edge["node"]["name"]: edge["size"] for edge in node["languages"]["edges"]}
+    if not languages:
+        raise ValueError("languageの取得ができませんでした。エラー: 言語情報がありません")
+    return {
+        "full_name": node.get("nameWithOwner"),
+        "description": node.get("description"),
+        "stargazers_count": node.get("stargazerCount"),
+        "forks_count": node.get("forkCount"),
+        # REST APIのopen_issues_countと同じく、オープンなPRも含める
+        "open_issues_count": node["issues"]["totalCount"] + node["pullRequests"]["totalCount"],
+        "default_branch": node["defaultBranchRef"]["name"],
+        "html_url": node.get("url"),
+        "created_at": node.get("createdAt"),
+        "updated_at": node.get("updatedAt"),
+        "pushed_at": node.get("pushedAt"),
+        "language": next(iter(languages)).lower(),
+        "languages": languages,
+        "archived": node.get("isArchived"),
+        "disabled": node.get("isDisabled"),
+        "topics": [n["topic"]["name"] for n in node["repositoryTopics"]["nodes"]],
+    }
+
+
+def fetch_repo_infos(http: GitHubHTTPClient, headers: dict, repos: list[tuple[str, str]]) -> list[tuple[dict | None, str | None]]:
+    """
+    複数リポジトリの情報をGRAPHQL_BATCH_SIZE件ずつ1回のクエリで取得する。
+
+    Args:
+        http (GitHubHTTPClient): 共有クライアント
+        headers (dict): GitHub API用のリクエストヘッダー
+        repos (list[tuple[str, str]]): (owner, repo)のリスト
+
+    Returns:
+        list[tuple[dict|None, str|None]]: reposと同じ順序の(情報, エラーメッセージ)のリスト
+    """
+    results: list[tuple[dict | None, str | None]] = []
+    for start in range(0, len(repos), GRAPHQL_BATCH_SIZE):
+        batch = repos[start:start + GRAPHQL_BATCH_SIZE]
+        query, variables = build_repo_info_query(batch)
+        resp = http.post("/graphql", headers=headers, json={"query": query, "variables": variables})
+        if resp.status_code != 200:
+            results.extend((None, f"GitHub APIエラー: {resp.status_code}") for _ in batch)
+            continue
+        body = resp.json()
+        data = body.get("data") or {}
+        # エラーはpathの先頭（エイリアス）でリポジトリに対応付ける
+        errors = {}
+        for error in body.get("errors", []):
+            path = error.get("path") or [None]
+            errors.setdefault(path[0], error.get("message"))
+        for i in range(len(batch)):
+            node = data.get(f"r{i}")
+            if node is None:
+                message = errors.get(f"r{i}") or errors.get(None) or "リポジトリが見つかりません"
+                results.append((None, f"GitHub APIエラー: {message}"))
+                continue
+            try:
+                results.append((repo_info_from_node(node), None))
+            except ValueError as e:
+                results.append((None, str(e)))
+    return results
@@ -0,0 +1,296 @@
+"""
+実験用のforkをまとめて作成・削除するモジュール。
+forkの作成要求は並行に送り（書き込みの間隔と上限はRateGovernorが調整する）、
+GitHub側で非同期に行われるコピーが終わってデフォルトブランチを取得できるようになるまで待つ。
+各リポジトリの状態はマニフェスト（JSON）に保存し、中断しても作成済み・削除済みのものはやり直さない。
+readyのforkも、確認から一定時間が過ぎたらまだ存在するかを確かめ、外部で削除されていれば作り直す。
+"""
+import asyncio
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from research.server.http_client import AsyncGitHubHTTPClient
+
+try:
+    import fcntl
+except ImportError:  # Windowsではプロセス間のロックを行わない
+    fcntl = None
+
+# 同時に処理するリポジトリ数（リクエストの間隔はRateGovernorが別に調整する）
+FORK_CONCURRENCY = int(os.environ.get("GITHUB_FORK_CONCURRENCY", "8"))
+# forkの準備が完了するまで待つ最大秒数と、確認の間隔（秒）
+FORK_READY_TIMEOUT = float(os.environ.get("GITHUB_FORK_READY_TIMEOUT", "300"))
+FORK_READY_INTERVAL = float(os.environ.get("GITHUB_FORK_READY_INTERVAL", "3"))
+# マニフェストでreadyのforkを、存在を確認し直さずに使う秒数
+FORK_VERIFY_SECONDS = float(os.environ.get("GITHUB_FORK_VERIFY_SECONDS", "3600"))
+# マニフェストの保存先（未設定時は ~/.cache/research/fork_manifest.json）
+FORK_MANIFEST_PATH = os.environ.get(
+    "GITHUB_FORK_MANIFEST",
+    os.path.join(os.environ.get("RESEARCH_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "research")), "fork_manifest.json"),
+)
+
+# マニフェストに記録するforkの状態
+#   requested: 作成を要求した（コピー中の可能性がある）
+#   ready:     デフォルトブランチを取得でき、cloneやpushができる
+#   failed:    作成または準備の確認に失敗した
+#   deleted:   削除した
+FORK_STATES = ("requested", "ready", "failed", "deleted")
+
+_REPO_URL_PATTERN = re.compile(r"https://github.com/([\w\-\.]+)/([\w\-\.]+?)(?:\.git)?/?$")
+
+
+def parse_repo_url(repo_url: str) -> tuple[str, str] | None:
+    m = _REPO_URL_PATTERN.match(repo_url)
+    return (m.group(1), m.group(2)) if m else None
+
+
+class ForkManifest:
+    """
+    fork元のURLをキーに、forkの状態を保存するJSONファイル。
+    更新のたびに一時ファイルへ書き出してから置き換えるため、途中で止まっても壊れない。
+    同じファイルを使うリクエストはget_fork_manifestで一つのインスタンスを共有し、
+    保存時はファイルをロックしてディスク上の内容（他のプロセスの更新）と合わせてから書き出す。
+    """
+
+    def __init__(self, path: str = FORK_MANIFEST_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self.entries: dict[str, dict] = self._load()
+
+    def _load(self) -> dict[str, dict]:
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, encoding="utf-8") as f:
+            return json.load(f).get("forks", {})
+
+    def get(self, source_url: str) -> dict | None:
+        return self.entries.get(source_url)
+
+    def find_by_fork(self, fork_url: str) -> tuple[str, dict] | None:
+        for source_url, entry in self.entries.items():
+            if entry.get("fork_url") == fork_url:
+                return source_url, entry
+        return None
+
+    def update(self, source_url: str, **values) -> dict:
+        with self._lock, self._file_lock():
+            # 他のプロセスが更新したエントリを取り込む（同じエントリは更新時刻が新しい方を残す）
+            for url, stored in self._load().items():
+                current = self.entries.get(url)
+                if current is None or stored.get("updated_ts", 0) > current.get("updated_ts", 0):
+                    self.entries[url] = stored
+            entry = self.entries.setdefault(source_url, {"source_url": source_url})
+            entry.update(values, updated_at=time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()), updated_ts=time.time())
+            self._save()
+            return dict(entry)
+
+    @contextmanager
+    def _file_lock(self):
+        """同じマニフェストを更新するプロセス間で、読み込みから書き出しまでを排他する"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if fcntl is None:
+            yield
+            return
+        with open(f"{self.path}.lock", "w") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _save(self) -> None:
+        tmp = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"forks": self.entries}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self.path)
+
+    def mark_deleted(self, fork_url: str) -> None:
+        """fork先のURLのエントリがあれば削除済みにする（次のfork_allで作り直す）"""
+        found = self.find_by_fork(fork_url)
+        if found:
+            self.update(found[0], state="deleted", error=None, deleted_at=time.time())
+
+
+_manifests: dict[str, ForkManifest] = {}
+_manifests_lock = threading.Lock()
+
+
+def get_fork_manifest(path: str | None = None) -> ForkManifest:
+    """
+    パスごとに一つのマニフェストを返す（同時に処理するリクエストが互いの更新を上書きしないよう、プロセス内で共有する）。
+
+    Args:
+        path (str|None): マニフェストのパス（Noneの場合はFORK_MANIFEST_PATH）
+    """
+    path = os.path.abspath(path or FORK_MANIFEST_PATH)
+    with _manifests_lock:
+        manifest = _manifests.get(path)
+        if manifest is None:
+            manifest = _manifests[path] = ForkManifest(path)
+        return manifest
+
+
+class RepoLifecycleManager:
+    """
+    forkの一括作成（準備完了まで待つ）と一括削除を行う。
+    並行数はFORK_CONCURRENCYで抑え、書き込み系リクエストの間隔やレート制限の待機は共有クライアントのRateGovernorに任せる。
+    """
+
+    def __init__(
+        self,
+        http: AsyncGitHubHTTPClient,
+        headers: dict,
+        manifest: ForkManifest,
+        concurrency: int | None = None,
+        ready_timeout: float | None = None,
+        ready_interval: float | None = None,
+    ):
+        """
+        Args:
+            http (AsyncGitHubHTTPClient): 共有の非同期クライアント
+            headers (dict): GitHub API用のリクエストヘッダー
+            manifest (ForkManifest): 状態を保存するマニフェスト
+            concurrency (int|None): 同時に処理するリポジトリ数（Noneの場合はFORK_CONCURRENCY）
+            ready_timeout (float|None): forkの準備が完了するまで待つ最大秒数（Noneの場合はFORK_READY_TIMEOUT）
+            ready_interval (float|None): 準備の確認の間隔（秒）（Noneの場合はFORK_READY_INTERVAL）
+        """
+        self.http = http
+        self.headers = headers
+        self.manifest = manifest
+        self.ready_timeout = FORK_READY_TIMEOUT if ready_timeout is None else ready_timeout
+        self.ready_interval = FORK_READY_INTERVAL if ready_interval is None else ready_interval
+        self._semaphore = asyncio.Semaphore(max(FORK_CONCURRENCY if concurrency is None else concurrency, 1))
+
+    async def fork_all(self, repo_urls: list[str], wait_ready: bool = True) -> list[dict]:
+        """
+        複数のリポジトリを並行にforkする。マニフェストでready（wait_ready=Falseの場合はrequestedも）のものは要求し直さない
+        （readyでも、FORK_VERIFY_SECONDSごとの確認で存在しなかったものは作り直す）。
+
+        Args:
+            repo_urls (list[str]): fork元のURLのリスト
+            wait_ready (bool): Trueの場合はforkの準備が完了するまで待つ
+
+        Returns:
+            list[dict]: repo_urlsと同じ順序のマニフェストのエントリ
+        """
+        return list(await asyncio.gather(*(self._fork(url, wait_ready) for url in repo_urls)))
+
+    async def delete_all(self, repo_urls: list[str]) -> list[dict]:
+        """
+        複数のforkを並行に削除する。forkでないリポジトリは削除しない。既に存在しないものは削除済みとして扱う。
+
+        Args:
+            repo_urls (list[str]): 削除するforkのURLのリスト
+
+        Returns:
+            list[dict]: repo_urlsと同じ順序の結果（repo_url, status, message）
+        """
+        return list(await asyncio.gather(*(self._delete(url) for url in repo_urls)))
+
+    async def _fork(self, source_url: str, wait_ready: bool) -> dict:
+        entry = self.manifest.get(source_url) or {}
+        if entry.get("state") == "ready" and await self._still_exists(source_url, entry):
+            return dict(entry)
+        if not wait_ready and entry.get("state") == "requested":
+            return dict(entry)
+        parsed = parse_repo_url(source_url)
+        if parsed is None:
+            return self.manifest.update(source_url, state="failed", error="リポジトリURLの形式が不正です")
+        owner, repo = parsed
+        async with self._semaphore:
+            if entry.get("state") != "requested":
+                try:
+                    # フォークはGitHub側で非同期に作成されるため202が返る
+                    resp = await self.http.post(f"/repos/{owner}/{repo}/forks", headers=self.headers)
+                except Exception as e:
+                    return self.manifest.update(source_url, state="failed", error=str(e))
+                if resp.status_code not in (200, 202):
+                    return self.manifest.update(source_url, state="failed", error=f"APIエラー: {resp.status_code} {resp.text}")
+                data = resp.json()
+                entry = self.manifest.update(
+                    source_url, state="requested", error=None, fork_url=data.get("html_url"),
+                    fork_full_name=data.get("full_name"), default_branch=data.get("default_branch"),
+                    requested_at=time.time(),
+                )
+            if not wait_ready:
+                return entry
+        return await self._wait_ready(source_url, entry)
+
+    async def _still_exists(self, source_url: str, entry: dict) -> bool:
+        """
+        readyのforkがまだ存在するかを返す。最後の確認からFORK_VERIFY_SECONDS以内なら確認しない。
+        404の場合は削除済みとして記録してFalseを返す。確認できない場合（通信エラーなど）は存在するものとして扱う。
+        """
+        verified_at = entry.get("verified_at") or entry.get("ready_at") or 0
+        if time.time() - verified_at < FORK_VERIFY_SECONDS or not entry.get("fork_full_name"):
+            return True
+        try:
+            async with self._semaphore:
+                resp = await self.http.get(f"/repos/{entry['fork_full_name']}", headers=self.headers)
+        except Exception:
+            return True
+        if resp.status_code == 404:
+            self.manifest.update(source_url, state="deleted", error="forkが見つかりません")
+            return False
+        if resp.status_code == 200:
+            self.manifest.update(source_url, verified_at=time.time())
+        return True
+
+    async def _wait_ready(self, source_url: str, entry: dict) -> dict:
+        """
+        forkのデフォルトブランチを取得できるまで待つ。コピー中のforkはリポジトリ自体は存在しても、
+        ブランチの取得が404や409（Git Repository is empty）になる。待機中はセマフォを保持しない。
+        """
+        full_name = entry.get("fork_full_name")
+        branch = entry.get("default_branch")
+        if not full_name:
+            return self.manifest.update(source_url, state="failed", error="fork先のリポジトリ名を取得できませんでした")
+        deadline = time.monotonic() + self.ready_timeout
+        last_error = None
+        while True:
+            try:
+                async with self._semaphore:
+                    if not branch:
+                        resp = await self.http.get(f"/repos/{full_name}", headers=self.headers)
+                        if resp.status_code == 200:
+                            branch = resp.json().get("default_branch")
+                    if branch:
+                        resp = await self.http.get(f"/repos/{full_name}/branches/{branch}", headers=self.headers)
+                        if resp.status_code == 200:
+                            return self.manifest.update(source_url, state="ready", error=None, default_branch=branch, ready_at=time.time())
+                last_error = f"{resp.status_code} {resp.text}"
+            except Exception as e:
+                last_error = str(e)
+            if time.monotonic() + self.ready_interval > deadline:
+                return self.manifest.update(source_url, state="failed", error=f"forkの準備が{self.ready_timeout}秒以内に完了しませんでした: {last_error}")
+            await asyncio.sleep(self.ready_interval)
+
+    async def _delete(self, repo_url: str) -> dict:
+        parsed = parse_repo_url(repo_url)
+        if parsed is None:
+            return {"repo_url": repo_url, "status": "error", "message": "リポジトリURLの形式が不正です"}
+        owner, repo = parsed
+        async with self._semaphore:
+            try:
+                repo_resp = await self.http.get(f"/repos/{owner}/{repo}", headers=self.headers)
+                if repo_resp.status_code == 404:
+                    result = {"repo_url": repo_url, "status": "success", "message": f"{repo_url} は既に存在しません"}
+                elif repo_resp.status_code != 200:
+                    return {"repo_url": repo_url, "status": "error", "message": f"APIエラー: {repo_resp.status_code} {repo_resp.text}"}
+                # フォークでないリポジトリは削除しない
+                elif not repo_resp.json().get("fork"):
+                    return {"repo_url": repo_url, "status": "error", "message": "このリポジトリはフォークではないため削除できません"}
+                else:
+                    resp = await self.http.delete(f"/repos/{owner}/{repo}", headers=self.headers)
+                    if resp.status_code not in (204, 404):
+                        return {"repo_url": repo_url, "status": "error", "message": f"APIエラー: {resp.status_code} {resp.text}"}
+                    result = {"repo_url": repo_url, "status": "success", "message": f"{repo_url} を削除しました"}
+            except Exception as e:
+                return {"repo_url": repo_url, "status": "error", "message": str(e)}
+        self.manifest.mark_deleted(repo_url)
+        return result
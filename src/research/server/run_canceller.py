@@ -0,0 +1,159 @@
+"""
+同じブランチに新しいcommitがpushされた後も実行・待機を続ける古いワークフロー実行をキャンセルするモジュール。
+修正ループでは作業ブランチに毎回commitをpushするため、古いcommitのrun（待ちきれなかったrunや、
+リポジトリに元からあるワークフローのrun）がランナーとキューを使い続け、ループの回数とともに待ち時間が伸びる。
+ブランチの先頭が登録したcommitであることを確認してから、登録したcommitのrunと同じワークフローの、
+それ以外のSHAの未完了のrunをキャンセルする（リポジトリの別のワークフローのrunはキャンセルしない）。
+"""
+import asyncio
+import os
+import statistics
+import time
+from collections import OrderedDict
+from datetime import datetime
+from research.server.http_client import AsyncGitHubHTTPClient
+
+# 新しいcommitの結果を待つ際に、同じブランチの古いrunをキャンセルするか
+CANCEL_SUPERSEDED_RUNS = os.environ.get("GITHUB_CANCEL_SUPERSEDED_RUNS", "1") == "1"
+# ブランチのrunを取得する件数（完了したrunの所要時間から、キャンセルで節約できた時間を見積もる）
+CANCEL_RUNS_PER_PAGE = 50
+
+_PENDING_STATUSES = ("queued", "in_progress", "pending", "waiting", "requested")
+
+
+def _timestamp(value: str | None) -> float | None:
+    if not value:
+        return None
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+
+
+def _duration(run: dict) -> float | None:
+    """完了したrunの所要時間（秒）"""
+    start = _timestamp(run.get("run_started_at") or run.get("created_at"))
+    end = _timestamp(run.get("updated_at"))
+    if start is None or end is None or end < start:
+        return None
+    return end - start
+
+
+class SupersededRunCanceller:
+    """
+    (リポジトリ, ブランチ, commit SHA)ごとに一度だけ古いrunをキャンセルし、その結果を保持する。
+    同じcommitの結果を繰り返し問い合わせる場合（完了待ちのポーリング）は、保持した結果をそのまま返す。
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._results: OrderedDict[tuple[str, str, str, str], dict] = OrderedDict()
+        self._locks: dict[tuple[str, str, str, str], asyncio.Lock] = {}
+        self.stats = {"checked": 0, "cancelled": 0, "saved_seconds": 0.0, "last_error": None}
+
+    async def cancel_superseded(self, http: AsyncGitHubHTTPClient, headers: dict, owner: str, repo: str, branch: str, head_sha: str) -> dict:
+        """
+        branchの先頭がhead_shaであれば、head_shaのrunと同じワークフローの、同じブランチの他のSHAの未完了runをキャンセルする。
+
+        Args:
+            http (AsyncGitHubHTTPClient): 共有の非同期クライアント
+            headers (dict): GitHub API用のリクエストヘッダー
+            owner (str): リポジトリのオーナー
+            repo (str): リポジトリ名
+            branch (str): 作業ブランチ名
+            head_sha (str): 新しくpushしたcommitのSHA
+
+        Returns:
+            dict: cancelled_runs（キャンセルしたrunのid, head_sha, status, 経過秒数, 残り時間の見積もり）と
+                  saved_seconds（節約できたランナーの実行時間の見積もり（秒）。見積もれない場合はNone）
+        """
+        key = (owner.lower(), repo.lower(), branch, head_sha)
+        if key in self._results:
+            self._results.move_to_end(key)
+            return self._results[key]
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            if key in self._results:
+                return self._results[key]
+            result = await self._cancel(http, headers, owner, repo, branch, head_sha)
+            if result is not None:
+                self._results[key] = result
+                while len(self._results) > self.max_entries:
+                    self._results.popitem(last=False)
+        self._locks.pop(key, None)
+        return result or {"cancelled_runs": [], "saved_seconds": None}
+
+    async def _cancel(self, http: AsyncGitHubHTTPClient, headers: dict, owner: str, repo: str, branch: str, head_sha: str) -> dict | None:
+        """
+        キャンセルを実行する。ブランチの先頭がまだhead_shaでない（pushが反映されていない）場合や、
+        head_shaのrunがまだ作成されていない場合はNoneを返し、次回に再確認する
+        """
+        self.stats["checked"] += 1
+        try:
+            branch_resp = await http.get_conditional(f"/repos/{owner}/{repo}/branches/{branch}", headers=headers)
+            if branch_resp.status_code != 200:
+                return None
+            # 古いcommitの結果を問い合わせた場合に、新しいcommitのrunをキャンセルしない
+            if branch_resp.json().get("commit", {}).get("sha") != head_sha:
+                return None
+            runs_resp = await http.get(f"/repos/{owner}/{repo}/actions/runs", headers=headers,
+                                       params={"branch": branch, "per_page": CANCEL_RUNS_PER_PAGE})
+            if runs_resp.status_code != 200:
+                return None
+            runs = runs_resp.json().get("workflow_runs", [])
+        except Exception as e:
+            self.stats["last_error"] = str(e)
+            return None
+
+        # ワークフローごとの所要時間の中央値（キャンセルされたrunは含めない）
+        durations: dict[int | None, list[float]] = {}
+        for run in runs:
+            if run.get("status") == "completed" and run.get("conclusion") not in ("cancelled", "skipped"):
+                duration = _duration(run)
+                if duration is not None:
+                    durations.setdefault(run.get("workflow_id"), []).append(duration)
+        typical = {workflow_id: statistics.median(values) for workflow_id, values in durations.items()}
+
+        # 新しいcommitで実行されるワークフローだけを対象にする。runがまだ作成されていなければ次回に再確認する
+        workflow_ids = {run.get("workflow_id") for run in runs if run.get("head_sha") == head_sha}
+        if not workflow_ids:
+            return None
+        now = time.time()
+        cancelled = []
+        for run in runs:
+            if run.get("head_sha") == head_sha or run.get("status") not in _PENDING_STATUSES:
+                continue
+            if run.get("workflow_id") not in workflow_ids:
+                continue
+            try:
+                resp = await http.post(f"/repos/{owner}/{repo}/actions/runs/{run['id']}/cancel", headers=headers)
+            except Exception as e:
+                self.stats["last_error"] = str(e)
+                continue
+            # 409は既に完了している場合
+            if resp.status_code != 202:
+                continue
+            started = _timestamp(run.get("run_started_at")) if run.get("status") == "in_progress" else None
+            elapsed = max(now - started, 0.0) if started else 0.0
+            expected = typical.get(run.get("workflow_id"))
+            remaining = max(expected - elapsed, 0.0) if expected is not None else None
+            cancelled.append({
+                "id": run["id"], "name": run.get("name"), "head_sha": run.get("head_sha"), "status": run.get("status"),
+                "elapsed_seconds": round(elapsed, 1),
+                "estimated_remaining_seconds": None if remaining is None else round(remaining, 1),
+            })
+        estimates = [r["estimated_remaining_seconds"] for r in cancelled if r["estimated_remaining_seconds"] is not None]
+        saved_seconds = round(sum(estimates), 1) if estimates else None
+        self.stats["cancelled"] += len(cancelled)
+        self.stats["saved_seconds"] += saved_seconds or 0.0
+        return {"cancelled_runs": cancelled, "saved_seconds": saved_seconds}
+
+    def snapshot(self) -> dict:
+        return {**self.stats, "saved_seconds": round(self.stats["saved_seconds"], 1), "registered": len(self._results)}
+
+
+_canceller: SupersededRunCanceller | None = None
+
+
+def get_run_canceller() -> SupersededRunCanceller:
+    global _canceller
+    if _canceller is None:
+        _canceller = SupersededRunCanceller()
+    return _canceller
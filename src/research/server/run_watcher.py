@@ -0,0 +1,408 @@
+"""
+GitHub Actionsのワークフロー実行の完了を監視するバックグラウンドウォッチャー。
+呼び出し側は(リポジトリ, commit SHA)を登録してFutureを待つだけでよく、
+ポーリングはリポジトリごとに一つのループにまとめて行う。
+途中経過が必要な場合はsubscribeでQueueを受け取り、runの状態の変化とジョブごとの状態の変化を順に受け取る。
+"""
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from research.server.http_client import get_async_http_client, github_headers
+
+# 共有ウォッチャーのポーリング間隔（秒）。runが見つかっていない場合、開始待ちの場合、実行中の場合
+WATCH_DISCOVERY_INTERVAL = float(os.environ.get("GITHUB_WATCH_DISCOVERY_INTERVAL", "5"))
+WATCH_QUEUED_INTERVAL = float(os.environ.get("GITHUB_WATCH_QUEUED_INTERVAL", "15"))
+WATCH_IN_PROGRESS_INTERVAL = float(os.environ.get("GITHUB_WATCH_IN_PROGRESS_INTERVAL", "5"))
+# 待機登録の何秒前までに届いた完了runを、登録と同時に使うか（それより古いものは同じcommitの以前の実行とみなす）
+WATCH_RECENT_SECONDS = float(os.environ.get("GITHUB_WATCH_RECENT_SECONDS", "60"))
+
+
+class _Waiter:
+    """一つのcommit SHAに対する待機情報"""
+    def __init__(self, sha: str, branch: str | None):
+        self.sha = sha
+        self.branch = branch
+        self.futures: list[asyncio.Future] = []
+        self.subscribers: list[asyncio.Queue] = []
+        self.run: dict | None = None
+        # 観測したジョブ（IDごとの最新の状態）。購読者がいる場合のみ取得する
+        self.jobs: dict[int, dict] = {}
+        self.registered_at = time.monotonic()
+        # branch単位の取得でrunが見つからなかった回数（見つからないSHAは次からhead_shaで絞り込む）
+        self.missed = 0
+
+
+class _RepoWatch:
+    """一つのリポジトリに対するポーリングループの状態"""
+    def __init__(self):
+        self.waiters: dict[str, _Waiter] = {}
+        self.wakeup = asyncio.Event()
+        self.task: asyncio.Task | None = None
+
+
+class RunWatcher:
+    """
+    待機中のcommit SHAをリポジトリ単位でまとめてポーリングし、runが完了したらFutureを解決する。
+    runの絞り込みはhead_sha/branchのクエリでGitHub側に任せ、ポーリング間隔はrunの状態に応じて変える。
+    """
+
+    def __init__(
+        self,
+        discovery_interval: float = 5.0,
+        queued_interval: float = 15.0,
+        in_progress_interval: float = 5.0,
+        per_page: int = 30,
+        recent_size: int = 256,
+        recent_seconds: float = 60.0,
+    ):
+        """
+        Args:
+            discovery_interval (float): runがまだ見つかっていないSHAがある場合のポーリング間隔（秒）
+            queued_interval (float): runがqueued/pendingなど開始待ちの場合のポーリング間隔（秒）
+            in_progress_interval (float): runが実行中の場合のポーリング間隔（秒）
+            per_page (int): branch単位でまとめて取得する際の1ページあたりのrun数
+            recent_size (int): 待機登録より先にWebhookで届いた完了runを保持する件数
+            recent_seconds (float): 待機登録の何秒前までに届いた完了runを使うか
+        """
+        self.discovery_interval = discovery_interval
+        self.queued_interval = queued_interval
+        self.in_progress_interval = in_progress_interval
+        self.per_page = per_page
+        self.loop = asyncio.get_running_loop()
+        self._repos: dict[tuple[str, str], _RepoWatch] = {}
+        # 待機登録より先に完了したrun（Webhookが先に届いた場合）と、それを受け取った時刻
+        self._recent: OrderedDict[tuple[str, str, str], tuple[dict, float]] = OrderedDict()
+        self.recent_size = recent_size
+        self.recent_seconds = recent_seconds
+        self.stats = {"polls": 0, "api_calls": 0, "job_polls": 0, "resolved": 0, "webhooks": 0, "events": 0, "last_error": None}
+
+    def register(self, owner: str, repo: str, sha: str, branch: str | None = None) -> asyncio.Future:
+        """
+        commit SHAを監視対象に登録し、runの完了時にrunの辞書で解決されるFutureを返す。
+
+        Args:
+            owner (str): リポジトリのオーナー
+            repo (str): リポジトリ名
+            sha (str): 対象コミットのSHA
+            branch (str|None): コミットがpushされたブランチ名（分かる場合は同じブランチのSHAを1回の取得でまとめる）
+
+        Returns:
+            asyncio.Future: 完了したrun（dict）で解決されるFuture
+        """
+        watch, waiter = self._waiter(owner, repo, sha, branch)
+        future = self.loop.create_future()
+        waiter.futures.append(future)
+        self._start(owner, repo, sha, watch)
+        return future
+
+    def subscribe(self, owner: str, repo: str, sha: str, branch: str | None = None) -> asyncio.Queue:
+        """
+        commit SHAを監視対象に登録し、状態の変化を受け取るQueueを返す。
+        Queueには("run", run)と("job", job)が変化のたびに入り、runの完了後は各ジョブの最終状態、完了したrun、Noneの順に入る。
+
+        Args:
+            owner (str): リポジトリのオーナー
+            repo (str): リポジトリ名
+            sha (str): 対象コミットのSHA
+            branch (str|None): コミットがpushされたブランチ名
+
+        Returns:
+            asyncio.Queue: 状態の変化を受け取るQueue
+        """
+        watch, waiter = self._waiter(owner, repo, sha, branch)
+        queue: asyncio.Queue = asyncio.Queue()
+        waiter.subscribers.append(queue)
+        # 既に観測済みの状態から受け取れるようにする
+        if waiter.run is not None:
+            queue.put_nowait(("run", waiter.run))
+        for job in waiter.jobs.values():
+            queue.put_nowait(("job", job))
+        self._start(owner, repo, sha, watch)
+        return queue
+
+    def _waiter(self, owner: str, repo: str, sha: str, branch: str | None) -> tuple[_RepoWatch, _Waiter]:
+        key = (owner, repo)
+        watch = self._repos.get(key)
+        if watch is None:
+            watch = self._repos[key] = _RepoWatch()
+        waiter = watch.waiters.get(sha)
+        if waiter is None:
+            waiter = watch.waiters[sha] = _Waiter(sha, branch)
+        elif waiter.branch is None:
+            waiter.branch = branch
+        return watch, waiter
+
+    def _start(self, owner: str, repo: str, sha: str, watch: _RepoWatch) -> None:
+        recent = self._recent.get((owner, repo, sha))
+        # 直前に届いた完了だけを使う。古い完了は同じcommitの再実行（re-runや再dispatch）の前の結果のため、ポーリングで新しいrunを待つ
+        if recent is not None and time.monotonic() - recent[1] <= self.recent_seconds:
+            # Webhookで既に完了が届いている
+            self.notify_run(owner, repo, recent[0])
+            return
+        # 新しいSHAはすぐにポーリングする
+        watch.wakeup.set()
+        if watch.task is None or watch.task.done():
+            watch.task = self.loop.create_task(self._watch_repo((owner, repo), watch))
+
+    def unregister(self, owner: str, repo: str, sha: str, future: asyncio.Future) -> None:
+        """Futureの待機をやめる。同じSHAを待つFutureと購読者がいなくなれば監視対象から外す"""
+        waiter = self._find_waiter(owner, repo, sha)
+        if waiter is not None and future in waiter.futures:
+            waiter.futures.remove(future)
+        self._drop_if_idle(owner, repo, sha)
+
+    def unsubscribe(self, owner: str, repo: str, sha: str, queue: asyncio.Queue) -> None:
+        """Queueの購読をやめる。同じSHAを待つFutureと購読者がいなくなれば監視対象から外す"""
+        waiter = self._find_waiter(owner, repo, sha)
+        if waiter is not None and queue in waiter.subscribers:
+            waiter.subscribers.remove(queue)
+        self._drop_if_idle(owner, repo, sha)
+
+    def _find_waiter(self, owner: str, repo: str, sha: str) -> _Waiter | None:
+        watch = self._repos.get((owner, repo))
+        return watch.waiters.get(sha) if watch is not None else None
+
+    def _drop_if_idle(self, owner: str, repo: str, sha: str) -> None:
+        waiter = self._find_waiter(owner, repo, sha)
+        if waiter is not None and not waiter.futures and not waiter.subscribers:
+            del self._repos[(owner, repo)].waiters[sha]
+
+    def latest(self, owner: str, repo: str, sha: str) -> dict | None:
+        """監視中のSHAについて最後に観測したrunを返す（未観測ならNone）"""
+        watch = self._repos.get((owner, repo))
+        if watch is None or sha not in watch.waiters:
+            return None
+        return watch.waiters[sha].run
+
+    def notify_run(self, owner: str, repo: str, run: dict) -> None:
+        """
+        観測したrunの状態を反映し、完了していれば同じSHAを待つFutureをすべて解決する。
+
+        Args:
+            owner (str): リポジトリのオーナー
+            repo (str): リポジトリ名
+            run (dict): GitHub APIのworkflow_run
+        """
+        sha = run.get("head_sha")
+        if run.get("status") == "completed":
+            self._remember(owner, repo, sha, run)
+        watch = self._repos.get((owner, repo))
+        if watch is None:
+            return
+        waiter = watch.waiters.get(sha)
+        if waiter is None:
+            return
+        # 同じSHAに複数のrunがある場合は新しいrunを優先する
+        previous = waiter.run
+        if previous is not None and run.get("id", 0) < previous.get("id", 0):
+            return
+        waiter.run = run
+        completed = run.get("status") == "completed"
+        changed = previous is None or (previous.get("id"), previous.get("status")) != (run.get("id"), run.get("status"))
+        if changed and not (completed and waiter.subscribers):
+            self._publish(waiter, ("run", run))
+        if completed:
+            for future in waiter.futures:
+                if not future.done():
+                    future.set_result(run)
+            del watch.waiters[sha]
+            self.stats["resolved"] += 1
+            if waiter.subscribers:
+                # 購読者には各ジョブの最終状態を送ってから完了を通知する
+                self.loop.create_task(self._finish_subscribers(owner, repo, waiter))
+
+    def notify_job(self, owner: str, repo: str, job: dict) -> None:
+        """
+        観測したジョブの状態を購読者に送る（Webhookのworkflow_jobなど）。
+
+        Args:
+            owner (str): リポジトリのオーナー
+            repo (str): リポジトリ名
+            job (dict): GitHub APIのworkflow_job
+        """
+        waiter = self._find_waiter(owner, repo, job.get("head_sha"))
+        if waiter is None or not waiter.subscribers:
+            return
+        if waiter.run is not None and job.get("run_id") != waiter.run.get("id"):
+            return
+        self._update_job(waiter, job)
+
+    def _update_job(self, waiter: _Waiter, job: dict) -> None:
+        previous = waiter.jobs.get(job["id"])
+        if previous is not None and (previous.get("status"), previous.get("conclusion")) == (job.get("status"), job.get("conclusion")):
+            return
+        waiter.jobs[job["id"]] = job
+        self._publish(waiter, ("job", job))
+
+    def _publish(self, waiter: _Waiter, event: tuple[str, dict] | None) -> None:
+        for queue in waiter.subscribers:
+            queue.put_nowait(event)
+        if event is not None:
+            self.stats["events"] += 1
+
+    async def _poll_jobs(self, owner: str, repo: str, waiter: _Waiter) -> None:
+        http = get_async_http_client()
+        self.stats["job_polls"] += 1
+        # 変化がなければ304が返り、レート制限を消費しない
+        resp = await http.get_conditional(
+            f"/repos/{owner}/{repo}/actions/runs/{waiter.run['id']}/jobs", headers=github_headers(), params={"per_page": 100})
+        self.stats["api_calls"] += 1
+        if resp.status_code != 200:
+            self.stats["last_error"] = f"{resp.status_code} {resp.text[:200]}"
+            return
+        for job in resp.json().get("jobs", []):
+            self._update_job(waiter, job)
+
+    async def _finish_subscribers(self, owner: str, repo: str, waiter: _Waiter) -> None:
+        try:
+            await self._poll_jobs(owner, repo, waiter)
+        except Exception as e:
+            self.stats["last_error"] = str(e)
+        finally:
+            self._publish(waiter, ("run", waiter.run))
+            self._publish(waiter, None)
+
+    def _remember(self, owner: str, repo: str, sha: str, run: dict) -> None:
+        key = (owner, repo, sha)
+        current = self._recent.get(key)
+        if current is not None and run.get("id", 0) < current[0].get("id", 0):
+            return
+        self._recent[key] = (run, time.monotonic())
+        self._recent.move_to_end(key)
+        while len(self._recent) > self.recent_size:
+            self._recent.popitem(last=False)
+
+    def poke(self, owner: str, repo: str) -> None:
+        """リポジトリのポーリングを次の間隔を待たずに行う（ジョブの完了通知を受けた場合など）"""
+        watch = self._repos.get((owner, repo))
+        if watch is not None:
+            watch.wakeup.set()
+
+    async def wait_for_run(self, owner: str, repo: str, sha: str, branch: str | None = None, timeout: float = 300.0) -> dict | None:
+        """
+        runの完了を最大timeout秒待つ。
+
+        Returns:
+            dict|None: 完了したrun。タイムアウト時は最後に観測したrun（未完了）、一度も観測できなければNone
+        """
+        future = self.register(owner, repo, sha, branch)
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            return self.latest(owner, repo, sha)
+        finally:
+            self.unregister(owner, repo, sha, future)
+
+    def pending(self) -> dict:
+        """監視中のSHAをリポジトリごとに返す"""
+        return {
+            f"{owner}/{repo}": {
+                sha: (waiter.run or {}).get("status", "not_found")
+                for sha, waiter in watch.waiters.items()
+            }
+            for (owner, repo), watch in self._repos.items()
+        }
+
+    async def stop(self) -> None:
+        """全てのポーリングループを停止する"""
+        tasks = [watch.task for watch in self._repos.values() if watch.task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._repos.clear()
+
+    async def _watch_repo(self, key: tuple[str, str], watch: _RepoWatch) -> None:
+        owner, repo = key
+        while watch.waiters:
+            watch.wakeup.clear()
+            try:
+                await self._poll_repo(owner, repo, watch)
+            except Exception as e:
+                self.stats["last_error"] = str(e)
+            if not watch.waiters:
+                break
+            try:
+                await asyncio.wait_for(watch.wakeup.wait(), self._next_interval(watch))
+            except asyncio.TimeoutError:
+                pass
+        if self._repos.get(key) is watch and not watch.waiters:
+            del self._repos[key]
+
+    async def _poll_repo(self, owner: str, repo: str, watch: _RepoWatch) -> None:
+        http = get_async_http_client()
+        self.stats["polls"] += 1
+        # 同じブランチのSHAは1回の取得にまとめ、それ以外はhead_shaで絞り込む
+        # 実行の多いブランチでは最新per_page件に入らないことがあるため、一度まとめて取得しても見つからなかったSHAはhead_shaで絞り込む
+        groups: dict[str | None, list[_Waiter]] = {}
+        for waiter in list(watch.waiters.values()):
+            groups.setdefault(waiter.branch if waiter.missed == 0 else None, []).append(waiter)
+        queries = []
+        grouped: list[_Waiter] = []
+        for branch, waiters in groups.items():
+            if branch is not None and len(waiters) > 1:
+                queries.append({"branch": branch, "per_page": self.per_page})
+                grouped.extend(waiters)
+            else:
+                for waiter in waiters:
+                    params = {"head_sha": waiter.sha, "per_page": self.per_page}
+                    if waiter.branch is not None:
+                        params["branch"] = waiter.branch
+                    queries.append(params)
+        for params in queries:
+            # 変化がなければ304が返り、レート制限を消費しない
+            resp = await http.get_conditional(f"/repos/{owner}/{repo}/actions/runs", headers=github_headers(), params=params)
+            self.stats["api_calls"] += 1
+            if resp.status_code != 200:
+                self.stats["last_error"] = f"{resp.status_code} {resp.text[:200]}"
+                continue
+            for run in resp.json().get("workflow_runs", []):
+                self.notify_run(owner, repo, run)
+        for waiter in grouped:
+            if waiter.run is None:
+                waiter.missed += 1
+        # 購読者がいる実行中のrunはジョブごとの状態も取得する
+        for waiter in list(watch.waiters.values()):
+            if waiter.subscribers and waiter.run is not None and waiter.run.get("status") == "in_progress":
+                await self._poll_jobs(owner, repo, waiter)
+
+    def _next_interval(self, watch: _RepoWatch) -> float:
+        intervals = []
+        for waiter in watch.waiters.values():
+            status = waiter.run.get("status") if waiter.run else None
+            if status is None:
+                intervals.append(self.discovery_interval)
+            elif status == "in_progress":
+                intervals.append(self.in_progress_interval)
+            else:
+                intervals.append(self.queued_interval)
+        return min(intervals, default=self.discovery_interval)
+
+
+_watcher: RunWatcher | None = None
+
+
+def get_run_watcher() -> RunWatcher:
+    """
+    実行中のイベントループで共有するRunWatcherを返す（ループが変わった場合は作り直す）。
+
+    Returns:
+        RunWatcher: 共有ウォッチャー
+    """
+    global _watcher
+    if _watcher is None or _watcher.loop is not asyncio.get_running_loop():
+        _watcher = RunWatcher(
+            discovery_interval=WATCH_DISCOVERY_INTERVAL,
+            queued_interval=WATCH_QUEUED_INTERVAL,
+            in_progress_interval=WATCH_IN_PROGRESS_INTERVAL,
+            recent_seconds=WATCH_RECENT_SECONDS,
+        )
+    return _watcher
+
+
+async def stop_run_watcher() -> None:
+    """共有ウォッチャーを停止する（サーバー終了時に呼び出す）"""
+    global _watcher
+    if _watcher is not None:
+        await _watcher.stop()
+        _watcher = None
@@ -0,0 +1,655 @@
+"""
+失敗したワークフロージョブのログ取得を担当するモジュール。
+ジョブごとのログを上限付きの並列数でダウンロードし、合計バイト数の上限を超えた分は切り捨てる。
+ログはスプールファイルに流し込みながらエラー周辺の行だけを抽出し、全体はファイルに保存してパスを返す。
+"""
+import asyncio
+import io
+import os
+import re
+import shutil
+import tempfile
+import time
+import zipfile
+import httpx
+from collections import deque
+from datetime import datetime
+from research.server.http_client import AsyncGitHubHTTPClient
+from research.server.log_cache import JobLogCache, get_job_log_cache
+from research.tools.log_filter import ErrorContextExtractor, LineSplitter
+
+# 失敗ジョブのログを同時にダウンロードする最大数
+LOG_FETCH_CONCURRENCY = int(os.environ.get("GITHUB_LOG_FETCH_CONCURRENCY", "4"))
+# 1回のrunで取得するログの合計バイト数の上限
+LOG_BYTE_BUDGET = int(os.environ.get("GITHUB_LOG_BYTE_BUDGET", str(200 * 1024 * 1024)))
+# ダウンロード中のログをメモリ上に保持する上限（超えるとディスク上の一時ファイルに移る）
+LOG_SPOOL_MEMORY_BYTES = int(os.environ.get("GITHUB_LOG_SPOOL_MEMORY_BYTES", str(8 * 1024 * 1024)))
+# ログの取得方法（"full": 全体をストリーミング取得、"tail": 末尾からRangeリクエストで必要な分だけ取得）
+LOG_FETCH_MODE = os.environ.get("GITHUB_LOG_FETCH_MODE", "full")
+# tailモードで最初に取得する末尾のバイト数と、エラーが見つからない場合に範囲を広げる倍率
+LOG_TAIL_FETCH_BYTES = int(os.environ.get("GITHUB_LOG_TAIL_FETCH_BYTES", str(64 * 1024)))
+LOG_TAIL_FETCH_GROWTH = 4
+# 取得したジョブログを圧縮してディスクにキャッシュし、同じジョブの再取得ではダウンロードしないか
+LOG_CACHE_ENABLED = os.environ.get("GITHUB_LOG_CACHE", "true").lower() not in ("0", "false", "no")
+# ログを取得する前に、check runのアノテーションで失敗の原因が分かるか確認するか
+LOG_USE_ANNOTATIONS = os.environ.get("GITHUB_LOG_USE_ANNOTATIONS", "true").lower() not in ("0", "false", "no")
+# 抜粋でエラー行の前後に残す行数（ParserTool.filterの最大値と同じ）
+LOG_EXCERPT_CONTEXT = 5
+# ログファイル1つあたりの抜粋の最大文字数
+LOG_EXCERPT_MAX_CHARS = int(os.environ.get("GITHUB_LOG_EXCERPT_MAX_CHARS", "100000"))
+# エラーキーワードが見つからない場合に代わりに返す末尾の行数
+LOG_TAIL_LINES = 50
+# 失敗したstepの抜粋に添える、直前のstepの末尾の行数
+LOG_PRECEDING_STEP_LINES = int(os.environ.get("GITHUB_LOG_PRECEDING_STEP_LINES", "20"))
+# 失敗の原因を示さない定型のアノテーション（これしかない場合はログを取得する）
+_GENERIC_ANNOTATION_PATTERN = re.compile(r"^(Process completed with exit code \d+|The operation was canceled)\.?$")
+# ジョブログの各行の先頭に付くタイムスタンプ（例: 2025-10-05T04:37:35.7262190Z）
+_TIMESTAMP_PATTERN = re.compile(r"^\ufeff?(\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d)(\.\d+)?Z")
+_CHUNK_SIZE = 64 * 1024
+
+
+class _ByteBudget:
+    """一つのジョブのダウンロードで取得できる残りバイト数"""
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.used = 0
+
+    @classmethod
+    def split(cls, limit: int, count: int) -> list["_ByteBudget"]:
+        """
+        limitバイトをcount件のジョブに均等に割り当てる（割り切れない分は先頭のジョブから1バイトずつ）。
+        ダウンロードが終わった順に確保すると、先に失敗したジョブが切り捨てられ、結果も実行ごとに変わるため。
+        """
+        share, remainder = divmod(max(limit, 0), max(count, 1))
+        return [cls(share + (1 if i < remainder else 0)) for i in range(count)]
+
+    def take(self, size: int) -> int:
+        """最大sizeバイトを確保し、確保できたバイト数を返す"""
+        granted = max(min(size, self.limit - self.used), 0)
+        self.used += granted
+        return granted
+
+
+class _Segment:
+    """抜粋を作る区間（ログ全体、ZIP内のファイル、失敗したstep）ごとの抽出状態"""
+    def __init__(self, label: str, context: int, max_chars: int, tail_lines: int):
+        self.label = label
+        self.extractor = ErrorContextExtractor(context, max_chars)
+        self.tail: deque[str] = deque(maxlen=tail_lines)
+        self.preceding: list[str] = []
+        self.lines = 0
+
+    def feed(self, line: str) -> None:
+        self.extractor.feed(line)
+        self.tail.append(line)
+        self.lines += 1
+
+    def excerpt(self) -> str:
+        parts = []
+        if self.preceding:
+            parts.append("(直前のstepの末尾)\n" + "\n".join(self.preceding))
+        # エラーキーワードが一つもなければ、区間末尾の数行を代わりに返す
+        if self.extractor.matched == 0:
+            parts.append("(エラーキーワードを含む行がないため、ログ末尾を表示します)\n" + "\n".join(self.tail))
+        else:
+            parts.append(self.extractor.result())
+            if self.extractor.truncated:
+                parts.append(f"(抜粋が上限({self.extractor.max_chars}文字)に達したため、以降を省略しました)")
+        return "\n".join(parts)
+
+
+def _parse_time(value: str) -> float:
+    return datetime.fromisoformat(value).timestamp()
+
+
+def failing_step_windows(steps: list[dict]) -> list[tuple[dict, float, float]]:
+    """
+    jobs APIのstepsから、失敗したstepと実行時間帯（開始時刻、終了時刻）を返す。
+    stepの時刻は秒単位のため、終了時刻は1秒後までを含める。
+    """
+    windows = []
+    for step in steps:
+        if step.get("conclusion") != "failure" or not step.get("started_at") or not step.get("completed_at"):
+            continue
+        try:
+            windows.append((step, _parse_time(step["started_at"]), _parse_time(step["completed_at"]) + 1.0))
+        except ValueError:
+            continue
+    return windows
+
+
+class _StepSelector:
+    """
+    ログの各行の先頭のタイムスタンプを失敗したstepの時間帯と照らし合わせ、stepごとの区間に振り分ける。
+    時間帯に入る直前の数行は、直前のstepの末尾として区間に添える。
+    """
+    def __init__(self, windows: list[tuple[_Segment, float, float]], preceding_lines: int):
+        self.windows = windows
+        self.end = max(end for _, _, end in windows)
+        self.done = False
+        self._preceding: deque[str] = deque(maxlen=preceding_lines)
+        self._started: set[int] = set()
+        self._last_ts: float | None = None
+        self._second: tuple[str, float] = ("", 0.0)
+
+    def _timestamp(self, line: str) -> float | None:
+        m = _TIMESTAMP_PATTERN.match(line)
+        if not m:
+            return None
+        # 同じ秒の行が続くため、秒までの変換結果を使い回す
+        second = m.group(1)
+        if second != self._second[0]:
+            self._second = (second, _parse_time(second + "+00:00"))
+        return self._second[1] + float(m.group(2) or 0)
+
+    def feed(self, line: str) -> None:
+        ts = self._timestamp(line)
+        # タイムスタンプのない行は直前の行と同じ時刻として扱う
+        if ts is None:
+            ts = self._last_ts
+        else:
+            self._last_ts = ts
+        if ts is None:
+            self._preceding.append(line)
+            return
+        if ts >= self.end:
+            # 失敗したstepが全て終わった後の行（後処理のstepなど）は不要
+            self.done = True
+            return
+        for segment, start, end in self.windows:
+            if start <= ts < end:
+                if id(segment) not in self._started:
+                    segment.preceding = list(self._preceding)
+                    self._started.add(id(segment))
+                segment.feed(line)
+                return
+        self._preceding.append(line)
+
+
+class _StreamingLogIngest:
+    """
+    ダウンロード中のジョブログをスプールファイルに書き出しながら、エラー周辺の行を抽出する。
+    一定サイズまではメモリ上、それを超えるとディスク上の一時ファイルに保持するため、巨大なログでもメモリ使用量は増えない。
+    jobs APIのstepsが分かる場合は、失敗したstepの区間だけを抜粋の対象にし、それ以降の行が届いた時点でdoneになる。
+    ZIPで返ってきた場合は、ダウンロード完了後に中のファイルごとに同じ抽出を行う。
+    """
+    def __init__(self, context: int, max_chars: int, tail_lines: int, spool_bytes: int, steps: list[dict] | None = None):
+        self.context = context
+        self.max_chars = max_chars
+        self.tail_lines = tail_lines
+        self.file = tempfile.SpooledTemporaryFile(max_size=spool_bytes)
+        self.size = 0
+        self.is_zip: bool | None = None
+        self._splitter = LineSplitter()
+        self._whole = _Segment("raw_log", context, max_chars, tail_lines)
+        windows = failing_step_windows(steps or [])
+        self._step_numbers = [step.get("number") for step, _, _ in windows]
+        self._step_segments = [
+            _Segment(f"step:{step.get('number')} {step.get('name')}", context, max_chars, tail_lines)
+            for step, _, _ in windows
+        ]
+        self._selector = _StepSelector(
+            [(segment, start, end) for segment, (_, start, end) in zip(self._step_segments, windows)],
+            LOG_PRECEDING_STEP_LINES,
+        ) if windows else None
+
+    @property
+    def matched(self) -> bool:
+        """エラーキーワードを含む行があったか"""
+        return self._whole.extractor.matched > 0
+
+    @property
+    def done(self) -> bool:
+        """失敗したstepの区間を全て受信し、以降のダウンロードが不要か"""
+        return self._selector is not None and self._selector.done
+
+    def feed(self, chunk: bytes) -> None:
+        """受信したチャンクを書き出し、テキストログなら行単位で抽出する"""
+        if not chunk:
+            return
+        if self.is_zip is None:
+            self.is_zip = chunk.startswith(b"PK")
+        self.file.write(chunk)
+        self.size += len(chunk)
+        if not self.is_zip:
+            for line in self._splitter.feed(chunk):
+                self._feed_line(line)
+
+    def _feed_line(self, line: str) -> None:
+        # タイムスタンプが想定と違う場合に備えて、ログ全体の抜粋も並行して作る
+        self._whole.feed(line)
+        if self._selector is not None and not self._selector.done:
+            self._selector.feed(line)
+
+    def finish(self) -> tuple[list[tuple[str, str]], int]:
+        """
+        抽出を完了する。
+
+        Returns:
+            tuple[list[tuple[str, str]], int]: (見出しのラベル, 抜粋)のリストと、デバッグ情報に加算する値
+        """
+        if not self.is_zip:
+            for line in self._splitter.finish():
+                self._feed_line(line)
+            step_segments = [segment for segment in self._step_segments if segment.lines]
+            if step_segments:
+                return [(segment.label, segment.excerpt()) for segment in step_segments], 1000
+            return [(self._whole.label, self._whole.excerpt())], 1000
+        debug = 0
+        self.file.seek(0)
+        try:
+            z = zipfile.ZipFile(self.file)
+        except Exception:
+            # 途中で切り捨てた場合など、ZIPとして開けない場合
+            return [("raw_log", "(ログをZIPとして展開できませんでした)")], 1000
+        names = z.namelist()
+        # ZIP内のstepログは「{stepの番号}_{step名}.txt」のため、失敗したstepのファイルだけを選ぶ
+        selected = [name for name in names if self._zip_step_number(name) in self._step_numbers]
+        excerpts = []
+        for name in selected or names:
+            try:
+                segment = _Segment(f"file:{name}", self.context, self.max_chars, self.tail_lines)
+                if selected:
+                    segment.preceding = self._zip_tail(z, names, self._zip_step_number(name) - 1)
+                for line in self._zip_lines(z, name):
+                    segment.feed(line)
+                excerpts.append((segment.label, segment.excerpt()))
+            except Exception:
+                debug += 10000
+                continue
+        return excerpts, debug
+
+    @staticmethod
+    def _zip_step_number(name: str) -> int | None:
+        prefix = os.path.basename(name).split("_", 1)[0]
+        return int(prefix) if prefix.isdigit() else None
+
+    @staticmethod
+    def _zip_lines(z: zipfile.ZipFile, name: str):
+        splitter = LineSplitter()
+        with z.open(name) as f:
+            while chunk := f.read(_CHUNK_SIZE):
+                yield from splitter.feed(chunk)
+        yield from splitter.finish()
+
+    def _zip_tail(self, z: zipfile.ZipFile, names: list[str], number: int) -> list[str]:
+        """直前のstep（番号number）のファイルの末尾の行を返す"""
+        for name in names:
+            if self._zip_step_number(name) == number:
+                tail: deque[str] = deque(self._zip_lines(z, name), maxlen=LOG_PRECEDING_STEP_LINES)
+                return list(tail)
+        return []
+
+    def save(self, path: str) -> None:
+        """受信したログ全体をpathに保存する"""
+        self.file.seek(0)
+        with open(path, "wb") as f:
+            shutil.copyfileobj(self.file, f)
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class _JobLogResult:
+    """一つのジョブのログ取得結果"""
+    def __init__(self, texts: list[str] | None = None, log_path: str | None = None, debug: int = 0, truncated: bool = False):
+        self.texts = texts or []
+        self.log_path = log_path
+        self.debug = debug
+        self.truncated = truncated
+        # 転送したバイト数、ログ全体のバイト数（分かる場合）、リクエスト数
+        self.bytes = 0
+        self.total_bytes: int | None = None
+        self.requests = 0
+        self.cached = False
+
+
+async def _finish_job_log(ingest: _StreamingLogIngest, job_name: str, log_path: str, result: _JobLogResult) -> _JobLogResult:
+    """抜粋を作って見出しを付け、受信したログをlog_pathに保存する"""
+    excerpts, debug = await asyncio.to_thread(ingest.finish)
+    await asyncio.to_thread(ingest.save, log_path)
+    result.texts = [f"===== job:{job_name} {label} =====\n{excerpt}" for label, excerpt in excerpts]
+    result.log_path = log_path
+    result.debug = 100 + debug
+    return result
+
+
+def _job_log_cache_key(owner: str, repo: str, run_id: int, job: dict) -> str:
+    return JobLogCache.key(owner, repo, run_id, job["id"], job.get("run_attempt") or 1)
+
+
+def _replay_cached_log(cache: JobLogCache, path: str, ingest: _StreamingLogIngest) -> None:
+    """キャッシュしたログを、ダウンロードした場合と同じようにingestへ流し込む"""
+    for chunk in cache.read_chunks(path):
+        ingest.feed(chunk)
+        if ingest.done:
+            break
+
+
+async def _load_cached_job_log(
+    owner: str, repo: str, run_id: int, job: dict, log_dir: str, kinds: tuple[str, ...],
+) -> _JobLogResult | None:
+    """kindsの種類のキャッシュがあれば、ダウンロードせずに抜粋を作って返す"""
+    if not LOG_CACHE_ENABLED:
+        return None
+    cache = get_job_log_cache()
+    hit = cache.lookup(_job_log_cache_key(owner, repo, run_id, job), kinds)
+    if hit is None:
+        return None
+    path, kind = hit
+    ingest = _StreamingLogIngest(
+        LOG_EXCERPT_CONTEXT, LOG_EXCERPT_MAX_CHARS, LOG_TAIL_LINES, LOG_SPOOL_MEMORY_BYTES, steps=job.get("steps"))
+    try:
+        await asyncio.to_thread(_replay_cached_log, cache, path, ingest)
+        result = _JobLogResult()
+        result.cached = True
+        suffix = ".tail.log" if kind == "tail" else (".zip" if ingest.is_zip else ".log")
+        log_path = os.path.join(log_dir, f"{owner}_{repo}_{run_id}_{job['id']}{suffix}")
+        return await _finish_job_log(ingest, job.get("name"), log_path, result)
+    finally:
+        ingest.close()
+
+
+async def _store_cached_job_log(owner: str, repo: str, run_id: int, job: dict, kind: str, source) -> None:
+    if LOG_CACHE_ENABLED:
+        await asyncio.to_thread(get_job_log_cache().store, _job_log_cache_key(owner, repo, run_id, job), kind, source)
+
+
+async def _download_job_log(
+    http: AsyncGitHubHTTPClient,
+    owner: str,
+    repo: str,
+    run_id: int,
+    job: dict,
+    headers: dict,
+    budget: _ByteBudget,
+    log_dir: str,
+) -> _JobLogResult:
+    """
+    一つのジョブのログを予算の範囲内でストリーミング取得し、エラー周辺の抜粋に変換する。
+    jobのstepsから失敗したstepが分かる場合は、そのstepの区間だけを抜粋し、区間を過ぎた時点でダウンロードを打ち切る。
+    受信したログはlog_dirに保存し、そのパスを返す。
+    """
+    job_id = job.get("id")
+    if not job_id:
+        return _JobLogResult(debug=10)
+    job_name = job.get("name")
+    # 失敗したstepの終わりまでで打ち切ったログも、同じジョブなら同じ抜粋になるため使える
+    cached = await _load_cached_job_log(owner, repo, run_id, job, log_dir, ("complete", "steps"))
+    if cached is not None:
+        return cached
+    result = _JobLogResult()
+    # job ログをダウンロード（リダイレクト先のZIPを取得）
+    job_logs_url = f"/repos/{owner}/{repo}/actions/jobs/{job_id}/logs"
+    async with http.stream("GET", job_logs_url, headers=headers) as resp:
+        result.requests += 1
+        if resp.status_code not in (200, 302):
+            return result
+        return await _ingest_streamed_log(resp, owner, repo, run_id, job, budget, log_dir, result)
+
+
+async def _ingest_streamed_log(
+    resp: httpx.Response,
+    owner: str,
+    repo: str,
+    run_id: int,
+    job: dict,
+    budget: _ByteBudget,
+    log_dir: str,
+    result: _JobLogResult,
+) -> _JobLogResult:
+    """ログ全体のレスポンスを予算の範囲内で逐次読み込み、抜粋を作る（本文をメモリに読み込まない）"""
+    job_id = job.get("id")
+    job_name = job.get("name")
+    if resp.headers.get("content-length", "").isdigit():
+        result.total_bytes = int(resp.headers["content-length"])
+    ingest = _StreamingLogIngest(
+        LOG_EXCERPT_CONTEXT, LOG_EXCERPT_MAX_CHARS, LOG_TAIL_LINES, LOG_SPOOL_MEMORY_BYTES, steps=job.get("steps"))
+    try:
+        async for chunk in resp.aiter_bytes():
+            granted = budget.take(len(chunk))
+            # 行の抽出とスプールファイルへの書き込みは、イベントループを塞がないよう別スレッドで行う
+            await asyncio.to_thread(ingest.feed, chunk[:granted])
+            if granted < len(chunk):
+                result.truncated = True
+                break
+            if ingest.done:
+                # 失敗したstepより後の行（後処理のstepなど）は取得しない
+                break
+        result.bytes += ingest.size
+        if result.truncated and ingest.size == 0:
+            result.texts = [f"===== job:{job_name} =====\n(ログの合計サイズが上限に達したため取得していません)"]
+            result.debug = 100
+            return result
+        if not result.truncated and ingest.size:
+            await _store_cached_job_log(owner, repo, run_id, job, "steps" if ingest.done else "complete", ingest.file)
+        log_path = os.path.join(log_dir, f"{owner}_{repo}_{run_id}_{job_id}{'.zip' if ingest.is_zip else '.log'}")
+        return await _finish_job_log(ingest, job_name, log_path, result)
+    finally:
+        ingest.close()
+
+
+async def _download_job_log_tail(
+    http: AsyncGitHubHTTPClient,
+    owner: str,
+    repo: str,
+    run_id: int,
+    job: dict,
+    headers: dict,
+    budget: _ByteBudget,
+    log_dir: str,
+    tail_bytes: int = LOG_TAIL_FETCH_BYTES,
+) -> _JobLogResult:
+    """
+    ジョブログの末尾tail_bytesバイトだけをRangeリクエストで取得して抜粋を作る。
+    エラーキーワードが見つからなければ、取得範囲をLOG_TAIL_FETCH_GROWTH倍ずつ先頭側に広げる（取得済みの部分は再取得しない）。
+    ログのリダイレクト先がRangeに対応していない場合は、全体をダウンロードする方法に切り替える。
+    """
+    job_id = job.get("id")
+    if not job_id:
+        return _JobLogResult(debug=10)
+    job_name = job.get("name")
+    cached = await _load_cached_job_log(owner, repo, run_id, job, log_dir, ("complete", "steps", "tail"))
+    if cached is not None:
+        return cached
+    job_logs_url = f"/repos/{owner}/{repo}/actions/jobs/{job_id}/logs"
+    # リダイレクト先（署名付きURL）を取得する。認証ヘッダーはリダイレクト先に送らない
+    resp = await http.request("GET", job_logs_url, headers=headers, follow_redirects=False)
+    location = resp.headers.get("location")
+    if not resp.is_redirect or not location:
+        return await _download_job_log(http, owner, repo, run_id, job, headers, budget, log_dir)
+    result = _JobLogResult()
+    result.requests = 1
+    data = b""
+    start = None
+    size = tail_bytes
+    while True:
+        # 取得済みの範囲より前の部分だけを取得する
+        range_header = f"bytes=-{size}" if start is None else f"bytes={max(start - size, 0)}-{start - 1}"
+        async with http.stream("GET", location, headers={"Range": range_header}) as resp:
+            result.requests += 1
+            if resp.status_code == 200:
+                # Range非対応の場合は全体が返るため、全体のダウンロードと同じく逐次読み込む（取得済みの末尾は捨てる）
+                return await _ingest_streamed_log(resp, owner, repo, run_id, job, budget, log_dir, result)
+            if resp.status_code == 206:
+                m = re.match(r"bytes (\d+)-(\d+)/(\d+|\*)", resp.headers.get("content-range", ""))
+                if not m:
+                    return await _download_job_log(http, owner, repo, run_id, job, headers, budget, log_dir)
+                part, start = await resp.aread(), int(m.group(1))
+                if m.group(3) != "*":
+                    result.total_bytes = int(m.group(3))
+            elif resp.status_code == 416 and start is None:
+                # ログが空
+                part, start = b"", 0
+            else:
+                return await _download_job_log(http, owner, repo, run_id, job, headers, budget, log_dir)
+        received = len(part)
+        granted = budget.take(received)
+        if granted < received:
+            # 予算を超えた分は先頭側を捨てる（末尾側の方がエラーに近い）
+            part = part[received - granted:]
+            start += received - granted
+            result.truncated = True
+        data = part + data
+        result.bytes += len(part)
+        text = data
+        if start > 0:
+            # 途中から取得した場合、先頭の行は途中で切れているため捨てる
+            text = data[data.find(b"\n") + 1:] if b"\n" in data else b""
+        ingest = _StreamingLogIngest(
+            LOG_EXCERPT_CONTEXT, LOG_EXCERPT_MAX_CHARS, LOG_TAIL_LINES, LOG_SPOOL_MEMORY_BYTES, steps=job.get("steps"))
+        try:
+            await asyncio.to_thread(ingest.feed, text)
+            if start == 0 or result.truncated or ingest.matched:
+                if not result.truncated and text:
+                    await _store_cached_job_log(owner, repo, run_id, job, "complete" if start == 0 else "tail", io.BytesIO(text))
+                suffix = ".log" if start == 0 else ".tail.log"
+                log_path = os.path.join(log_dir, f"{owner}_{repo}_{run_id}_{job_id}{suffix}")
+                return await _finish_job_log(ingest, job_name, log_path, result)
+        finally:
+            ingest.close()
+        size *= LOG_TAIL_FETCH_GROWTH
+
+
+async def fetch_failed_job_logs(
+    http: AsyncGitHubHTTPClient,
+    owner: str,
+    repo: str,
+    run_id: int,
+    failed_jobs: list[dict],
+    headers: dict,
+    log_dir: str,
+    concurrency: int = LOG_FETCH_CONCURRENCY,
+    byte_budget: int = LOG_BYTE_BUDGET,
+    mode: str = LOG_FETCH_MODE,
+) -> tuple[list[str], list[str], int, dict]:
+    """
+    失敗したジョブのログを最大concurrency件ずつ並列に取得し、エラー周辺の抜粋を返す。結果はfailed_jobsの順序を保つ。
+    受信したログはlog_dirに保存する。
+
+    Args:
+        http (AsyncGitHubHTTPClient): 共有非同期クライアント
+        owner (str): リポジトリのオーナー
+        repo (str): リポジトリ名
+        run_id (int): ワークフロー実行のID（保存するファイル名に使う）
+        failed_jobs (list[dict]): jobs APIで取得した失敗ジョブ
+        headers (dict): GitHub API用のリクエストヘッダー
+        log_dir (str): ログを保存するディレクトリ
+        concurrency (int): 同時にダウンロードする最大数
+        byte_budget (int): 全ジョブ合計で取得する最大バイト数（ジョブ数で均等に分ける）
+        mode (str): "full"はログ全体を、"tail"は末尾から必要な分だけをRangeリクエストで取得する
+
+    Returns:
+        tuple[list[str], list[str], int, dict]: 見出し付きの抜粋のリスト、保存したログのパスのリスト、デバッグ情報に加算する値、
+            転送量と所要時間（mode, bytes, total_bytes, requests, cached_jobs, seconds）
+    """
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
+    budgets = _ByteBudget.split(byte_budget, len(failed_jobs))
+    download = _download_job_log_tail if mode == "tail" else _download_job_log
+    started = time.perf_counter()
+
+    async def fetch(job: dict, budget: _ByteBudget) -> _JobLogResult:
+        async with semaphore:
+            return await download(http, owner, repo, run_id, job, headers, budget, log_dir)
+
+    results = await asyncio.gather(*(fetch(job, budget) for job, budget in zip(failed_jobs, budgets)))
+    log_texts = []
+    log_paths = []
+    debug = 0
+    truncated = False
+    stats = {"mode": mode, "bytes": 0, "total_bytes": 0, "requests": 0, "cached_jobs": 0, "seconds": round(time.perf_counter() - started, 3)}
+    for result in results:
+        log_texts.extend(result.texts)
+        if result.log_path:
+            log_paths.append(result.log_path)
+        debug += result.debug
+        truncated = truncated or result.truncated
+        stats["bytes"] += result.bytes
+        stats["total_bytes"] += result.total_bytes if result.total_bytes is not None else result.bytes
+        stats["requests"] += result.requests
+        stats["cached_jobs"] += int(result.cached)
+    if truncated:
+        log_texts.append(f"[ログの合計サイズの上限({byte_budget}バイト)をジョブ数で分けた上限に達したログは、一部を切り捨てました]")
+    return log_texts, log_paths, debug, stats
+
+
+def is_useful_annotation(annotation: dict) -> bool:
+    """失敗の原因の分類に使えるアノテーション（failureレベルで定型文でないもの）か"""
+    message = (annotation.get("message") or "").strip()
+    return (annotation.get("annotation_level") == "failure"
+            and bool(message)
+            and not _GENERIC_ANNOTATION_PATTERN.match(message))
+
+
+def format_annotations(job_name: str, annotations: list[dict]) -> str:
+    """アノテーションを「ファイル:行: [レベル] タイトル: メッセージ」の形式で見出し付きテキストにする"""
+    lines = [f"===== job:{job_name} annotations ====="]
+    for a in annotations:
+        location = f"{a.get('path')}:{a.get('start_line')}" if a.get("path") else "(no file)"
+        title = f"{a['title']}: " if a.get("title") else ""
+        lines.append(f"{location}: [{a.get('annotation_level')}] {title}{a.get('message')}")
+        if a.get("raw_details"):
+            lines.append(a["raw_details"])
+    return "\n".join(lines)
+
+
+async def fetch_failure_annotations(
+    http: AsyncGitHubHTTPClient,
+    owner: str,
+    repo: str,
+    check_suite_id: int,
+    headers: dict,
+) -> dict[int, list[dict]]:
+    """
+    runのcheck suiteで失敗したcheck runのアノテーションを取得し、失敗の原因を示すものだけを返す。
+    GitHub Actionsではcheck runのIDとジョブのIDが同じため、結果はジョブのIDで引ける。
+
+    Args:
+        http (AsyncGitHubHTTPClient): 共有非同期クライアント
+        owner (str): リポジトリのオーナー
+        repo (str): リポジトリ名
+        check_suite_id (int): runのcheck_suite_id
+        headers (dict): GitHub API用のリクエストヘッダー
+
+    Returns:
+        dict[int, list[dict]]: check runのID（=ジョブのID）と有用なアノテーションのリスト
+    """
+    resp = await http.get(
+        f"/repos/{owner}/{repo}/check-suites/{check_suite_id}/check-runs",
+        headers=headers, params={"filter": "latest", "per_page": 100})
+    if resp.status_code != 200:
+        return {}
+    # アノテーションのない成功・失敗のcheck runは問い合わせない
+    check_runs = [
+        cr for cr in resp.json().get("check_runs", [])
+        if cr.get("conclusion") == "failure" and (cr.get("output") or {}).get("annotations_count")
+    ]
+
+    results = await asyncio.gather(*(fetch_job_annotations(http, owner, repo, cr["id"], headers) for cr in check_runs))
+    annotations = {}
+    for check_run, useful in zip(check_runs, results):
+        if useful:
+            annotations[check_run["id"]] = useful
+    return annotations
+
+
+async def fetch_job_annotations(
+    http: AsyncGitHubHTTPClient,
+    owner: str,
+    repo: str,
+    job_id: int,
+    headers: dict,
+) -> list[dict]:
+    """
+    一つのジョブ（check run）のアノテーションを取得し、失敗の原因を示すものだけを返す。
+
+    Returns:
+        list[dict]: 有用なアノテーションのリスト（取得できなければ空）
+    """
+    resp = await http.get(
+        f"/repos/{owner}/{repo}/check-runs/{job_id}/annotations",
+        headers=headers, params={"per_page": 100})
+    if resp.status_code != 200:
+        return []
+    return [a for a in resp.json() if is_useful_annotation(a)]
+
@@ -0,0 +1,237 @@
+"""
+クローンしたリポジトリのオブジェクトをディスク上に残し、実行ごとの作業ディレクトリをgit worktreeで作るキャッシュ。
+リポジトリごとにbareのミラーを一つ持ち、2回目以降はgit fetchで差分だけを取得する。
+実行ごとの作業ディレクトリはミラーのworktreeとして作るため、チェックアウトするファイルの分しかディスクを使わず、
+実行の終わりに作業ディレクトリを削除してもミラーは残る（同じリポジトリの再実行や条件を変えた評価でクローンし直さない）。
+
+ミラーを使わずに転送量を減らすクローンの方法（clone_with_strategy）も提供する。
+    full     : 履歴と全てのファイルを取得する（ミラーを使う場合はミラーのworktree）
+    blobless : --filter=blob:none。履歴のcommitとtreeのみ取得し、ファイルの内容はチェックアウトする分だけ取得する
+    shallow  : --depth 1。最新のcommitのみ取得する
+    sparse   : blobless＋sparse checkout。.github/だけをチェックアウトし、他のファイルは読む時に取得する
+"""
+import os
+import re
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+from research.tools.metadata_cache import CACHE_DIR
+
+try:
+    import fcntl
+except ImportError:  # Windowsではプロセス間のロックを行わない
+    fcntl = None
+
+# クローンにミラーとworktreeを使うか（0の場合は従来通り作業ディレクトリごとにgit cloneする）
+CLONE_CACHE_ENABLED = os.environ.get("GITHUB_CLONE_CACHE", "1") == "1"
+# ミラーを保存するディレクトリ（未設定時は ~/.cache/research/mirrors）
+CLONE_CACHE_DIR = os.environ.get("GITHUB_CLONE_CACHE_DIR", os.path.join(CACHE_DIR, "mirrors"))
+# 前回のfetchからこの秒数以内であればfetchしない
+MIRROR_REFRESH_SECONDS = float(os.environ.get("GITHUB_MIRROR_REFRESH_SECONDS", "60"))
+# clone_repositoryのクローンの方法（full, blobless, shallow, sparse）
+CLONE_STRATEGY = os.environ.get("GITHUB_CLONE_STRATEGY", "full")
+CLONE_STRATEGIES = ("full", "blobless", "shallow", "sparse")
+# sparseで最初からチェックアウトするパターン（ワークフローの削除・追加とLinterに必要な.github/のみ）
+SPARSE_BASE_PATTERNS = ["/.github/"]
+
+
+def _git(args: list[str], cwd: str | None = None) -> str:
+    return subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True, text=True).stdout.strip()
+
+
+class MirrorCache:
+    """
+    リポジトリのURLごとのbareミラーと、そこから作るworktreeを管理する。
+    ミラーにはローカルブランチを持たせず、リモートのブランチはrefs/remotes/origin/*に取得する
+    （worktreeでチェックアウト中のブランチをfetchが書き換えないようにするため）。
+    """
+
+    def __init__(self, directory: str = CLONE_CACHE_DIR, refresh_seconds: float = MIRROR_REFRESH_SECONDS):
+        """
+        Args:
+            directory (str): ミラーを保存するディレクトリ
+            refresh_seconds (float): 前回のfetchからこの秒数以内であればfetchしない
+        """
+        self.directory = directory
+        self.refresh_seconds = refresh_seconds
+        self._locks: dict[str, threading.Lock] = {}
+        self._locks_lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def mirror_path(self, repo_url: str) -> str:
+        """リポジトリのURLからミラーのパスを決める（例: https://github.com/owner/repo → owner__repo.git）"""
+        parts = [p for p in re.split(r"[/:]", repo_url.rstrip("/")) if p][-2:]
+        name = "__".join(parts)
+        if name.endswith(".git"):
+            name = name[:-4]
+        return os.path.join(self.directory, re.sub(r"[^\w\-\.]", "_", name) + ".git")
+
+    @contextmanager
+    def _locked(self, mirror: str):
+        """同じミラーに対するfetchやworktreeの追加・削除を、スレッド間とプロセス間で排他する"""
+        with self._locks_lock:
+            lock = self._locks.setdefault(mirror, threading.Lock())
+        with lock:
+            if fcntl is None:
+                yield
+                return
+            with open(f"{mirror}.lock", "w") as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def ensure_mirror(self, repo_url: str) -> str:
+        """
+        ミラーがなければ作成し、あれば（前回のfetchから一定時間経っていれば）fetchで更新する。
+
+        Returns:
+            str: ミラーのパス
+        """
+        mirror = self.mirror_path(repo_url)
+        with self._locked(mirror):
+            self._refresh(repo_url, mirror)
+        return mirror
+
+    def _refresh(self, repo_url: str, mirror: str) -> None:
+        if not os.path.exists(os.path.join(mirror, "HEAD")):
+            _git(["init", "--bare", "--quiet", mirror])
+            _git(["remote", "add", "origin", repo_url], cwd=mirror)
+        fetch_head = os.path.join(mirror, "FETCH_HEAD")
+        if os.path.exists(fetch_head) and time.time() - os.path.getmtime(fetch_head) < self.refresh_seconds:
+            return
+        _git(["fetch", "--prune", "--quiet", "origin"], cwd=mirror)
+        # origin/HEAD（リモートのデフォルトブランチ）をworktreeの起点にする
+        _git(["remote", "set-head", "origin", "--auto"], cwd=mirror)
+        os.utime(fetch_head)
+
+    def add_worktree(self, repo_url: str, local_path: str) -> str:
+        """
+        ミラーを更新し、リモートのデフォルトブランチの先頭をlocal_pathにチェックアウトしたworktreeを作る。
+        作業用ブランチはworktreeの中で作成する（create_working_branch）。
+
+        Returns:
+            str: ミラーのパス
+        """
+        mirror = self.mirror_path(repo_url)
+        with self._locked(mirror):
+            self._refresh(repo_url, mirror)
+            # 削除済みの作業ディレクトリの登録を消してから追加する
+            _git(["worktree", "prune"], cwd=mirror)
+            _git(["worktree", "add", "--detach", "--quiet", os.path.abspath(local_path), "origin/HEAD"], cwd=mirror)
+        return mirror
+
+    def mirror_of(self, local_path: str) -> str | None:
+        """local_pathがこのキャッシュのミラーのworktreeであれば、そのミラーのパスを返す"""
+        dot_git = os.path.join(local_path, ".git")
+        if not os.path.isfile(dot_git):
+            return None
+        with open(dot_git, encoding="utf-8") as f:
+            content = f.read().strip()
+        if not content.startswith("gitdir:"):
+            return None
+        # gitdir: <ミラー>/worktrees/<名前>
+        mirror = os.path.dirname(os.path.dirname(content[len("gitdir:"):].strip()))
+        if os.path.dirname(os.path.abspath(mirror)) != os.path.abspath(self.directory):
+            return None
+        return mirror
+
+    def remove_worktree(self, local_path: str) -> bool:
+        """
+        worktreeを削除し、そこでチェックアウトしていたローカルブランチも削除する（ミラーは残す）。
+        ブランチを残すと、次の実行で同じ名前の作業用ブランチが古い内容のままチェックアウトされるため。
+
+        Returns:
+            bool: local_pathがこのキャッシュのworktreeで、削除した場合はTrue
+        """
+        mirror = self.mirror_of(local_path)
+        if mirror is None:
+            return False
+        try:
+            branch = _git(["symbolic-ref", "--quiet", "--short", "HEAD"], cwd=local_path)
+        except subprocess.CalledProcessError:
+            branch = None
+        with self._locked(mirror):
+            _git(["worktree", "remove", "--force", os.path.abspath(local_path)], cwd=mirror)
+            if branch:
+                try:
+                    _git(["branch", "--delete", "--force", branch], cwd=mirror)
+                except subprocess.CalledProcessError:
+                    # 他のworktreeでチェックアウト中のブランチは残す
+                    pass
+        return True
+
+
+def objects_size(local_path: str) -> int:
+    """リポジトリのオブジェクト（.git/objects、worktreeの場合はミラーのobjects）の合計バイト数"""
+    objects = os.path.join(_git(["rev-parse", "--path-format=absolute", "--git-common-dir"], cwd=local_path), "objects")
+    total = 0
+    for root, _, files in os.walk(objects):
+        for name in files:
+            total += os.path.getsize(os.path.join(root, name))
+    return total
+
+
+def clone_with_strategy(repo_url: str, local_path: str, strategy: str) -> None:
+    """
+    strategyに応じたオプションでgit cloneする（fullはミラーを使わない通常のクローン）。
+
+    Raises:
+        ValueError: strategyが不正な場合
+        subprocess.CalledProcessError: gitが失敗した場合
+    """
+    if strategy not in CLONE_STRATEGIES:
+        raise ValueError(f"clone strategyには{', '.join(CLONE_STRATEGIES)}のいずれかを指定してください: {strategy}")
+    options = {
+        "full": [],
+        "blobless": ["--filter=blob:none"],
+        "shallow": ["--depth", "1"],
+        "sparse": ["--filter=blob:none", "--no-checkout"],
+    }[strategy]
+    _git(["clone", "--quiet", *options, repo_url, local_path])
+    if strategy == "sparse":
+        # パターンで指定するため、cone modeではなくno-coneで設定する（コミットの対象はチェックアウトしたファイルのみになる）
+        _git(["sparse-checkout", "set", "--no-cone", *SPARSE_BASE_PATTERNS], cwd=local_path)
+        _git(["checkout", "--quiet"], cwd=local_path)
+
+
+def is_sparse(local_path: str) -> bool:
+    try:
+        return _git(["config", "--bool", "core.sparseCheckout"], cwd=local_path) == "true"
+    except subprocess.CalledProcessError:
+        return False
+
+
+def tracked_files(local_path: str) -> list[str]:
+    """インデックスにある（チェックアウトしていないものも含む）ファイルの、リポジトリルートからの相対パス"""
+    output = subprocess.run(["git", "ls-files", "-z"], cwd=local_path, check=True, capture_output=True).stdout
+    return [path for path in output.decode("utf-8", errors="surrogateescape").split("\0") if path]
+
+
+def sparse_checkout_add(local_path: str, relative_path: str) -> bool:
+    """
+    sparse checkoutのworktreeに、リポジトリにあるがチェックアウトしていないファイルを追加する。
+    partial cloneの場合、ファイルの内容（blob）はこの時にリモートから取得される。
+
+    Returns:
+        bool: 追加した場合はTrue、sparse checkoutでないかリポジトリにないファイルの場合はFalse
+    """
+    if not is_sparse(local_path):
+        return False
+    path = os.path.normpath(relative_path).replace(os.sep, "/")
+    if path.startswith("../") or path not in tracked_files(local_path):
+        return False
+    _git(["sparse-checkout", "add", "/" + path], cwd=local_path)
+    return True
+
+
+_mirror_cache: MirrorCache | None = None
+
+
+def get_mirror_cache() -> MirrorCache:
+    global _mirror_cache
+    if _mirror_cache is None:
+        _mirror_cache = MirrorCache()
+    return _mirror_cache
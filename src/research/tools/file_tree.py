@@ -0,0 +1,378 @@
+"""
+リポジトリのファイルの一覧を、worktreeを走査せずにgitのオブジェクトから作るモジュール。
+HEADのtreeをgit ls-treeで取得し（ファイルごとのstatを行わない）、commit SHAごとにディスクへ保存するため、
+同じcommitの再実行（ミラーのworktreeを作り直す場合も含む）ではHEADのSHAを確認するだけで済む。
+GitHubToolで作成・削除してまだcommitしていないパスは、記録された変更（git_backend）で補正する。
+
+gitで管理されているファイルは、どのディレクトリにあっても全て一覧に含める。
+gitのリポジトリでない場合はos.scandirで走査し、依存ライブラリ（node_modules、vendor）や
+生成物（dist、build、__pycache__など）のディレクトリと.gitを飛ばす。
+大きなリポジトリのツリーは、トークン数の上限に収まるようにディレクトリを要約して表示する（render_compact_tree）。
+"""
+import json
+import os
+import subprocess
+import threading
+from collections import Counter, OrderedDict
+from typing import Callable
+from research.tools import git_backend
+from research.tools.metadata_cache import CACHE_DIR
+
+# commit SHAごとのファイルの一覧を保存するディレクトリ（未設定時は ~/.cache/research/trees）
+FILE_TREE_CACHE_DIR = os.environ.get("GITHUB_FILE_TREE_CACHE_DIR", os.path.join(CACHE_DIR, "trees"))
+# gitのリポジトリでない場合の走査で飛ばすディレクトリ名（カンマ区切りのGITHUB_FILE_TREE_SKIP_DIRSで追加できる）
+SKIP_DIRS = frozenset({
+    ".git", "node_modules", "bower_components", "vendor", "Pods", ".yarn",
+    "dist", "build", "target", "out", ".next", ".nuxt", "coverage", ".gradle",
+    "__pycache__", ".venv", "venv", ".tox", ".mypy_cache", ".pytest_cache", ".ruff_cache", ".idea",
+} | {name for name in os.environ.get("GITHUB_FILE_TREE_SKIP_DIRS", "").split(",") if name})
+# 主要ファイルの選定に渡すファイルツリーのトークン数の上限（超える場合はディレクトリを要約して表示する）
+FILE_TREE_MAX_TOKENS = int(os.environ.get("GITHUB_FILE_TREE_MAX_TOKENS", "100000"))
+# ビルドやテストの設定のファイル（ツリーを要約する場合も省略せずに表示する）
+BUILD_FILE_NAMES = frozenset({
+    "pyproject.toml", "setup.py", "setup.cfg", "Pipfile", "tox.ini", "noxfile.py", "environment.yml",
+    "package.json", "pnpm-workspace.yaml", "lerna.json", "nx.json", "turbo.json", "tsconfig.json", "deno.json",
+    "pom.xml", "build.gradle", "build.gradle.kts", "settings.gradle", "settings.gradle.kts", "gradlew", "build.xml", "build.sbt",
+    "go.mod", "Cargo.toml", "CMakeLists.txt", "Makefile", "meson.build", "configure.ac",
+    "Gemfile", "Rakefile", "composer.json", "mix.exs", "rebar.config", "stack.yaml", "pubspec.yaml", "Package.swift",
+    "WORKSPACE", "MODULE.bazel", "BUILD", "BUILD.bazel", "Dockerfile", "docker-compose.yml", "compose.yaml",
+    ".nvmrc", ".python-version", ".tool-versions", ".ruby-version", "global.json",
+})
+BUILD_FILE_SUFFIXES = (".csproj", ".fsproj", ".vbproj", ".sln", ".gemspec", ".cabal")
+
+
+def _git(args: list[str], cwd: str) -> bytes:
+    return subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True).stdout
+
+
+class FileTreeCache:
+    """
+    commit SHAをキーに、HEADのファイルの一覧（パスとサイズ）をメモリとディスクに保存する。
+    commitの内容は変わらないため有効期限は設けない。
+    """
+
+    def __init__(self, directory: str = FILE_TREE_CACHE_DIR, max_entries: int = 64):
+        """
+        Args:
+            directory (str): 一覧を保存するディレクトリ
+            max_entries (int): メモリに保持するcommitの数
+        """
+        self.directory = directory
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, dict[str, int | None]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _path(self, sha: str) -> str:
+        return os.path.join(self.directory, sha[:2], f"{sha}.json")
+
+    def get(self, sha: str) -> dict[str, int | None] | None:
+        with self._lock:
+            if sha in self._entries:
+                self._entries.move_to_end(sha)
+                return self._entries[sha]
+        try:
+            with open(self._path(sha), encoding="utf-8") as f:
+                files = json.load(f)
+        except (OSError, ValueError):
+            return None
+        self._remember(sha, files)
+        return files
+
+    def put(self, sha: str, files: dict[str, int | None]) -> None:
+        self._remember(sha, files)
+        path = self._path(sha)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(files, f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+    def _remember(self, sha: str, files: dict[str, int | None]) -> None:
+        with self._lock:
+            self._entries[sha] = files
+            self._entries.move_to_end(sha)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def head_files(self, local_path: str) -> tuple[str, dict[str, int | None]]:
+        """
+        HEADのcommitのファイルの一覧を返す（キャッシュになければgit ls-treeで作る）。
+
+        Returns:
+            tuple[str, dict[str, int|None]]: (commit SHA, {相対パス: バイト数})。
+                partial cloneではサイズを取得するとblobが取得されるため、サイズはNoneにする
+
+        Raises:
+            subprocess.CalledProcessError: gitのリポジトリでないか、commitがない場合
+        """
+        sha = _git(["rev-parse", "HEAD"], local_path).decode().strip()
+        files = self.get(sha)
+        if files is not None:
+            return sha, files
+        try:
+            partial = _git(["config", "--bool", "remote.origin.promisor"], local_path).decode().strip() == "true"
+        except subprocess.CalledProcessError:
+            partial = False
+        files = {}
+        if partial:
+            output = _git(["ls-tree", "-r", "-z", "--name-only", sha], local_path)
+            for path in output.decode("utf-8", errors="surrogateescape").split("\0"):
+                if path:
+                    files[path] = None
+        else:
+            # <mode> SP <type> SP <object> SP+ <size> TAB <path>（サブモジュールのsizeは"-"）
+            output = _git(["ls-tree", "-r", "-z", "-l", sha], local_path)
+            for entry in output.decode("utf-8", errors="surrogateescape").split("\0"):
+                if not entry:
+                    continue
+                meta, path = entry.split("\t", 1)
+                size = meta.split()[-1]
+                files[path] = int(size) if size.isdigit() else None
+        self.put(sha, files)
+        return sha, files
+
+
+def _scan(local_path: str) -> dict[str, int | None]:
+    """gitのリポジトリでない場合（とcommitしていない新しいディレクトリ）を、os.scandirでSKIP_DIRSを飛ばしながら走査する"""
+    files = {}
+    stack = [""]
+    while stack:
+        relative = stack.pop()
+        with os.scandir(os.path.join(local_path, relative)) as entries:
+            for entry in entries:
+                path = f"{relative}/{entry.name}" if relative else entry.name
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name not in SKIP_DIRS:
+                        stack.append(path)
+                elif entry.is_file():
+                    files[path] = entry.stat().st_size
+    return files
+
+
+def list_files(local_path: str) -> dict[str, int | None]:
+    """
+    リポジトリのファイルの一覧を返す。HEADのファイルに、GitHubToolで変更してまだcommitしていないパスを反映する。
+    sparse checkoutでチェックアウトしていないファイルも含む。
+
+    Returns:
+        dict[str, int|None]: {リポジトリルートからの相対パス: バイト数（不明な場合はNone）}
+    """
+    try:
+        _, head = get_file_tree_cache().head_files(local_path)
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return _scan(local_path)
+    changes = git_backend.changed_paths(local_path)
+    if not changes:
+        return dict(head)
+    files = dict(head)
+    for change in changes:
+        full_path = os.path.join(local_path, change)
+        prefix = change.rstrip("/") + "/"
+        for path in [p for p in files if p == change or p.startswith(prefix)]:
+            if not os.path.exists(os.path.join(local_path, path)):
+                del files[path]
+        if os.path.isfile(full_path):
+            files[change] = os.path.getsize(full_path)
+        elif os.path.isdir(full_path):
+            for path, size in _scan(full_path).items():
+                files[f"{change}/{path}"] = size
+    return files
+
+
+def render_tree(root: str, paths: list[str]) -> str:
+    """リポジトリルートからの相対パスのリストを、treeコマンドと同じ形式の文字列にする"""
+    tree: dict = {}
+    for path in paths:
+        node = tree
+        for part in path.split("/"):
+            node = node.setdefault(part, {})
+    lines = [root]
+    directories = 0
+
+    def walk(node: dict, prefix: str):
+        nonlocal directories
+        names = sorted(node)
+        for i, name in enumerate(names):
+            last = i == len(names) - 1
+            lines.append(f"{prefix}{'└── ' if last else '├── '}{name}")
+            if node[name]:
+                directories += 1
+                walk(node[name], prefix + ("    " if last else "│   "))
+
+    walk(tree, "")
+    lines.append(f"\n{directories} directories, {len(paths)} files")
+    return "\n".join(lines) + "\n"
+
+
+def is_build_file(path: str) -> bool:
+    """ビルドやテストの設定のファイル（.github/以下のファイルと、requirements*.txtを含む）か"""
+    name = path.rsplit("/", 1)[-1]
+    if path.startswith(".github/") or name in BUILD_FILE_NAMES or name.endswith(BUILD_FILE_SUFFIXES):
+        return True
+    return name.startswith("requirements") and name.endswith(".txt")
+
+
+class _Directory:
+    """要約の表示に使うディレクトリのノード（配下のファイル数、拡張子ごとの数、ビルドのファイルを集計する）"""
+
+    __slots__ = ("dirs", "files", "count", "extensions", "build_files", "depth")
+
+    def __init__(self):
+        self.dirs: dict[str, _Directory] = {}
+        self.files: list[str] = []
+        self.count = 0
+        self.extensions: Counter = Counter()
+        self.build_files: list[str] = []
+        self.depth = 0
+
+    def aggregate(self) -> None:
+        for name in self.files:
+            self.count += 1
+            if "." in name.lstrip("."):
+                self.extensions["*." + name.rsplit(".", 1)[-1]] += 1
+            if is_build_file(name):
+                self.build_files.append(name)
+        for name, child in self.dirs.items():
+            child.aggregate()
+            self.count += child.count
+            self.extensions.update(child.extensions)
+            self.build_files.extend(f"{name}/{path}" for path in child.build_files)
+            self.depth = max(self.depth, child.depth + 1)
+
+
+def _summary(count: int, extensions: Counter) -> str:
+    """例: 4,213 files: *.java, *.kt"""
+    text = f"{count:,} files"
+    if extensions:
+        text += ": " + ", ".join(ext for ext, _ in extensions.most_common(3))
+    return text
+
+
+def _render_compact(root: str, tree: _Directory, max_depth: int | None, max_entries: int | None) -> list[str]:
+    """
+    max_depthより深いディレクトリを1行の要約にし、max_entriesより多くの項目を持つディレクトリは残りを要約する。
+    ビルドのファイルと、それを含むディレクトリは要約しない（要約したディレクトリの中のものはパスで表示する）。
+    """
+    lines = [root]
+
+    def entry(prefix: str, last: bool, text: str) -> str:
+        return f"{prefix}{'└── ' if last else '├── '}{text}"
+
+    def walk(node: _Directory, prefix: str, depth: int, in_github: bool):
+        names = sorted([(name, True) for name in node.dirs] + [(name, False) for name in node.files])
+        shown = names
+        hidden: list[tuple[str, bool]] = []
+        if max_entries is not None and len(names) > max_entries and not in_github:
+            # ビルドのファイルとそれを含むディレクトリを残し、残りの枠を名前の順に埋める
+            keep = {item for item in names if (item[1] and node.dirs[item[0]].build_files) or (not item[1] and is_build_file(item[0]))}
+            for item in names:
+                if len(keep) >= max_entries:
+                    break
+                keep.add(item)
+            shown = [item for item in names if item in keep]
+            hidden = [item for item in names if item not in keep]
+        for i, (name, is_dir) in enumerate(shown):
+            last = i == len(shown) - 1 and not hidden
+            child_prefix = prefix + ("    " if last else "│   ")
+            if not is_dir:
+                lines.append(entry(prefix, last, name))
+                continue
+            child = node.dirs[name]
+            github = in_github or (depth == 1 and name == ".github")
+            if max_depth is not None and depth >= max_depth and not github:
+                lines.append(entry(prefix, last, f"{name}/ — {_summary(child.count, child.extensions)}"))
+                build_files = child.build_files if max_entries is None else child.build_files[:max_entries]
+                for j, path in enumerate(build_files):
+                    more = len(child.build_files) - len(build_files)
+                    lines.append(entry(child_prefix, j == len(build_files) - 1 and not more, path))
+                if len(build_files) < len(child.build_files):
+                    lines.append(entry(child_prefix, True, f"… {len(child.build_files) - len(build_files):,} more build files"))
+            else:
+                lines.append(entry(prefix, last, name))
+                walk(child, child_prefix, depth + 1, github)
+        if hidden:
+            count = sum(node.dirs[name].count if is_dir else 1 for name, is_dir in hidden)
+            extensions: Counter = Counter()
+            for name, is_dir in hidden:
+                if is_dir:
+                    extensions.update(node.dirs[name].extensions)
+                elif "." in name.lstrip("."):
+                    extensions["*." + name.rsplit(".", 1)[-1]] += 1
+            directories = sum(1 for _, is_dir in hidden if is_dir)
+            label = f"… {len(hidden):,} more entries ({directories:,} directories)" if directories else f"… {len(hidden):,} more entries"
+            lines.append(entry(prefix, True, f"{label} — {_summary(count, extensions)}"))
+
+    walk(tree, "", 1, False)
+    return lines
+
+
+def render_compact_tree(root: str, paths: list[str], max_tokens: int, count_tokens: Callable[[str], int]) -> str:
+    """
+    ファイルツリーを、トークン数がmax_tokens以下になるように要約してtreeコマンドの形式で表示する。
+    収まる場合はrender_treeと同じ出力になる。収まらない場合は、1ディレクトリの項目数の上限と表示する深さを下げながら、
+    深いディレクトリを「src/gen/ — 4,213 files: *.java, *.kt」のような1行の要約にする。
+    ビルドやテストの設定のファイル（is_build_file）と.github/以下は要約せずに表示する。
+    それでも収まらない場合は、末尾の行を省略して必ずmax_tokens以下にする。
+
+    Args:
+        root (str): 1行目に表示するルート（ローカルパス）
+        paths (list[str]): リポジトリルートからの相対パスのリスト
+        max_tokens (int): トークン数の上限
+        count_tokens (Callable[[str], int]): 文字列のトークン数を数える関数
+
+    Returns:
+        str: treeコマンドの形式の文字列（max_tokensが小さすぎてルートの行も収まらない場合は空文字列）
+    """
+    full = render_tree(root, paths)
+    if count_tokens(full) <= max_tokens:
+        return full
+
+    tree = _Directory()
+    for path in paths:
+        node = tree
+        *dirs, name = path.split("/")
+        for part in dirs:
+            node = node.dirs.setdefault(part, _Directory())
+        node.files.append(name)
+    tree.aggregate()
+    footer = f"\n{len(paths):,} files（トークン数の上限{max_tokens:,}に収めるため、一部のディレクトリを要約して表示しています）"
+
+    def fits(lines: list[str]) -> bool:
+        return count_tokens("\n".join(lines + [footer]) + "\n") <= max_tokens
+
+    # 項目数の上限ごとに、収まる最も深い表示を二分探索する（深いほどトークン数が多い）
+    lines: list[str] = []
+    for max_entries in (None, 200, 50, 20, 8, 3):
+        low, high = 1, tree.depth + 1
+        best = None
+        while low <= high:
+            depth = (low + high) // 2
+            candidate = _render_compact(root, tree, depth, max_entries)
+            if fits(candidate):
+                best, low = candidate, depth + 1
+            else:
+                high = depth - 1
+        if best is not None:
+            return "\n".join(best + [footer]) + "\n"
+        lines = _render_compact(root, tree, 1, max_entries)
+
+    # 最も要約しても収まらない場合は、収まる行数を二分探索して残りを省略する
+    low, high = 0, len(lines)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if fits(lines[:middle] + [f"… {len(lines) - middle:,} more lines"]):
+            low = middle
+        else:
+            high = middle - 1
+    truncated = lines[:low] + [f"… {len(lines) - low:,} more lines"]
+    return "\n".join(truncated + [footer]) + "\n" if fits(truncated) else ""
+
+
+_file_tree_cache: FileTreeCache | None = None
+
+
+def get_file_tree_cache() -> FileTreeCache:
+    global _file_tree_cache
+    if _file_tree_cache is None:
+        _file_tree_cache = FileTreeCache()
+    return _file_tree_cache
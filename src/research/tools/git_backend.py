@@ -0,0 +1,192 @@
+"""
+commit_and_pushとcreate_working_branchをgitのサブプロセスを使わずにプロセス内（pygit2）で行うバックエンド。
+git add .は巨大なリポジトリではworktree全体をstatするため、GitHubToolで変更したパスと.github/だけをインデックスに反映し、
+commitを作成して作業ブランチの1つのrefだけをpushし、コミットSHAをそのまま返す。
+変更したパスが記録されていない場合（GitHubTool以外で編集した場合）は、従来のgit add .と同じくworktree全体を反映する。
+
+pygit2（libgit2）はpartial cloneのpromisorやsparse checkoutに対応していないため、
+それらのリポジトリ、pygit2がインストールされていない場合、認証情報がない場合はgitのサブプロセス（従来の方法）を使う。
+    pip install pygit2  （または poetry install -E git）
+"""
+import os
+import threading
+
+try:
+    import pygit2
+except ImportError:
+    pygit2 = None
+
+# gitの操作の方法（auto: 使える場合はpygit2、pygit2: 常にpygit2、subprocess: 常にgitコマンド）
+GIT_BACKEND = os.environ.get("GITHUB_GIT_BACKEND", "auto")
+# 変更したパスに加えて、毎回インデックスに反映するディレクトリ（Linterのpinactなど、GitHubTool以外で書き換えられる）
+ALWAYS_STAGED_PATHS = [".github"]
+
+
+class GitBackendError(Exception):
+    """プロセス内のgitの操作に失敗した"""
+
+
+_changes_lock = threading.Lock()
+_changed_paths: dict[str, set[str]] = {}
+
+
+def record_change(local_path: str, relative_path: str) -> None:
+    """GitHubToolでファイルやフォルダを作成・変更・削除したパスを記録する（次のcommitでインデックスに反映する）"""
+    with _changes_lock:
+        _changed_paths.setdefault(os.path.abspath(local_path), set()).add(os.path.normpath(relative_path).replace(os.sep, "/"))
+
+
+def changed_paths(local_path: str) -> set[str]:
+    """記録されている（まだcommitしていない）変更したパス"""
+    with _changes_lock:
+        return set(_changed_paths.get(os.path.abspath(local_path), set()))
+
+
+def pop_changes(local_path: str) -> set[str]:
+    with _changes_lock:
+        return _changed_paths.pop(os.path.abspath(local_path), set())
+
+
+def restore_changes(local_path: str, paths: set[str]) -> None:
+    """commitに失敗した場合に、記録した変更を戻す"""
+    with _changes_lock:
+        _changed_paths.setdefault(os.path.abspath(local_path), set()).update(paths)
+
+
+def is_available(local_path: str) -> bool:
+    """local_pathのリポジトリをpygit2で操作できるか"""
+    if GIT_BACKEND == "subprocess" or pygit2 is None:
+        return False
+    if GIT_BACKEND == "pygit2":
+        return True
+    try:
+        repo = pygit2.Repository(local_path)
+    except Exception:
+        return False
+    config = repo.config
+    # partial clone（promisor）は存在しないblobの取得が、sparse checkoutはskip-worktreeの扱いがlibgit2では行えない
+    for key in ("remote.origin.promisor", "core.sparseCheckout"):
+        if key in config and config.get_bool(key):
+            return False
+    url = repo.remotes["origin"].url if "origin" in [r.name for r in repo.remotes] else ""
+    if url.startswith("https://") and not os.environ.get("GITHUB_TOKEN"):
+        return False
+    return not url.startswith(("git@", "ssh://"))
+
+
+def create_working_branch(local_path: str, branch_name: str) -> bool:
+    """
+    作業用ブランチに切り替える。ローカルにあればそのブランチ、リモートにあればorigin/<branch>から作り、
+    どちらにもなければ現在のcommitから作る（git checkout <branch> / git checkout -b <branch>と同じ）。
+
+    Returns:
+        bool: ブランチが既に（ローカルかリモートに）存在した場合はTrue、新しく作った場合はFalse
+    """
+    repo = pygit2.Repository(local_path)
+    local = repo.branches.local.get(branch_name)
+    exists = True
+    if local is None:
+        remote = repo.branches.remote.get(f"origin/{branch_name}")
+        if remote is not None:
+            local = repo.branches.local.create(branch_name, repo[remote.target])
+            local.upstream = remote
+        else:
+            local = repo.branches.local.create(branch_name, repo[repo.head.target])
+            exists = False
+    if repo.head_is_detached or repo.head.shorthand != branch_name:
+        if local.target != repo.head.target:
+            repo.checkout(local)
+        else:
+            # 同じcommitであればファイルを書き換える必要はないため、HEADだけを切り替える
+            repo.set_head(local.name)
+    return exists
+
+
+def _stage(repo, paths: set[str]) -> None:
+    """pathsのファイル（ディレクトリの場合はその中のファイル）だけをインデックスに反映する。pathsが空の場合はworktree全体を反映する"""
+    workdir = repo.workdir
+    index = repo.index
+    index.read()
+    if not paths:
+        # git add .と同じく、新規・変更したファイルを追加し、削除したファイルを取り除く
+        index.add_all()
+        index.write()
+        return
+    targets: set[str] = set()
+    for path in paths | set(ALWAYS_STAGED_PATHS):
+        full_path = os.path.join(workdir, path)
+        if os.path.isdir(full_path):
+            for root, _, files in os.walk(full_path):
+                for name in files:
+                    targets.add(os.path.relpath(os.path.join(root, name), workdir).replace(os.sep, "/"))
+        elif os.path.isfile(full_path):
+            targets.add(path)
+        # 削除したファイル・ディレクトリはインデックスから取り除く
+        prefix = path.rstrip("/") + "/"
+        targets.update(entry.path for entry in index if entry.path == path or entry.path.startswith(prefix))
+    for path in sorted(targets):
+        if os.path.isfile(os.path.join(workdir, path)):
+            if path not in index and repo.path_is_ignored(path):
+                continue
+            index.add(path)
+        elif path in index:
+            index.remove(path)
+    index.write()
+
+
+class _PushCallbacks(pygit2.RemoteCallbacks if pygit2 else object):
+    """認証情報を渡し、リモートが拒否したrefを記録する"""
+
+    def __init__(self):
+        token = os.environ.get("GITHUB_TOKEN")
+        super().__init__(credentials=pygit2.UserPass("x-access-token", token) if token else None)
+        self.rejected: dict[str, str] = {}
+
+    def push_update_reference(self, refname, message):
+        if message:
+            self.rejected[refname] = message
+
+
+def commit_and_push(local_path: str, message: str) -> tuple[str, str]:
+    """
+    記録した変更と.github/（記録がなければworktree全体）をインデックスに反映してcommitし、現在のブランチだけをoriginにpushする。
+
+    Returns:
+        tuple[str, str]: (ブランチ名, コミットSHA)
+
+    Raises:
+        GitBackendError: 変更がない場合、HEADがブランチでない場合、pushが拒否された場合など
+    """
+    repo = pygit2.Repository(local_path)
+    if repo.head_is_detached:
+        raise GitBackendError("HEADがブランチを指していないためpushできません")
+    branch = repo.head.shorthand
+    paths = pop_changes(local_path)
+    try:
+        _stage(repo, paths)
+        tree = repo.index.write_tree()
+        parent = repo.head.target
+        if tree == repo[parent].tree_id:
+            raise GitBackendError("コミットする変更がありません")
+        signature = repo.default_signature
+        commit_sha = repo.create_commit("HEAD", signature, signature, message, tree, [parent])
+    except GitBackendError:
+        restore_changes(local_path, paths)
+        raise
+    except Exception as e:
+        restore_changes(local_path, paths)
+        raise GitBackendError(f"コミットエラー: {e}") from e
+
+    refspec = f"refs/heads/{branch}:refs/heads/{branch}"
+    callbacks = _PushCallbacks()
+    try:
+        repo.remotes["origin"].push([refspec], callbacks=callbacks)
+    except Exception as e:
+        raise GitBackendError(f"push error: {e}") from e
+    if callbacks.rejected:
+        raise GitBackendError(f"push error: {callbacks.rejected}")
+    # git push -uと同じく、上流ブランチを設定する
+    remote = repo.branches.remote.get(f"origin/{branch}")
+    if remote is not None and repo.branches.local[branch].upstream is None:
+        repo.branches.local[branch].upstream = remote
+    return branch, str(commit_sha)
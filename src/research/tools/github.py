@@ -4,6 +4,7 @@ GitHub APIクライアント側のラッパーやAPI呼び出し用関数を実
 """
 
 import requests
+import urllib3
 import subprocess
 import getpass
 import atexit
@@ -12,9 +13,24 @@ import os
 import shutil
 from pydantic import BaseModel
 from research.log_output.log import log
+from research.tools.metadata_cache import get_metadata_cache, repo_key_from_url
+from research.tools.clone_cache import (
+    CLONE_CACHE_ENABLED, CLONE_STRATEGY, clone_with_strategy, get_mirror_cache, objects_size, sparse_checkout_add, tracked_files,
+)
+from research.tools import git_backend
+from research.tools.file_tree import list_files, render_compact_tree, render_tree
+from research.server.encoding import MSGPACK_MEDIA_TYPE, decode_body
 from dotenv import load_dotenv
 
 load_dotenv()
+
+# APIサーバーから受け取るレスポンスの形式（msgpack: MessagePack、json: JSON）
+WIRE_FORMAT = os.environ.get("GITHUB_TOOL_WIRE_FORMAT", "msgpack")
+# レスポンスを圧縮して受け取るか（auto: APIサーバーが別ホストの場合のみ、on: 常に、off: 圧縮しない）。
+# localhostでは転送より圧縮・展開の時間の方が大きいため、autoでは圧縮しない（src/research/benchmark/response_encoding.py）
+COMPRESSION = os.environ.get("GITHUB_TOOL_COMPRESSION", "auto")
+# 受け付ける圧縮方式。requests（urllib3）がzstdを展開できない環境ではgzipのみにする
+ACCEPT_ENCODING = "zstd, gzip" if "zstd" in urllib3.util.request.ACCEPT_ENCODING else "gzip"
 class RepoOpResult(BaseModel):
     status: str
     message: str
@@ -29,6 +45,10 @@ class ForkResult(BaseModel):
     message: str
     fork_url: str | None = None
 
+class ForkBatchResult(ForkResult):
+    repo_url: str
+    state: str | None = None
+
 class PushResult(BaseModel):
     status: str
     message: str
@@ -41,12 +61,30 @@ class WorkflowResult(BaseModel):
     html_url: str | None = None
     logs_url: str | None = None
     failure_reason: str | None = None
+    log_paths: list[str] | None = None
+    log_fetch_stats: dict | None = None
+    cancelled_runs: list[dict] | None = None
+    saved_seconds: float | None = None
+
+class JobLogsResult(BaseModel):
+    status: str
+    message: str
+    job_id: int | None = None
+    job_name: str | None = None
+    conclusion: str | None = None
+    failure_reason: str | None = None
+    log_paths: list[str] | None = None
+    log_fetch_stats: dict | None = None
 
 class CloneResult(BaseModel):
     status: str
     message: str
     local_path: str | None = None
     repo_url: str | None = None
+    mirror_path: str | None = None
+    strategy: str | None = None
+    transferred_bytes: int | None = None
+    seconds_to_tree: float | None = None
 
 class WorkflowDispatchResult(BaseModel):
     status: str
@@ -60,17 +98,88 @@ class PullRequestResult(BaseModel):
 
 class GitHubTool:
     _server_process = None
+    _app_client = None
 
-    def __init__(self, base_url: str = "http://localhost:8000"):
+    def __init__(self, base_url: str = "http://localhost:8000", transport: str | None = None):
         """
         GitHubToolのインスタンスを初期化し、APIサーバーを起動する。
 
         Args:
             base_url (str): APIサーバーのベースURL（デフォルト: http://localhost:8000）
+            transport (str|None): APIサーバーの呼び出し方。
+                "subprocess"はuvicornを別プロセスで起動してHTTPで呼び出し、
+                "inprocess"は同じプロセス内のFastAPIアプリを直接呼び出す（起動待ちがない）。
+                未指定時は環境変数GITHUB_TOOL_TRANSPORT（未設定なら"subprocess"）
         """
         self.base_url = base_url
-        self._start_github_api_server()
-        atexit.register(self._stop_github_api_server)
+        self.transport = transport or os.environ.get("GITHUB_TOOL_TRANSPORT", "subprocess")
+        # プロセス内の呼び出しは転送がないため圧縮しない
+        remote = self.transport != "inprocess" and urllib3.util.parse_url(base_url).host not in ("localhost", "127.0.0.1", "::1")
+        self.accept_encoding = ACCEPT_ENCODING if COMPRESSION == "on" or (COMPRESSION == "auto" and remote) else "identity"
+        if self.transport == "inprocess":
+            self._start_inprocess_app()
+            atexit.register(self._stop_inprocess_app)
+        elif self.transport == "subprocess":
+            self._start_github_api_server()
+            atexit.register(self._stop_github_api_server)
+        else:
+            raise ValueError(f"transportには\"subprocess\"または\"inprocess\"を指定してください: {self.transport}")
+
+    def _start_inprocess_app(self) -> None:
+        """
+        GitHub APIサーバーのFastAPIアプリを同じプロセス内で起動する。
+        TestClientを開いたままにすることで、lifespanや共有HTTPクライアント、RunWatcherをプロセス内で使い続ける。
+        """
+        if GitHubTool._app_client is not None:
+            return
+        from fastapi.testclient import TestClient
+        from research.server.github_api import app
+        client = TestClient(app)
+        client.__enter__()
+        GitHubTool._app_client = client
+
+    def _stop_inprocess_app(self) -> None:
+        """
+        プロセス内で起動したFastAPIアプリを停止する。
+        """
+        if GitHubTool._app_client is not None:
+            GitHubTool._app_client.__exit__(None, None, None)
+            GitHubTool._app_client = None
+
+    def _request(self, method: str, path: str, **kwargs):
+        """
+        APIサーバーにリクエストを送る。transportに応じて、HTTPまたはプロセス内のアプリを呼び出す。
+
+        Args:
+            method (str): HTTPメソッド
+            path (str): エンドポイントのパス（例: /github/info）
+            **kwargs: json, paramsなど
+
+        Returns:
+            レスポンス（本文は_decodeまたは_parseで取得する）
+        """
+        headers = {
+            "Accept": MSGPACK_MEDIA_TYPE if WIRE_FORMAT == "msgpack" else "application/json",
+            "Accept-Encoding": self.accept_encoding,
+            **kwargs.pop("headers", {}),
+        }
+        if self.transport == "inprocess":
+            return GitHubTool._app_client.request(method, path, headers=headers, **kwargs)
+        return requests.request(method, f"{self.base_url}{path}", headers=headers, **kwargs)
+
+    @staticmethod
+    def _decode(resp):
+        """レスポンスの本文をContent-Typeに応じてデコードする"""
+        return decode_body(resp.content, resp.headers.get("content-type"))
+
+    @staticmethod
+    def _parse(resp, model: type[BaseModel]):
+        """
+        レスポンスの本文をmodelとして検証する。JSONは辞書を経由せずにpydanticで直接検証する。
+        """
+        if resp.headers.get("content-type", "").startswith(MSGPACK_MEDIA_TYPE):
+            return model.model_validate(decode_body(resp.content, MSGPACK_MEDIA_TYPE))
+        return model.model_validate_json(resp.content)
 
     def _start_github_api_server(self) -> None:
         """
@@ -85,7 +194,7 @@ class GitHubTool:
         for _ in range(20):
             try:
                 import requests
-                resp = requests.get(f"{self.base_url}/docs")
+                resp = self._request("GET", "/docs")
                 if resp.status_code == 200:
                     break
             except Exception:
@@ -141,17 +250,53 @@ class GitHubTool:
             log("error", "GITHUB_TOKENがセットされていないため、リポジトリをフォークできません")
             self._set_github_token()
 
-        resp = requests.post(f"{self.base_url}/github/fork", json={"repo_url": repo_url})
-        result = ForkResult(**resp.json())
+        resp = self._request("POST", "/github/fork", json={"repo_url": repo_url})
+        result = self._parse(resp, ForkResult)
         log(result.status, result.message)
+        # 同じ名前のフォークを作り直した場合に古い情報を使わないよう、キャッシュを削除する
+        if result.status == "success" and result.fork_url:
+            self.invalidate_repository_cache(result.fork_url)
         return result
 
-    def get_repository_info(self, repo_url: str) -> RepoInfoResult:
+    def fork_repositories(self, repo_urls: list[str], wait_ready: bool = True) -> list[ForkBatchResult]:
+        """
+        複数のGitHubリポジトリを並行にforkする（サーバー側でレート制限に合わせて要求の間隔を調整する）。
+        wait_readyの場合は、GitHub側でforkのコピーが終わりcloneできるようになるまで待ってから返す。
+        各forkの状態はサーバーのマニフェスト（GITHUB_FORK_MANIFEST）に保存され、再実行すると作成済みのforkは要求し直さない。
+
+        Args:
+            repo_urls (list[str]): ForkしたいGitHubリポジトリのURLのリスト
+            wait_ready (bool): forkの準備が完了するまで待つか
+
+        Returns:
+            list[ForkBatchResult]: repo_urlsと同じ順序の結果（fork_url, state: ready/requested/failed）
+        """
+        if not self._is_github_token_set():
+            log("error", "GITHUB_TOKENがセットされていないため、リポジトリをフォークできません")
+            self._set_github_token()
+
+        resp = self._request("POST", "/github/fork/batch", json={"repo_urls": repo_urls, "wait_ready": wait_ready})
+        data = self._decode(resp)
+        if data.get("status") != "success":
+            log("error", data.get("message"))
+            return [ForkBatchResult(repo_url=url, status="error", message=data.get("message")) for url in repo_urls]
+        results = [ForkBatchResult(**r) for r in data.get("results", [])]
+        for result in results:
+            if result.status != "success":
+                log("error", f"{result.repo_url}: {result.message}")
+            elif result.fork_url:
+                self.invalidate_repository_cache(result.fork_url)
+        log("info", data.get("message"))
+        return results
+
+    def get_repository_info(self, repo_url: str, use_cache: bool = True) -> RepoInfoResult:
         """
         指定したGitHubリポジトリの情報（説明、スター数、フォーク数、デフォルトブランチなど）を取得する。
+        有効期限内のキャッシュがあればAPIを呼ばずに返す。
 
         Args:
             repo_url (str): 情報取得したいGitHubリポジトリのURL
+            use_cache (bool): ディスク上のメタデータキャッシュを使うか
 
         Returns:
             RepoInfoResult:
@@ -159,22 +304,100 @@ class GitHubTool:
                 info (dict|None): リポジトリ情報の辞書（full_name, description, stargazers_count, forks_count, ...）
                 message (str|None): 実行結果の説明メッセージ
         """
+        repo_key = repo_key_from_url(repo_url)
+        if use_cache and repo_key:
+            info = get_metadata_cache().get(repo_key, "info")
+            if info is not None:
+                result = RepoInfoResult(status="success", info=info, message="リポジトリ情報をキャッシュから取得しました")
+                log(result.status, result.message+str(result.info))
+                return result
+
         if not self._is_github_token_set():
             log("error", "GITHUB_TOKENがセットされていないため、リポジトリをフォークできません")
             self._set_github_token()
 
-        resp = requests.get(f"{self.base_url}/github/info", json={"repo_url": repo_url})
-        result = RepoInfoResult(**resp.json())
+        resp = self._request("GET", "/github/info", json={"repo_url": repo_url})
+        result = self._parse(resp, RepoInfoResult)
         log(result.status, result.message+str(result.info))
+        if result.status == "success" and repo_key:
+            self._cache_repository_info(repo_key, result.info)
         return result
 
-    def clone_repository(self, repo_url: str, local_path: str = None) -> CloneResult:
+    def get_repositories_info(self, repo_urls: list[str], use_cache: bool = True) -> list[RepoInfoResult]:
+        """
+        複数のGitHubリポジトリの情報をまとめて取得する（サーバー側でGraphQLの1回のクエリにまとめる）。
+        有効期限内のキャッシュがあるリポジトリはリクエストに含めない。
+
+        Args:
+            repo_urls (list[str]): 情報取得したいGitHubリポジトリのURLのリスト
+            use_cache (bool): ディスク上のメタデータキャッシュを使うか
+
+        Returns:
+            list[RepoInfoResult]: repo_urlsと同じ順序の取得結果。infoには言語ごとのコード量（languages）も含まれる
+        """
+        results: list[RepoInfoResult | None] = [None] * len(repo_urls)
+        if use_cache:
+            cache = get_metadata_cache()
+            for i, repo_url in enumerate(repo_urls):
+                repo_key = repo_key_from_url(repo_url)
+                info = cache.get(repo_key, "info") if repo_key else None
+                if info is not None:
+                    results[i] = RepoInfoResult(status="success", info=info, message="リポジトリ情報をキャッシュから取得しました")
+        missing = [i for i, r in enumerate(results) if r is None]
+        log("info", f"{len(repo_urls)}件中{len(repo_urls) - len(missing)}件のリポジトリ情報をキャッシュから取得しました")
+        if not missing:
+            return results
+
+        if not self._is_github_token_set():
+            log("error", "GITHUB_TOKENがセットされていないため、リポジトリをフォークできません")
+            self._set_github_token()
+
+        resp = self._request("POST", "/github/info/batch", json={"repo_urls": [repo_urls[i] for i in missing]})
+        data = self._decode(resp)
+        if data.get("status") != "success":
+            log("error", data.get("message"))
+            for i in missing:
+                results[i] = RepoInfoResult(status="error", info=None, message=data.get("message"))
+            return results
+        for i, r in zip(missing, data.get("results", [])):
+            results[i] = RepoInfoResult(**r)
+            repo_key = repo_key_from_url(repo_urls[i])
+            if results[i].status == "success" and repo_key:
+                self._cache_repository_info(repo_key, results[i].info)
+        log("info", data.get("message"))
+        return results
+
+    def _cache_repository_info(self, repo_key: str, info: dict) -> None:
+        """取得したリポジトリ情報をキャッシュに保存する（言語ごとのコード量は有効期限の長い別項目にも保存する）"""
+        cache = get_metadata_cache()
+        cache.set(repo_key, "info", info)
+        if info.get("languages"):
+            cache.set(repo_key, "languages", info["languages"])
+
+    def invalidate_repository_cache(self, repo_url: str) -> None:
+        """
+        指定したリポジトリのメタデータキャッシュを削除する（フォークの作り直しや削除の後に呼ぶ）。
+
+        Args:
+            repo_url (str): GitHubリポジトリのURL
+        """
+        repo_key = repo_key_from_url(repo_url)
+        if repo_key:
+            count = get_metadata_cache().invalidate(repo_key)
+            log("info", f"{repo_key}のメタデータキャッシュを{count}件削除しました")
+
+    def clone_repository(self, repo_url: str, local_path: str = None, strategy: str | None = None) -> CloneResult:
         """
         指定したGitHubリポジトリをローカルにクローンする。
+        strategyがfullでGITHUB_CLONE_CACHEが有効な場合は、リポジトリごとのミラーをfetchで更新し、local_pathにはそのworktreeを作る
+        （2回目以降はオブジェクトをダウンロードし直さない）。
+        blobless, shallow, sparseはミラーを使わず、転送量を減らすオプションでクローンする。
+        sparseでは.github/だけをチェックアウトし、他のファイルはread_fileで読む時に取得する。
 
         Args:
             repo_url (str): クローンしたいGitHubリポジトリのURL
             local_path (str, optional): クローン先のローカルパス。未指定時はデフォルトディレクトリに作成。
+            strategy (str|None): クローンの方法（full, blobless, shallow, sparse）。未指定時はGITHUB_CLONE_STRATEGY
 
         Returns:
             CloneResult:
@@ -182,6 +405,10 @@ class GitHubTool:
                 message (str): 実行結果の説明メッセージ
                 local_path (str|None): クローン先のローカルパス
                 repo_url (str|None): クローン元リポジトリのURL
+                mirror_path (str|None): worktreeの元になったミラーのパス（ミラーを使った場合のみ）
+                strategy (str|None): クローンの方法
+                transferred_bytes (int|None): クローンで取得したオブジェクトのバイト数（ミラーの場合は増えた分）
+                seconds_to_tree (float|None): クローンの開始からファイルの一覧を取得できるまでの秒数
         """
         if local_path is None:
             repo_name = repo_url.rstrip('/').split('/')[-1]
@@ -192,9 +419,26 @@ class GitHubTool:
             result = CloneResult(status="success", message=f"{local_path} は既に存在します。", local_path=local_path, repo_url=repo_url)
             log(result.status, result.message)
             return result
+        strategy = strategy or CLONE_STRATEGY
         try:
-            subprocess.run(["git", "clone", repo_url, local_path], check=True)
-            result = CloneResult(status="success", message=f"{local_path}のクローンに成功しました", local_path=local_path, repo_url=repo_url)
+            start = time.time()
+            if strategy == "full" and CLONE_CACHE_ENABLED:
+                cache = get_mirror_cache()
+                mirror_path = cache.mirror_path(repo_url)
+                before = objects_size(mirror_path) if os.path.exists(os.path.join(mirror_path, "HEAD")) else 0
+                cache.add_worktree(repo_url, local_path)
+                transferred = max(objects_size(local_path) - before, 0)
+                message = f"{local_path}にミラー（{mirror_path}）のworktreeを作成しました"
+            else:
+                mirror_path = None
+                clone_with_strategy(repo_url, local_path, strategy)
+                transferred = objects_size(local_path)
+                message = f"{local_path}のクローン（{strategy}）に成功しました"
+            files = tracked_files(local_path)
+            seconds = time.time() - start
+            result = CloneResult(status="success", message=f"{message}（{len(files)}ファイル、{transferred / 1024 / 1024:.1f}MB、{seconds:.1f}秒）",
+                                 local_path=local_path, repo_url=repo_url, mirror_path=mirror_path, strategy=strategy,
+                                 transferred_bytes=transferred, seconds_to_tree=round(seconds, 3))
         except subprocess.CalledProcessError as e:
             result = CloneResult(status="error", message=str(e), local_path=local_path, repo_url=repo_url)
         except Exception as e:
@@ -217,6 +461,16 @@ class GitHubTool:
                 message (str): 実行結果の説明メッセージ
                 commit_sha (str|None): 最新コミットのSHA（成功時のみ）
         """
+        # pygit2を使える場合は、変更したパスだけをインデックスに反映して作業ブランチのみをpushする（gitのサブプロセスを起動しない）
+        if git_backend.is_available(local_path):
+            try:
+                branch, commit_sha = git_backend.commit_and_push(local_path, message)
+                result = PushResult(status="success", message=f"{branch}にコミットとプッシュをしました", commit_sha=commit_sha)
+            except git_backend.GitBackendError as e:
+                result = PushResult(status="error", message=str(e), commit_sha=None)
+            log(result.status, result.message)
+            return result
+
         # add/commit
         try:
             subprocess.run(["git", "add", "."], cwd=local_path, check=True)
@@ -277,8 +531,8 @@ class GitHubTool:
             self._set_github_token()
             
         payload = {"repo_url": repo_url, "ref": ref, "workflow_id": workflow_id}
-        resp = requests.post(f"{self.base_url}/workflow/dispatch", json=payload)
-        result = WorkflowDispatchResult(**resp.json())
+        resp = self._request("POST", "/workflow/dispatch", json=payload)
+        result = self._parse(resp, WorkflowDispatchResult)
         log(result.status, result.message)
         return result
     
@@ -304,18 +558,20 @@ class GitHubTool:
             self._set_github_token()
 
         payload = {"repo_url": repo_url, "commit_sha": commit_sha}
-        resp = requests.post(f"{self.base_url}/workflow/latest_old", json=payload)
-        result = WorkflowResult(**resp.json())
+        resp = self._request("POST", "/workflow/latest_old", json=payload)
+        result = self._parse(resp, WorkflowResult)
         log(result.status, result.message)
         return result
     
-    def get_latest_workflow_logs(self, repo_url: str, commit_sha: str) -> WorkflowResult:
+    def get_latest_workflow_logs(self, repo_url: str, commit_sha: str, branch: str | None = None, log_fetch_mode: str | None = None) -> WorkflowResult:
         """
         指定したコミットSHAに対応する最新のGitHub Actionsワークフローの実行結果・ログを取得する。
 
         Args:
             repo_url (str): GitHubリポジトリのURL
             commit_sha (str): 対象コミットのSHA
+            branch (str|None): コミットをpushしたブランチ名（指定するとサーバー側でrunを絞り込む）
+            log_fetch_mode (str|None): 失敗ジョブのログの取得方法（"full"または"tail"、未指定時はサーバーの設定）
 
         Returns:
             WorkflowResult:
@@ -324,15 +580,103 @@ class GitHubTool:
                 conclusion (str|None): ワークフローの最終結論（"success", "failure" など）
                 html_url (str|None): 実行結果のGitHubページURL
                 logs_url (str|None): ログ取得用URL
-                failure_reason (str|None): 失敗時の詳細ログや理由
+                failure_reason (str|None): 失敗時のエラー周辺のログ抜粋や理由
+                log_paths (list[str]|None): 失敗ジョブのログ全体を保存したファイルのパス
+                log_fetch_stats (dict|None): ログの転送バイト数・ログ全体のバイト数・リクエスト数・所要時間
+                cancelled_runs (list[dict]|None): branchの古いcommitのためキャンセルしたrun（id, head_sha, 経過秒数, 残り時間の見積もり）
+                saved_seconds (float|None): キャンセルで節約できたランナーの実行時間の見積もり（秒）
         """
         if not self._is_github_token_set():
             log("error", "GITHUB_TOKENがセットされていないため、リポジトリをフォークできません")
             self._set_github_token()
 
-        payload = {"repo_url": repo_url, "commit_sha": commit_sha}
-        resp = requests.post(f"{self.base_url}/workflow/latest", json=payload)
-        result = WorkflowResult(**resp.json())
+        payload = {"repo_url": repo_url, "commit_sha": commit_sha, "branch": branch, "log_fetch_mode": log_fetch_mode}
+        resp = self._request("POST", "/workflow/latest", json=payload)
+        result = self._parse(resp, WorkflowResult)
+        log(result.status, result.message)
+        if result.cancelled_runs:
+            log("info", f"古いcommitのrunを{len(result.cancelled_runs)}件キャンセルしました（節約できた時間の見積もり: {result.saved_seconds}秒）")
+        return result
+
+    def iter_workflow_events(self, repo_url: str, commit_sha: str, branch: str | None = None, log_fetch_mode: str | None = None, include_logs: bool = True):
+        """
+        指定したコミットSHAのワークフロー実行の途中経過を、サーバーから届いた順に返すジェネレーター。
+
+        Args:
+            repo_url (str): GitHubリポジトリのURL
+            commit_sha (str): 対象コミットのSHA
+            branch (str|None): コミットをpushしたブランチ名
+            log_fetch_mode (str|None): 失敗ジョブのログの取得方法（"full"または"tail"）
+            include_logs (bool): 失敗したジョブのログの抜粋（job_logイベント）も受け取るか
+
+        Yields:
+            tuple[str, dict]: (イベント名, データ)。イベント名はrun, job, job_log, resultのいずれかで、最後は必ずresult
+        """
+        import httpx
+        from httpx_sse import connect_sse
+        payload = {"repo_url": repo_url, "commit_sha": commit_sha, "branch": branch,
+                   "log_fetch_mode": log_fetch_mode, "include_logs": include_logs}
+        if self.transport == "inprocess":
+            client = GitHubTool._app_client
+        else:
+            # イベントの間隔は数分空くことがあるため、読み込みのタイムアウトはなしにする
+            client = httpx.Client(base_url=self.base_url, timeout=httpx.Timeout(10.0, read=None))
+        try:
+            with connect_sse(client, "POST", "/workflow/events", json=payload) as source:
+                for sse in source.iter_sse():
+                    yield sse.event, sse.json()
+        finally:
+            if client is not GitHubTool._app_client:
+                client.close()
+
+    def watch_workflow(self, repo_url: str, commit_sha: str, branch: str | None = None, log_fetch_mode: str | None = None, on_event=None) -> WorkflowResult:
+        """
+        get_latest_workflow_logsのストリーミング版。途中経過をon_eventに渡しながら待ち、最終結果を返す。
+        失敗したジョブはrun全体の完了を待たずにjob_logイベントで抜粋が届くため、on_eventで先に解析を始められる。
+
+        Args:
+            repo_url (str): GitHubリポジトリのURL
+            commit_sha (str): 対象コミットのSHA
+            branch (str|None): コミットをpushしたブランチ名
+            log_fetch_mode (str|None): 失敗ジョブのログの取得方法（"full"または"tail"）
+            on_event (Callable[[str, dict], None]|None): イベントごとに呼び出す関数
+
+        Returns:
+            WorkflowResult: get_latest_workflow_logsと同じ形式の結果
+        """
+        if not self._is_github_token_set():
+            log("error", "GITHUB_TOKENがセットされていないため、ワークフローの結果を取得できません")
+            self._set_github_token()
+        result = WorkflowResult(status="error", message="サーバーから結果が届きませんでした")
+        try:
+            for event, data in self.iter_workflow_events(repo_url, commit_sha, branch, log_fetch_mode):
+                if on_event is not None:
+                    on_event(event, data)
+                if event == "result":
+                    result = WorkflowResult(**data)
+                elif event in ("run", "job"):
+                    log("info", f"{event} {data.get('name') or data.get('id')}: {data.get('status')} {data.get('conclusion') or ''}")
+        except Exception as e:
+            result = WorkflowResult(status="error", message=str(e))
+        log(result.status, result.message)
+        return result
+
+    def get_job_logs(self, repo_url: str, run_id: int, job_id: int, log_fetch_mode: str | None = None) -> JobLogsResult:
+        """
+        一つのジョブの失敗の原因（アノテーション、なければログの抜粋）を取得する。
+
+        Args:
+            repo_url (str): GitHubリポジトリのURL
+            run_id (int): ワークフロー実行のID
+            job_id (int): ジョブのID
+            log_fetch_mode (str|None): ログの取得方法（"full"または"tail"）
+
+        Returns:
+            JobLogsResult: status, message, job_name, conclusion, failure_reason, log_paths, log_fetch_stats
+        """
+        payload = {"repo_url": repo_url, "run_id": run_id, "job_id": job_id, "log_fetch_mode": log_fetch_mode}
+        resp = self._request("POST", "/workflow/job_logs", json=payload)
+        result = self._parse(resp, JobLogsResult)
         log(result.status, result.message)
         return result
 
@@ -360,6 +704,17 @@ class GitHubTool:
             log(result.status, result.message)
             return result
         
+        if git_backend.is_available(local_path):
+            try:
+                if git_backend.create_working_branch(local_path, branch_name):
+                    result = RepoOpResult(status="exists", message=f"{branch_name}ブランチはすでに存在します")
+                else:
+                    result = RepoOpResult(status="success", message=f"{branch_name}ブランチを作成しました")
+            except Exception as e:
+                result = RepoOpResult(status="error", message=str(e))
+            log(result.status, result.message)
+            return result
+
         # 現在あるブランチ名を確認し、すでに存在する場合はそのまま成功を返す
         try:
             subprocess.run(["git", "checkout", branch_name], cwd=local_path, check=True)
@@ -399,6 +754,7 @@ class GitHubTool:
         try:
             with open(file_path, "w"):
                 pass
+            git_backend.record_change(local_path, relative_path)
             result = RepoOpResult(status="success", message=f"{file_path}を作成しました")
         except Exception as e:
             result = RepoOpResult(status="error", message=str(e))
@@ -424,6 +780,7 @@ class GitHubTool:
         try:
             with open(file_path, "w") as f:
                 f.write(content or "")
+            git_backend.record_change(local_path, relative_path)
             result = RepoOpResult(status="success", message=f"{file_path}に書き込みました")
         except Exception as e:
             result = RepoOpResult(status="error", message=str(e))
@@ -450,6 +807,7 @@ class GitHubTool:
             return result
         try:
             os.remove(file_path)
+            git_backend.record_change(local_path, relative_path)
             result = RepoOpResult(status="success", message=f"{file_path}を削除しました")
         except Exception as e:
             result = RepoOpResult(status="error", message=str(e))
@@ -477,6 +835,7 @@ class GitHubTool:
             return result
         try:
             shutil.rmtree(folder_path)
+            git_backend.record_change(local_path, relative_path)
             result = RepoOpResult(status="success", message=f"{folder_path}を削除しました")
         except Exception as e:
             result = RepoOpResult(status="error", message=str(e))
@@ -487,6 +846,7 @@ class GitHubTool:
     def delete_cloned_repository(self, local_path: str) -> RepoOpResult:
         """
         指定したローカルリポジトリのディレクトリを削除する。
+        ミラーのworktreeの場合はgit worktree removeで削除し、ミラーは次回のクローンのために残す。
 
         Args:
             local_path (str): 削除対象リポジトリのローカルパス
@@ -505,8 +865,11 @@ class GitHubTool:
             log(result.status, result.message)
             return result
         try:
-            shutil.rmtree(local_path)
-            result = RepoOpResult(status="success", message=f"{local_path}を削除しました")
+            if get_mirror_cache().remove_worktree(local_path):
+                result = RepoOpResult(status="success", message=f"{local_path}（worktree）を削除しました")
+            else:
+                shutil.rmtree(local_path)
+                result = RepoOpResult(status="success", message=f"{local_path}を削除しました")
             log(result.status, result.message)
             return result
         except Exception as e:
@@ -529,6 +892,13 @@ class GitHubTool:
                 message (str): 実行結果の説明メッセージ
         """
         file_path = os.path.join(local_path, relative_path)
+        # sparse checkoutでチェックアウトしていないファイルは、ここでチェックアウトする（内容はリモートから取得される）
+        if not os.path.exists(file_path):
+            try:
+                if sparse_checkout_add(local_path, relative_path):
+                    log("info", f"{relative_path}をsparse checkoutに追加しました")
+            except Exception as e:
+                log("warning", f"{relative_path}のsparse checkoutへの追加に失敗しました: {e}")
         if not os.path.exists(file_path):
             result = RepoInfoResult(status="not_found", info=None, message=f"{file_path} は存在しないため読み込めません。")
             log(result.status, result.message)
@@ -582,6 +952,7 @@ class GitHubTool:
     def get_file_tree(self, local_path: str) -> RepoInfoResult:
         """
         指定したローカルリポジトリのファイルツリー情報を取得する。
+        gitのオブジェクトから作った一覧（commit SHAごとにキャッシュ）を使い、commitしていない生成物は含めない。
 
         Args:
             local_path (str): 対象リポジトリのローカルパス
@@ -590,6 +961,7 @@ class GitHubTool:
             RepoInfoResult:
                 status (str): "success" または "error" など、処理結果のステータス
                 info (dict|None): {ファイルパス: {"size": サイズ, "modified": 更新時刻}, ...}
+                    （sparse checkoutでチェックアウトしていないファイルはmodifiedがNone。partial cloneではsizeもNone）
                 message (str): 実行結果の説明メッセージ
         """
         if not os.path.exists(local_path):
@@ -597,28 +969,37 @@ class GitHubTool:
             log(result.status, result.message)
             return result
         try:
+            files = list_files(local_path)
             file_tree = {}
-            for root, dirs, files in os.walk(local_path):
-                for filename in files:
-                    file_path = os.path.join(root, filename)
-                    file_tree[file_path] = {"size": os.path.getsize(file_path), "modified": os.path.getmtime(file_path)}
+            for path, size in sorted(files.items()):
+                file_path = os.path.join(local_path, path)
+                try:
+                    stat = os.stat(file_path)
+                except OSError:
+                    file_tree[file_path] = {"size": size, "modified": None}
+                    continue
+                file_tree[file_path] = {"size": stat.st_size if size is None else size, "modified": stat.st_mtime}
             result = RepoInfoResult(status="success", info=file_tree, message=f"{local_path}のファイルツリーを取得しました")
         except Exception as e:
             result = RepoInfoResult(status="error", info=None, message=str(e))
         log(result.status, result.message)
         return result
 
-    def get_file_tree_sub(self, local_path: str) -> RepoInfoResult:
+    def get_file_tree_sub(self, local_path: str, max_tokens: int | None = None, count_tokens=None) -> RepoInfoResult:
         """
-        指定したローカルリポジトリのファイルツリー情報をtreeコマンドで取得し、文字列で返す。
+        指定したローカルリポジトリのファイルツリー情報を、treeコマンドと同じ形式の文字列で返す。
+        一覧はget_file_treeと同じ（sparse checkoutでチェックアウトしていないファイルも含み、commitしていない生成物は含めない）。
+        max_tokensを指定した場合は、トークン数が上限を超えないようにディレクトリを要約して表示する。
 
         Args:
             local_path (str): 対象リポジトリのローカルパス
+            max_tokens (int|None): ツリーのトークン数の上限（Noneの場合は全てのファイルを表示する）
+            count_tokens (Callable[[str], int]|None): トークン数を数える関数（Noneの場合はtiktokenのo200k_baseで数える）
 
         Returns:
             RepoInfoResult:
-                status (str): "success" または "error" など、処理結果のステータス
-                info (dict|None): {"tree": treeコマンドの出力文字列}
+                status (str): "success" または "error" など、処理結果のステータス（上限に収まるツリーを作れない場合は"error"）
+                info (dict|None): {"tree": treeコマンドの形式の文字列}
                 message (str): 実行結果の説明メッセージ
         """
         if not os.path.exists(local_path):
@@ -626,16 +1007,20 @@ class GitHubTool:
             log(result.status, result.message)
             return result
         try:
-            import subprocess
-            tree_output = subprocess.run(
-                ["tree", local_path],
-                capture_output=True, text=True, check=True
-            ).stdout
-            result = RepoInfoResult(
-                status="success",
-                info={"tree": tree_output},
-                message=f"{local_path}のファイルツリー（treeコマンド）を取得しました"
-            )
+            paths = sorted(list_files(local_path))
+            if max_tokens is None:
+                tree_output = render_tree(local_path, paths)
+            else:
+                if count_tokens is None:
+                    import tiktoken
+                    encoding = tiktoken.get_encoding("o200k_base")
+                    count_tokens = lambda text: len(encoding.encode(text, disallowed_special=()))  # noqa: E731
+                tree_output = render_compact_tree(local_path, paths, max_tokens, count_tokens)
+            if not tree_output:
+                result = RepoInfoResult(status="error", info=None,
+                                        message=f"{local_path}のファイルツリーが上限（{max_tokens}トークン）に収まりません")
+            else:
+                result = RepoInfoResult(status="success", info={"tree": tree_output}, message=f"{local_path}のファイルツリーを取得しました")
         except Exception as e:
             result = RepoInfoResult(status="error", info=None, message=str(e))
         log(result.status, result.message)
@@ -663,8 +1048,8 @@ class GitHubTool:
             self._set_github_token()
 
         payload = {"repo_url": repo_url, "head": head, "base": base, "title": title, "body": body}
-        resp = requests.post(f"{self.base_url}/github/pull_request", json=payload)
-        result = PullRequestResult(**resp.json())
+        resp = self._request("POST", "/github/pull_request", json=payload)
+        result = self._parse(resp, PullRequestResult)
         log(result.status, result.message)
         return result
     
@@ -684,11 +1069,43 @@ class GitHubTool:
             log("error", "GITHUB_TOKENがセットされていないため、リポジトリを削除できません")
             self._set_github_token()
 
-        resp = requests.post(f"{self.base_url}/github/delete_repository", json={"repo_url": repo_url})
-        result = RepoOpResult(**resp.json())
+        resp = self._request("POST", "/github/delete_repository", json={"repo_url": repo_url})
+        result = self._parse(resp, RepoOpResult)
         log(result.status, result.message)
+        if result.status == "success":
+            self.invalidate_repository_cache(repo_url)
         return result
 
+    def delete_remote_repositories(self, repo_urls: list[str]) -> list[RepoOpResult]:
+        """
+        複数のGitHubリポジトリ（フォーク）を並行に削除する。フォークでないリポジトリは削除しない。
+        サーバーのマニフェストにあるforkは削除済みとして記録する。
+
+        Args:
+            repo_urls (list[str]): 削除したいGitHubリポジトリのURLのリスト
+
+        Returns:
+            list[RepoOpResult]: repo_urlsと同じ順序の結果
+        """
+        if not self._is_github_token_set():
+            log("error", "GITHUB_TOKENがセットされていないため、リポジトリを削除できません")
+            self._set_github_token()
+
+        resp = self._request("POST", "/github/delete_repository/batch", json={"repo_urls": repo_urls})
+        data = self._decode(resp)
+        if data.get("status") != "success":
+            log("error", data.get("message"))
+            return [RepoOpResult(status="error", message=data.get("message")) for _ in repo_urls]
+        results = []
+        for r in data.get("results", []):
+            results.append(RepoOpResult(status=r["status"], message=r["message"]))
+            if r["status"] == "success":
+                self.invalidate_repository_cache(r["repo_url"])
+            else:
+                log("error", f"{r['repo_url']}: {r['message']}")
+        log("info", data.get("message"))
+        return results
+
     def folder_exists_in_repo(self, local_path: str, folder_name: str) -> RepoOpResult:
         """
         指定したローカルリポジトリ内に特定のフォルダが存在するかどうかを判定する関数。
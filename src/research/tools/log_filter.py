@@ -0,0 +1,91 @@
+"""
+実行ログからエラー周辺の行を抽出する処理をまとめたモジュール。
+ログ全体をメモリに載せずに、ダウンロード中のバイト列を順に流し込みながら抽出できる。
+ParserTool（クライアント側）とGitHub APIサーバー側の両方から利用する。
+"""
+import codecs
+import re
+from collections import deque
+
+# エラーっぽいキーワード
+ERROR_KEYWORDS = [
+    r"error", r"fail", r"exception", r"traceback", r"exit code",
+    r"not found", r"is required", r"permission denied"
+]
+ERROR_PATTERN = re.compile("|".join(ERROR_KEYWORDS), re.IGNORECASE)
+
+
+class LineSplitter:
+    """
+    チャンク単位で届くバイト列をUTF-8としてデコードし、完成した行から順に返す。
+    行の区切り方はstr.splitlines()と同じになるようにしている。
+    """
+    def __init__(self):
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+        self._pending = ""
+
+    def feed(self, chunk: bytes) -> list[str]:
+        """チャンクを追加し、改行まで届いた行のリストを返す"""
+        text = self._pending + self._decoder.decode(chunk)
+        segments = text.split("\n")
+        self._pending = segments.pop()
+        lines = []
+        for segment in segments:
+            lines.extend(segment.splitlines() or [""])
+        return lines
+
+    def finish(self) -> list[str]:
+        """末尾の改行なしの行を返す"""
+        text = self._pending + self._decoder.decode(b"", final=True)
+        self._pending = ""
+        return text.splitlines()
+
+
+class ErrorContextExtractor:
+    """
+    行を順に受け取り、エラーキーワードを含む行とその前後context行だけを残す。
+    前の行はcontext行分だけ保持するため、ログ全体を保持せずに抽出できる。
+    """
+    def __init__(self, context: int = 3, max_chars: int | None = None):
+        """
+        Args:
+            context (int): エラー行の前後に残す行数
+            max_chars (int|None): 抽出結果の最大文字数（超えた行は捨ててtruncatedをTrueにする）
+        """
+        self.context = context
+        self.max_chars = max_chars
+        self._before: deque[str] = deque(maxlen=max(context, 0))
+        self._after = 0
+        self.lines: list[str] = []
+        self.chars = 0
+        self.matched = 0
+        self.truncated = False
+
+    def feed(self, line: str) -> None:
+        """1行を追加する"""
+        if ERROR_PATTERN.search(line):
+            self.matched += 1
+            while self._before:
+                self._emit(self._before.popleft())
+            self._emit(line)
+            self._after = self.context
+        elif self._after > 0:
+            self._emit(line)
+            self._after -= 1
+        else:
+            self._before.append(line)
+
+    def feed_lines(self, lines) -> None:
+        for line in lines:
+            self.feed(line)
+
+    def _emit(self, line: str) -> None:
+        if self.max_chars is not None and self.chars + len(line) + 1 > self.max_chars:
+            self.truncated = True
+            return
+        self.lines.append(line)
+        self.chars += len(line) + 1
+
+    def result(self) -> str:
+        """抽出した行を改行で連結して返す"""
+        return "\n".join(self.lines)
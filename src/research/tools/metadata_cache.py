@@ -0,0 +1,146 @@
+"""
+リポジトリのメタデータ（リポジトリ情報、言語ごとのコード量、ファイルツリー）をディスク上に保存するキャッシュ。
+同じリポジトリを条件を変えて何度も評価するため、SQLiteに(owner/repo, 項目)単位で保存し、項目ごとの有効期限で再取得する。
+"""
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+# キャッシュを保存するディレクトリ（未設定時は ~/.cache/research）
+CACHE_DIR = os.environ.get("RESEARCH_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "research"))
+
+# 項目ごとの有効期限（秒）。スター数などは変わりやすいため短く、言語の割合は変わりにくいため長くする
+DEFAULT_TTLS = {
+    "info": int(os.environ.get("RESEARCH_CACHE_TTL_INFO", str(24 * 60 * 60))),
+    "languages": int(os.environ.get("RESEARCH_CACHE_TTL_LANGUAGES", str(7 * 24 * 60 * 60))),
+    "tree": int(os.environ.get("RESEARCH_CACHE_TTL_TREE", str(24 * 60 * 60))),
+}
+
+
+def repo_key_from_url(repo_url: str) -> str | None:
+    """GitHubのURLからキャッシュのキー（owner/repo）を返す。形式が不正ならNone"""
+    m = re.match(r"https://github.com/([\w\-]+)/([\w\-]+)", repo_url)
+    if not m:
+        return None
+    return f"{m.group(1)}/{m.group(2)}"
+
+
+class RepoMetadataCache:
+    """
+    owner/repoをキーとしたSQLiteのメタデータキャッシュ。値はJSONで保存する。
+    複数スレッドから使えるように、接続は一つにしてロックで保護する。
+    """
+
+    def __init__(self, path: str | None = None, ttls: dict[str, int] | None = None):
+        """
+        Args:
+            path (str|None): SQLiteファイルのパス（未指定時はCACHE_DIR/metadata.sqlite3）
+            ttls (dict[str, int]|None): 項目ごとの有効期限（秒）。未指定の項目はDEFAULT_TTLSを使う
+        """
+        if path is None:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            path = os.path.join(CACHE_DIR, "metadata.sqlite3")
+        self.path = path
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS repo_metadata ("
+                "repo TEXT NOT NULL, field TEXT NOT NULL, value TEXT NOT NULL, fetched_at REAL NOT NULL, "
+                "PRIMARY KEY (repo, field))"
+            )
+
+    @staticmethod
+    def _key(repo: str) -> str:
+        # GitHubのowner/repoは大文字小文字を区別しない
+        return repo.lower()
+
+    def get(self, repo: str, field: str):
+        """
+        有効期限内のキャッシュを返す。
+
+        Args:
+            repo (str): owner/repo
+            field (str): 項目名（info, languages, treeなど）
+
+        Returns:
+            キャッシュした値。存在しないか期限切れの場合はNone
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, fetched_at FROM repo_metadata WHERE repo = ? AND field = ?",
+                (self._key(repo), field),
+            ).fetchone()
+        if row is None:
+            return None
+        value, fetched_at = row
+        ttl = self.ttls.get(field)
+        if ttl is not None and time.time() - fetched_at > ttl:
+            return None
+        return json.loads(value)
+
+    def set(self, repo: str, field: str, value) -> None:
+        """値を保存する（同じ項目があれば上書きする）"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO repo_metadata (repo, field, value, fetched_at) VALUES (?, ?, ?, ?)",
+                (self._key(repo), field, json.dumps(value, ensure_ascii=False), time.time()),
+            )
+
+    def invalidate(self, repo: str, field: str | None = None) -> int:
+        """
+        リポジトリのキャッシュを削除する。
+
+        Args:
+            repo (str): owner/repo
+            field (str|None): 削除する項目（Noneの場合は全項目）
+
+        Returns:
+            int: 削除した件数
+        """
+        with self._lock, self._conn:
+            if field is None:
+                cur = self._conn.execute("DELETE FROM repo_metadata WHERE repo = ?", (self._key(repo),))
+            else:
+                cur = self._conn.execute(
+                    "DELETE FROM repo_metadata WHERE repo = ? AND field = ?", (self._key(repo), field))
+            return cur.rowcount
+
+    def clear(self) -> int:
+        """全てのキャッシュを削除し、削除した件数を返す"""
+        with self._lock, self._conn:
+            return self._conn.execute("DELETE FROM repo_metadata").rowcount
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_cache: RepoMetadataCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_metadata_cache() -> RepoMetadataCache:
+    """プロセス内で共有するキャッシュを返す"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = RepoMetadataCache()
+        return _cache
+
+
+# キャッシュの削除方法:
+# poetry run python src/research/tools/metadata_cache.py            # 全て削除
+# poetry run python src/research/tools/metadata_cache.py owner/repo # 指定したリポジトリのみ削除
+if __name__ == "__main__":
+    import sys
+    cache = get_metadata_cache()
+    if len(sys.argv) > 1:
+        for repo in sys.argv[1:]:
+            print(f"{repo}: {cache.invalidate(repo)}件削除しました")
+    else:
+        print(f"{cache.clear()}件削除しました")
@@ -5,6 +5,7 @@ from research.log_output.log import log
 from research.tools.llm import LLMTool
 from research.tools.github import WorkflowResult
 from research.tools.linter import LintResult
+from research.tools.log_filter import ErrorContextExtractor
 import re
 
 
@@ -231,24 +232,10 @@ class ParserTool:
         ログからエラー周辺の行だけを抽出する。
         context: エラー行の前後に残す行数
         """
-        lines = log.splitlines()
-        keep_indices = set()
-
-        # エラーっぽいキーワード
-        error_keywords = [
-            r"error", r"fail", r"exception", r"traceback", r"exit code",
-            r"not found", r"is required", r"permission denied"
-        ]
-
-        for i, line in enumerate(lines):
-            if any(re.search(pat, line, re.IGNORECASE) for pat in error_keywords):
-                # マッチしたら前後のコンテキストを追加
-                for j in range(max(0, i-context), min(len(lines), i+context+1)):
-                    keep_indices.add(j)
-
-        # 抽出した行だけ返す
-        filtered_lines = [lines[i] for i in sorted(keep_indices)]
-        return "\n".join(filtered_lines)
+        # サーバー側の抜粋と同じ結果になるよう、ストリーミング用の抽出処理を共有する
+        extractor = ErrorContextExtractor(context)
+        extractor.feed_lines(log.splitlines())
+        return extractor.result()
 
     def remove_timestamps(self, log: str) -> str:
         """
@@ -4,6 +4,7 @@
 """
 from research.log_output.log import log
 from research.tools.github import GitHubTool
+from research.tools.file_tree import FILE_TREE_MAX_TOKENS
 from research.tools.llm import LLMTool
 #from research.tools.rag import RAGTool
 from research.tools.parser import ParserTool
@@ -110,7 +111,8 @@ class GitHubRepoParser:
         # log("info", f"ファイルツリーのトークン数:{state.count_tokens(str(file_tree))}")
 
         # treeコマンドを使った場合、この方がトークン数が少なくなるのでこちらを利用
-        file_tree_result_sub = github.get_file_tree_sub(local_path)
+        # 大きなリポジトリでは、トークン数の上限に収まるようにディレクトリを要約したツリーになる
+        file_tree_result_sub = github.get_file_tree_sub(local_path, max_tokens=FILE_TREE_MAX_TOKENS, count_tokens=state.count_tokens)
         if file_tree_result_sub.status != "success":
             log("error", "ファイルツリーの取得subに失敗したのでプログラムを終了します")
             return {
@@ -119,14 +121,6 @@ class GitHubRepoParser:
             }
         file_tree = file_tree_result_sub.info["tree"]
         log("info", f"ファイルツリーのトークン数:{state.count_tokens(file_tree)}")
-        
-        # トークン数が多すぎる場合は終了
-        if state.count_tokens(file_tree) > 100000:
-            log("error", "ファイルツリーのトークン数が100000を超えたため、実験ではトークン制限にかかる可能性があるため、プログラムを終了します")
-            return {
-                "finish_is": True,
-                "final_status": "file tree tokens exceed 100000"
-            }
 
         if state.generate_workflow_required_files:
             log("info", "主要ファイルの選定を開始します")
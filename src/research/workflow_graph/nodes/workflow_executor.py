@@ -67,7 +67,8 @@ class WorkflowExecutor:
             # ワークフローのログ取得
             get_workflow_log_result = github.get_latest_workflow_logs(
                 repo_url=state.repo_url,
-                commit_sha=commit_sha
+                commit_sha=commit_sha,
+                branch=state.work_ref
             )
             # ワークフローの完了を5分*EXECUTE_LIMIT回まで待機
             limit = 0
@@ -78,7 +79,8 @@ class WorkflowExecutor:
                 time.sleep(10)
                 get_workflow_log_result = github.get_latest_workflow_logs(
                     repo_url=state.repo_url,
-                    commit_sha=commit_sha
+                    commit_sha=commit_sha,
+                    branch=state.work_ref
                 )
                 limit += 1
                 
@@ -89,6 +91,8 @@ class WorkflowExecutor:
                     status=get_workflow_log_result.status,
                     raw_error=None,
                     parsed_error=None,
+                    cancelled_runs=len(get_workflow_log_result.cancelled_runs or []),
+                    saved_seconds=get_workflow_log_result.saved_seconds,
                 )
                 return {
                     "finish_is": True,
@@ -120,7 +124,9 @@ class WorkflowExecutor:
                     project_errors=parser_result.project_errors,
                     linter_errors=parser_result.linter_errors,
                     unknown_errors=parser_result.unknown_errors
-                )
+                ),
+                cancelled_runs=len(get_workflow_log_result.cancelled_runs or []),
+                saved_seconds=get_workflow_log_result.saved_seconds,
             )
         else:
             log("info", "Workflow Executorはスキップされました")
@@ -96,6 +96,8 @@ class WorkflowRunResult(BaseModel):
     status: str = Field(..., description="ワークフロー実行結果の状態")
     raw_error: Optional[str] = Field(None, description="ワークフロー実行エラーの原文（ツール出力そのまま）")
     parsed_error: LogParseResult | None = Field(None, description="ワークフロー実行ログをエラーの種類で分類した結果")
+    cancelled_runs: int = Field(0, description="このcommitをpushした際にキャンセルした、作業ブランチの古いcommitのrunの数")
+    saved_seconds: float | None = Field(None, description="キャンセルで節約できたランナーの実行時間の見積もり（秒）")
 
     def summary(self) -> str:
         return f"ステータス: {self.status}\n原文: 省略\n要約: 省略\n{self.parsed_error.summary() if self.parsed_error else '失敗カテゴリ: なし'}"
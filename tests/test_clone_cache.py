@@ -0,0 +1,77 @@
+import os
+import subprocess
+from research.tools.clone_cache import MirrorCache, clone_with_strategy, is_sparse, sparse_checkout_add, tracked_files
+
+
+def git(*args, cwd=None):
+    return subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True, text=True).stdout.strip()
+
+
+def test_mirror_worktree(tmp_path):
+    # push先になるリモート（bare）と、その初期commit
+    remote = str(tmp_path / "owner" / "repo.git")
+    git("init", "--bare", "--quiet", "--initial-branch=main", remote)
+    seed = str(tmp_path / "seed")
+    git("clone", "--quiet", remote, seed)
+    with open(os.path.join(seed, "README.md"), "w") as f:
+        f.write("hello\n")
+    git("add", "README.md", cwd=seed)
+    git("-c", "user.name=t", "-c", "user.email=t@example.com", "commit", "--quiet", "-m", "readme", cwd=seed)
+    git("push", "--quiet", "origin", "main", cwd=seed)
+
+    cache = MirrorCache(str(tmp_path / "mirrors"), refresh_seconds=0)
+    work = str(tmp_path / "work")
+    mirror = cache.add_worktree(remote, work)
+    assert mirror == str(tmp_path / "mirrors" / "owner__repo.git")
+    assert open(os.path.join(work, "README.md")).read() == "hello\n"
+    assert cache.mirror_of(work) == mirror
+
+    # worktreeで作業用ブランチを作ってpushできる
+    git("checkout", "--quiet", "-b", "test", cwd=work)
+    with open(os.path.join(work, "ci.yml"), "w") as f:
+        f.write("on: push\n")
+    git("add", "ci.yml", cwd=work)
+    git("-c", "user.name=t", "-c", "user.email=t@example.com", "commit", "--quiet", "-m", "ci", cwd=work)
+    git("push", "--quiet", "-u", "origin", "test", cwd=work)
+    assert git("rev-parse", "test", cwd=remote) == git("rev-parse", "HEAD", cwd=work)
+
+    # 削除するとworktreeとローカルブランチは消え、ミラーは残る
+    assert cache.remove_worktree(work)
+    assert not os.path.exists(work)
+    assert git("branch", "--list", "test", cwd=mirror) == ""
+    assert os.path.exists(os.path.join(mirror, "HEAD"))
+
+    # 2回目はミラーをfetchで更新し、リモートのブランチからチェックアウトできる
+    cache.add_worktree(remote, work)
+    git("checkout", "--quiet", "test", cwd=work)
+    assert os.path.exists(os.path.join(work, "ci.yml"))
+    assert not cache.remove_worktree(str(tmp_path / "seed"))
+
+
+def test_sparse_clone(tmp_path):
+    remote = str(tmp_path / "remote.git")
+    git("init", "--bare", "--quiet", "--initial-branch=main", remote)
+    git("config", "uploadpack.allowFilter", "true", cwd=remote)
+    seed = str(tmp_path / "seed")
+    git("clone", "--quiet", remote, seed)
+    for path in (".github/workflows/ci.yml", "pyproject.toml", "src/app/main.py"):
+        os.makedirs(os.path.dirname(os.path.join(seed, path)), exist_ok=True)
+        with open(os.path.join(seed, path), "w") as f:
+            f.write(path + "\n")
+    git("add", ".", cwd=seed)
+    git("-c", "user.name=t", "-c", "user.email=t@example.com", "commit", "--quiet", "-m", "init", cwd=seed)
+    git("push", "--quiet", "origin", "main", cwd=seed)
+
+    # .github/だけをチェックアウトし、ファイルの一覧には全てのファイルが含まれる
+    local = str(tmp_path / "sparse")
+    clone_with_strategy(f"file://{remote}", local, "sparse")
+    assert is_sparse(local)
+    assert os.path.exists(os.path.join(local, ".github/workflows/ci.yml"))
+    assert not os.path.exists(os.path.join(local, "src/app/main.py"))
+    assert sorted(tracked_files(local)) == [".github/workflows/ci.yml", "pyproject.toml", "src/app/main.py"]
+
+    # 読む時にチェックアウトする（リポジトリにないファイルは追加しない）
+    assert sparse_checkout_add(local, "src/app/main.py")
+    assert open(os.path.join(local, "src/app/main.py")).read() == "src/app/main.py\n"
+    assert not sparse_checkout_add(local, "missing.txt")
+    assert not os.path.exists(os.path.join(local, "pyproject.toml"))
@@ -0,0 +1,170 @@
+import json
+import socket
+import threading
+import time
+import httpx
+import pytest
+import uvicorn
+from fastapi.testclient import TestClient
+from httpx_sse import connect_sse
+from research.server import fake_github, repo_lifecycle, run_watcher, workflow_logs
+from research.server.github_api import app
+
+REPO_URL = "https://github.com/owner/repo"
+
+
+@pytest.fixture
+def fake_base_url(monkeypatch, tmp_path):
+    """代替サーバーを別スレッドで起動し、github_api.pyの接続先をそこに向ける"""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    fake_github.state.config = fake_github.FakeGitHubConfig()
+    fake_github.state.reset()
+    server = uvicorn.Server(uvicorn.Config(fake_github.app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    base_url = f"http://127.0.0.1:{port}"
+    monkeypatch.setenv("GITHUB_API_BASE_URL", base_url)
+    monkeypatch.setenv("GITHUB_TOKEN", "dummy")
+    monkeypatch.setattr(workflow_logs, "LOG_CACHE_ENABLED", False)
+    monkeypatch.chdir(tmp_path)
+    yield base_url
+    server.should_exit = True
+    thread.join(timeout=5)
+
+
+def test_fake_github(fake_base_url):
+    with TestClient(app) as client:
+        info = client.request("GET", "/github/info", json={"repo_url": REPO_URL}).json()
+        assert info["status"] == "success"
+        assert info["info"]["full_name"] == "owner/repo"
+        # 同じ名前なら毎回同じ内容を合成する
+        again = client.request("GET", "/github/info", json={"repo_url": REPO_URL}).json()
+        assert again["info"]["languages"] == info["info"]["languages"]
+
+        # 未知のcommit SHAはrunを合成し、失敗したstepの抜粋を返す
+        for mode in ("full", "tail"):
+            result = client.post("/workflow/latest", json={
+                "repo_url": REPO_URL, "commit_sha": mode[0] * 40, "log_fetch_mode": mode}).json()
+            assert result["status"] == "completed"
+            assert result["conclusion"] == "failure"
+            assert "step:4 Run tests" in result["failure_reason"]
+            assert "AssertionError" in result["failure_reason"]
+        assert result["log_fetch_stats"]["bytes"] < result["log_fetch_stats"]["total_bytes"]
+
+        assert client.post("/github/fork", json={"repo_url": REPO_URL}).json()["status"] == "success"
+        deleted = client.post("/github/delete_repository", json={"repo_url": "https://github.com/fake-user/repo"}).json()
+        assert deleted["status"] == "success"
+
+
+def test_fake_github_rate_limit(fake_base_url):
+    # 1秒あたり2回までに制限しても、RateGovernorが解除を待つため全て成功する
+    httpx.post(f"{fake_base_url}/_fake/config", json={"rate_limit": 2, "rate_limit_window": 1})
+    with TestClient(app) as client:
+        urls = [f"https://github.com/owner/repo{i}" for i in range(4)]
+        for url in urls:
+            assert client.request("GET", "/github/info", json={"repo_url": url}).json()["status"] == "success"
+    stats = httpx.get(f"{fake_base_url}/_fake/stats").json()
+    assert stats["requests"]["POST /graphql"] == len(urls)
+
+    # 条件付きリクエストで変化がなければ304を返し、レート制限を消費しない
+    httpx.post(f"{fake_base_url}/_fake/config", json={"rate_limit": 5000, "rate_limit_window": 3600})
+    resp = httpx.get(f"{fake_base_url}/repos/owner/repo/languages")
+    remaining = int(resp.headers["X-RateLimit-Remaining"])
+    resp = httpx.get(f"{fake_base_url}/repos/owner/repo/languages", headers={"If-None-Match": resp.headers["ETag"]})
+    assert resp.status_code == 304
+    assert int(resp.headers["X-RateLimit-Remaining"]) == remaining
+
+
+def test_workflow_events(fake_base_url, monkeypatch):
+    # testジョブ（失敗）はrunの実行時間の半分で、buildジョブはrunの完了時に終わる
+    httpx.post(f"{fake_base_url}/_fake/config", json={"run_seconds": 2})
+    monkeypatch.setattr(run_watcher, "WATCH_IN_PROGRESS_INTERVAL", 0.2)
+    with TestClient(app) as client:
+        events = []
+        with connect_sse(client, "POST", "/workflow/events", json={"repo_url": REPO_URL, "commit_sha": "e" * 40}) as source:
+            for sse in source.iter_sse():
+                events.append((sse.event, sse.json()))
+    names = [name for name, _ in events]
+    assert names[-1] == "result"
+    result = events[-1][1]
+    assert result["conclusion"] == "failure"
+    assert "AssertionError" in result["failure_reason"]
+
+    # 失敗したジョブの抜粋は、他のジョブとrunの完了より先に届く
+    failed = names.index("job_log")
+    completed = [i for i, (name, data) in enumerate(events) if name == "run" and data["status"] == "completed"]
+    build_done = [i for i, (name, data) in enumerate(events) if name == "job" and data["name"] == "build" and data["status"] == "completed"]
+    assert failed < completed[0]
+    assert failed < build_done[0]
+    assert events[failed][1]["name"] == "test"
+
+
+def test_fork_lifecycle(fake_base_url, monkeypatch, tmp_path):
+    # forkのコピーに1秒かかる場合も、準備が完了してから返す
+    httpx.post(f"{fake_base_url}/_fake/config", json={"fork_ready_seconds": 1})
+    monkeypatch.setattr(repo_lifecycle, "FORK_READY_INTERVAL", 0.2)
+    monkeypatch.setattr(repo_lifecycle, "FORK_MANIFEST_PATH", str(tmp_path / "forks.json"))
+    urls = [f"https://github.com/owner/lifecycle{i}" for i in range(3)]
+    with TestClient(app) as client:
+        forked = client.post("/github/fork/batch", json={"repo_urls": urls}).json()
+        assert [r["state"] for r in forked["results"]] == ["ready"] * len(urls)
+        fork_urls = [r["fork_url"] for r in forked["results"]]
+        assert fork_urls == [f"https://github.com/fake-user/lifecycle{i}" for i in range(3)]
+
+        # マニフェストでreadyのforkは要求し直さない
+        requests_before = httpx.get(f"{fake_base_url}/_fake/stats").json()["requests"]
+        again = client.post("/github/fork/batch", json={"repo_urls": urls}).json()
+        assert [r["fork_url"] for r in again["results"]] == fork_urls
+        assert httpx.get(f"{fake_base_url}/_fake/stats").json()["requests"] == requests_before
+
+        # 1件ずつの削除も削除済みとして記録し、次の一括作成では作り直す
+        assert client.post("/github/delete_repository", json={"repo_url": fork_urls[0]}).json()["status"] == "success"
+        recreated = client.post("/github/fork/batch", json={"repo_urls": urls[:1]}).json()
+        assert recreated["results"][0]["state"] == "ready"
+        forks = httpx.get(f"{fake_base_url}/_fake/stats").json()["requests"]["POST /repos/{owner}/{repo}/forks"]
+        assert forks == requests_before["POST /repos/{owner}/{repo}/forks"] + 1
+
+        # 確認の期限を過ぎたreadyのforkは存在を確かめ、外部で削除されていれば作り直す
+        monkeypatch.setattr(repo_lifecycle, "FORK_VERIFY_SECONDS", 0)
+        httpx.delete(f"{fake_base_url}/repos/fake-user/lifecycle1")
+        verified = client.post("/github/fork/batch", json={"repo_urls": urls[1:]}).json()
+        assert [r["state"] for r in verified["results"]] == ["ready", "ready"]
+        assert httpx.get(f"{fake_base_url}/_fake/stats").json()["requests"]["POST /repos/{owner}/{repo}/forks"] == forks + 1
+
+        deleted = client.post("/github/delete_repository/batch", json={"repo_urls": fork_urls + [urls[0]]}).json()
+        assert [r["status"] for r in deleted["results"]] == ["success"] * len(urls) + ["error"]
+    manifest = json.loads((tmp_path / "forks.json").read_text())["forks"]
+    assert [manifest[url]["state"] for url in urls] == ["deleted"] * len(urls)
+
+
+def test_cancel_superseded_runs(fake_base_url, monkeypatch):
+    monkeypatch.setattr(run_watcher, "WATCH_IN_PROGRESS_INTERVAL", 0.2)
+    # 所要時間の見積もりに使う完了済みのrunと、まだ実行中の古いcommitのrun
+    push = {"repo": "owner/repo", "branch": "work"}
+    httpx.post(f"{fake_base_url}/_fake/push", json={**push, "head_sha": "1" * 40, "run_seconds": 0.5})
+    time.sleep(0.6)
+    old_run = httpx.post(f"{fake_base_url}/_fake/push", json={**push, "head_sha": "a" * 40, "run_seconds": 60}).json()["run_id"]
+    # リポジトリの別のワークフローのrunはキャンセルしない
+    other_run = httpx.post(f"{fake_base_url}/_fake/push", json={**push, "head_sha": "a" * 40, "run_seconds": 60, "workflow_id": 2}).json()["run_id"]
+    httpx.post(f"{fake_base_url}/_fake/push", json={**push, "head_sha": "b" * 40, "run_seconds": 0.3})
+    with TestClient(app) as client:
+        # ブランチの先頭でないcommitを問い合わせても、新しいcommitのrunはキャンセルしない
+        stale = client.post("/workflow/latest", json={"repo_url": REPO_URL, "commit_sha": "1" * 40, "branch": "work"}).json()
+        assert stale["cancelled_runs"] == []
+
+        payload = {"repo_url": REPO_URL, "commit_sha": "b" * 40, "branch": "work"}
+        result = client.post("/workflow/latest", json=payload).json()
+        assert result["status"] == "completed"
+        assert [run["id"] for run in result["cancelled_runs"]] == [old_run]
+        # run_started_at/updated_atは秒単位のため、0.5秒のrunの所要時間は最大1秒に見える
+        assert 0 <= result["saved_seconds"] <= 1
+        # 同じcommitの問い合わせでは再度キャンセルせず、記録した結果を返す
+        assert client.post("/workflow/latest", json=payload).json()["cancelled_runs"] == result["cancelled_runs"]
+    assert httpx.get(f"{fake_base_url}/_fake/stats").json()["requests"]["POST /repos/{owner}/{repo}/actions/runs/{run_id}/cancel"] == 1
+    cancelled = httpx.get(f"{fake_base_url}/repos/owner/repo/actions/runs/{old_run}").json()
+    assert (cancelled["status"], cancelled["conclusion"]) == ("completed", "cancelled")
+    assert httpx.get(f"{fake_base_url}/repos/owner/repo/actions/runs/{other_run}").json()["status"] != "completed"
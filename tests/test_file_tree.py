@@ -0,0 +1,96 @@
+import os
+import subprocess
+from research.tools import file_tree, git_backend
+from research.tools.github import GitHubTool
+
+
+def git(*args, cwd=None):
+    return subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True, text=True).stdout.strip()
+
+
+def write(root, path, content):
+    os.makedirs(os.path.dirname(os.path.join(root, path)) or root, exist_ok=True)
+    with open(os.path.join(root, path), "w") as f:
+        f.write(content)
+
+
+def test_file_tree_cached_by_head(tmp_path, monkeypatch):
+    repo = str(tmp_path / "repo")
+    git("init", "--quiet", "--initial-branch=main", repo)
+    for path in (".github/workflows/ci.yml", "pom.xml", "src/Main.java", "vendor/lib/a.go", "node_modules/x/index.js"):
+        write(repo, path, path + "\n")
+    git("add", "-f", ".", cwd=repo)
+    git("-c", "user.name=t", "-c", "user.email=t@example.com", "commit", "--quiet", "-m", "init", cwd=repo)
+    # commitしていない生成物は含めないが、gitで管理されているファイルはvendor/などにあっても含める
+    write(repo, "target/classes/Main.class", "bin")
+
+    cache = file_tree.FileTreeCache(str(tmp_path / "trees"))
+    monkeypatch.setattr(file_tree, "_file_tree_cache", cache)
+    files = file_tree.list_files(repo)
+    assert sorted(files) == [".github/workflows/ci.yml", "node_modules/x/index.js", "pom.xml", "src/Main.java", "vendor/lib/a.go"]
+    assert files["pom.xml"] == len("pom.xml\n")
+
+    # 同じcommitではls-treeを実行せず、ディスクのキャッシュから読む
+    sha = git("rev-parse", "HEAD", cwd=repo)
+    assert os.path.exists(cache._path(sha))
+    calls = []
+    original = file_tree._git
+    monkeypatch.setattr(file_tree, "_git", lambda args, cwd: calls.append(args[0]) or original(args, cwd))
+    monkeypatch.setattr(file_tree, "_file_tree_cache", file_tree.FileTreeCache(str(tmp_path / "trees")))
+    assert file_tree.list_files(repo) == files
+    assert calls == ["rev-parse"]
+
+    # GitHubToolで変更したパスはcommit前でも反映する
+    os.remove(os.path.join(repo, "src/Main.java"))
+    git_backend.record_change(repo, "src/Main.java")
+    write(repo, ".github/workflows/new.yml", "on: push\n")
+    git_backend.record_change(repo, ".github/workflows/new.yml")
+    try:
+        assert sorted(file_tree.list_files(repo)) == [
+            ".github/workflows/ci.yml", ".github/workflows/new.yml", "node_modules/x/index.js", "pom.xml", "vendor/lib/a.go"]
+    finally:
+        git_backend.pop_changes(repo)
+
+    tree = file_tree.render_tree("repo", sorted(files))
+    assert tree.endswith("7 directories, 5 files\n")
+    assert "│   └── workflows" in tree
+
+    # gitのリポジトリでない場合は走査する
+    plain = str(tmp_path / "plain")
+    write(plain, "a/b.txt", "b")
+    write(plain, "dist/bundle.js", "x")
+    assert file_tree.list_files(plain) == {"a/b.txt": 1}
+
+
+def test_compact_tree_fits_budget():
+    paths = [".github/workflows/ci.yml", "pom.xml", "README.md"]
+    paths += [f"src/gen/pkg{i}/Gen{j}.java" for i in range(40) for j in range(100)]
+    paths += [f"modules/m{i}/pom.xml" for i in range(5)] + [f"modules/m{i}/src/main/App{i}.kt" for i in range(5)]
+    paths.sort()
+
+    # 収まる場合はそのまま表示する
+    assert file_tree.render_compact_tree("repo", paths, 10**9, len) == file_tree.render_tree("repo", paths)
+
+    for budget in (20000, 3000, 800):
+        tree = file_tree.render_compact_tree("repo", paths, budget, len)
+        assert 0 < len(tree) <= budget
+        # ビルドのファイルと.github/は要約しても表示する
+        assert "pom.xml" in tree and "ci.yml" in tree
+    tree = file_tree.render_compact_tree("repo", paths, 3000, len)
+    assert "files: *.java" in tree
+    assert tree.count("pom.xml") == 6
+
+    # どれだけ小さい上限でも超えない
+    assert len(file_tree.render_compact_tree("repo", paths, 60, len)) <= 60
+
+
+def test_file_tree_sub_budget(tmp_path):
+    write(str(tmp_path), "src/main.py", "x")
+    github = GitHubTool(transport="inprocess")
+    result = github.get_file_tree_sub(str(tmp_path), max_tokens=1000, count_tokens=len)
+    assert result.status == "success"
+    assert "main.py" in result.info["tree"]
+    # 上限に収まるツリーを作れない場合は空のツリーではなくエラーを返す
+    result = github.get_file_tree_sub(str(tmp_path), max_tokens=1, count_tokens=len)
+    assert result.status == "error"
+    assert result.info is None
@@ -0,0 +1,73 @@
+import os
+import subprocess
+import pytest
+
+pytest.importorskip("pygit2")
+
+from research.tools import git_backend  # noqa: E402
+
+
+def git(*args, cwd=None):
+    return subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True, text=True).stdout.strip()
+
+
+def write(root, path, content):
+    os.makedirs(os.path.dirname(os.path.join(root, path)) or root, exist_ok=True)
+    with open(os.path.join(root, path), "w") as f:
+        f.write(content)
+
+
+def test_commit_and_push_changed_paths(tmp_path):
+    remote = str(tmp_path / "remote.git")
+    git("init", "--bare", "--quiet", "--initial-branch=main", remote)
+    seed = str(tmp_path / "seed")
+    git("clone", "--quiet", remote, seed)
+    for path in (".github/workflows/old.yml", "README.md", "src/main.py"):
+        write(seed, path, path + "\n")
+    git("add", ".", cwd=seed)
+    git("-c", "user.name=t", "-c", "user.email=t@example.com", "commit", "--quiet", "-m", "init", cwd=seed)
+    git("push", "--quiet", "origin", "main", cwd=seed)
+
+    work = str(tmp_path / "work")
+    git("clone", "--quiet", remote, work)
+    git("config", "user.name", "t", cwd=work)
+    git("config", "user.email", "t@example.com", cwd=work)
+    assert git_backend.is_available(work)
+    assert not git_backend.create_working_branch(work, "work/llm")
+    assert git("symbolic-ref", "--short", "HEAD", cwd=work) == "work/llm"
+
+    # GitHubToolで変更したパスと.github/だけがコミットされ、それ以外の変更（ビルドの生成物など）は含まれない
+    os.remove(os.path.join(work, ".github/workflows/old.yml"))
+    write(work, ".github/workflows/ci.yml", "on: push\n")
+    write(work, "docs/guide.md", "guide\n")
+    git_backend.record_change(work, "docs/guide.md")
+    write(work, "src/main.py", "changed\n")
+    write(work, "build/out.txt", "generated\n")
+
+    branch, sha = git_backend.commit_and_push(work, "add ci")
+    assert branch == "work/llm"
+    assert git("rev-parse", "refs/heads/work/llm", cwd=remote) == sha == git("rev-parse", "HEAD", cwd=work)
+    files = git("ls-tree", "-r", "--name-only", sha, cwd=remote).splitlines()
+    assert sorted(files) == [".github/workflows/ci.yml", "README.md", "docs/guide.md", "src/main.py"]
+    assert git("show", f"{sha}:src/main.py", cwd=remote) == "src/main.py"
+    # 作業用ブランチ以外のrefはpushしない
+    assert git("for-each-ref", "--format=%(refname)", "refs/heads", cwd=remote).splitlines() == ["refs/heads/main", "refs/heads/work/llm"]
+    assert git("rev-parse", "--abbrev-ref", "work/llm@{upstream}", cwd=work) == "origin/work/llm"
+
+    # 変更したパスの記録がなければ、git add .と同じくworktree全体をコミットする
+    os.remove(os.path.join(work, "README.md"))
+    _, sha = git_backend.commit_and_push(work, "all")
+    files = git("ls-tree", "-r", "--name-only", sha, cwd=remote).splitlines()
+    assert sorted(files) == [".github/workflows/ci.yml", "build/out.txt", "docs/guide.md", "src/main.py"]
+    assert git("show", f"{sha}:src/main.py", cwd=remote) == "changed"
+
+    # 変更がなければエラーになる
+    with pytest.raises(git_backend.GitBackendError):
+        git_backend.commit_and_push(work, "empty")
+
+    # 既にリモートにあるブランチはそこからチェックアウトする
+    other = str(tmp_path / "other")
+    git("clone", "--quiet", remote, other)
+    assert git_backend.create_working_branch(other, "work/llm")
+    assert git("rev-parse", "HEAD", cwd=other) == sha
+    assert os.path.exists(os.path.join(other, "docs/guide.md"))
@@ -0,0 +1,88 @@
+import hashlib
+import hmac
+import json
+import threading
+import time
+from fastapi.testclient import TestClient
+from research.server.github_api import app
+
+SECRET = "test-secret"
+REPO_URL = "https://github.com/owner/repo"
+
+
+def post_webhook(client, event, payload, secret=SECRET):
+    body = json.dumps(payload).encode()
+    signature = "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    return client.post("/webhook/github", content=body, headers={
+        "X-GitHub-Event": event,
+        "X-Hub-Signature-256": signature,
+        "Content-Type": "application/json",
+    })
+
+
+def workflow_run_payload(sha, run_id, status="completed", conclusion="success"):
+    return {
+        "action": "completed" if status == "completed" else "in_progress",
+        "repository": {"full_name": "owner/repo"},
+        "workflow_run": {
+            "id": run_id,
+            "head_sha": sha,
+            "status": status,
+            "conclusion": conclusion,
+            "html_url": f"{REPO_URL}/actions/runs/{run_id}",
+            "logs_url": f"https://api.github.com/repos/owner/repo/actions/runs/{run_id}/logs",
+        },
+    }
+
+
+def test_webhook(monkeypatch):
+    monkeypatch.setenv("GITHUB_WEBHOOK_SECRET", SECRET)
+    monkeypatch.setenv("GITHUB_TOKEN", "dummy")
+    # ポーリングは接続できないアドレスに向け、Webhookだけで解決されることを確認する
+    monkeypatch.setenv("GITHUB_API_BASE_URL", "http://127.0.0.1:9")
+
+    with TestClient(app) as client:
+        # 署名が不正なリクエストは拒否する
+        resp = post_webhook(client, "workflow_run", workflow_run_payload("a" * 40, 1), secret="wrong")
+        assert resp.status_code == 401
+        assert resp.json()["status"] == "error"
+
+        resp = post_webhook(client, "ping", {"zen": "hello"})
+        assert resp.status_code == 200
+        assert resp.json()["message"] == "pong"
+
+        # 待機中のSHAはWebhookの完了通知で解決される
+        sha = "b" * 40
+        results = {}
+
+        def wait():
+            results["resp"] = client.post("/workflow/latest", json={"repo_url": REPO_URL, "commit_sha": sha})
+
+        thread = threading.Thread(target=wait)
+        thread.start()
+        deadline = time.time() + 5
+        while time.time() < deadline:
+            pending = client.get("/workflow/watcher").json()["pending"]
+            if sha in pending.get("owner/repo", {}):
+                break
+            time.sleep(0.05)
+        assert post_webhook(client, "workflow_run", workflow_run_payload(sha, 2, status="in_progress", conclusion=None)).status_code == 200
+        started = time.time()
+        assert post_webhook(client, "workflow_run", workflow_run_payload(sha, 2)).status_code == 200
+        thread.join(timeout=10)
+        assert not thread.is_alive()
+        assert time.time() - started < 5
+        result = results["resp"].json()
+        assert result["status"] == "completed"
+        assert result["conclusion"] == "success"
+        assert result["html_url"].endswith("/runs/2")
+
+        # 待機より先に届いた完了通知も使われる
+        sha = "c" * 40
+        assert post_webhook(client, "workflow_run", workflow_run_payload(sha, 3)).status_code == 200
+        result = client.post("/workflow/latest", json={"repo_url": REPO_URL, "commit_sha": sha}).json()
+        assert result["status"] == "completed"
+        assert result["html_url"].endswith("/runs/3")
+
+        stats = client.get("/workflow/watcher").json()["stats"]
+        assert stats["webhooks"] == 3